@@ -11,7 +11,9 @@ export default function Dashboard() {
   });
 
   useEffect(() => {
-    fetch(`${import.meta.env.VITE_API_URL}/api/v1/stats`)
+    fetch(`${import.meta.env.VITE_API_URL}/api/v1/stats`, {
+      headers: { 'Authorization': `Bearer ${localStorage.getItem('token')}` }
+    })
       .then(res => res.json())
       .then(data => setStats(data))
       .catch(err => console.error("Failed to fetch stats", err));
@@ -13,9 +13,13 @@ export default function ReaperList() {
   const [isKillModalOpen, setIsKillModalOpen] = useState(false);
   const [selectedSubForKill, setSelectedSubForKill] = useState(null);
 
+  const authHeaders = () => ({ 'Authorization': `Bearer ${localStorage.getItem('token')}` });
+
   const fetchSubscriptions = async () => {
     try {
-      const res = await fetch(`${import.meta.env.VITE_API_URL}/api/v1/subscriptions`);
+      const res = await fetch(`${import.meta.env.VITE_API_URL}/api/v1/subscriptions?all=true`, {
+        headers: authHeaders()
+      });
       const data = await res.json();
       setSubscriptions(data);
       setLoading(false);
@@ -39,14 +43,14 @@ export default function ReaperList() {
         // Update existing
         await fetch(`${import.meta.env.VITE_API_URL}/api/v1/subscriptions/${subData.id}`, {
           method: 'PATCH',
-          headers: { 'Content-Type': 'application/json' },
+          headers: { 'Content-Type': 'application/json', ...authHeaders() },
           body: JSON.stringify(subData)
         });
       } else {
         // Create new
         await fetch(`${import.meta.env.VITE_API_URL}/api/v1/subscriptions`, {
           method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
+          headers: { 'Content-Type': 'application/json', ...authHeaders() },
           body: JSON.stringify(subData)
         });
       }
@@ -77,7 +81,7 @@ export default function ReaperList() {
     try {
       await fetch(`${import.meta.env.VITE_API_URL}/api/v1/subscriptions/${id}`, {
         method: 'PATCH',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', ...authHeaders() },
         body: JSON.stringify({ status: 'cancelled', seats_unused: 0 })
       });
       setIsKillModalOpen(false); // Close modal
@@ -112,29 +116,23 @@ export default function ReaperList() {
 
   // if (loading) return <div style={{ padding: 32, marginLeft: 260 }}>Loading...</div>;
 
-  const handleExport = () => {
-    const headers = ['Name', 'Team', 'Cost', 'Seats Total', 'Seats Unused', 'Status', 'Last Active'];
-    const csvContent = [
-      headers.join(','),
-      ...subscriptions.map(sub => [
-        `"${sub.name}"`, // Quote strings to handle commas
-        `"${sub.team}"`,
-        sub.amount,
-        sub.seats_total,
-        sub.seats_unused,
-        sub.status,
-        `"${sub.last_used}"`
-      ].join(','))
-    ].join('\n');
-
-    const blob = new Blob([csvContent], { type: 'text/csv;charset=utf-8;' });
-    const url = URL.createObjectURL(blob);
-    const link = document.createElement('a');
-    link.href = url;
-    link.setAttribute('download', 'spendshred_export.csv');
-    document.body.appendChild(link);
-    link.click();
-    document.body.removeChild(link);
+  const handleExport = async () => {
+    // Streamed by the server straight from the database; fetched so the request carries the token
+    try {
+      const res = await fetch(`${import.meta.env.VITE_API_URL}/api/v1/subscriptions/export?format=csv`, {
+        headers: authHeaders()
+      });
+      const url = URL.createObjectURL(await res.blob());
+      const link = document.createElement('a');
+      link.href = url;
+      link.setAttribute('download', 'spendshred_export.csv');
+      document.body.appendChild(link);
+      link.click();
+      document.body.removeChild(link);
+      URL.revokeObjectURL(url);
+    } catch (error) {
+      console.error("Failed to export", error);
+    }
   };
 
   return (
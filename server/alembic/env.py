@@ -9,7 +9,14 @@ from alembic import context
 # Import your models here so they are registered with SQLModel
 from app.models.user import User
 from app.models.subscription import Subscription
-from app.models.oauth import OAuthToken
+from app.models.oauth import OAuthToken, GmailScanCursor
+from app.models.scan_job import ScanJob, ScanRun
+from app.models.vendor import VendorAlias
+from app.models.analysis_job import AnalysisJob
+from app.models.transaction import Transaction, TransactionImport
+from app.models.charge_event import ChargeEvent, BillingProfile
+from app.models.spend_rollup import SpendRollup
+from app.models.organization import Organization
 from app.core.config import settings
 
 # this is the Alembic Config object, which provides
@@ -18,7 +25,8 @@ config = context.config
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
-if config.config_file_name is not None:
+# Not when the app runs migrations itself (app/core/schema.py), it has its own logging.
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
     fileConfig(config.config_file_name)
 
 # Overwrite sqlalchemy.url with the one from settings
@@ -59,6 +67,14 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
+    # The app's startup check hands over a connection that already holds the migration lock
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
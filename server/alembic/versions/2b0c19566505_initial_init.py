@@ -9,6 +9,7 @@ from typing import Sequence, Union
 
 from alembic import op
 import sqlalchemy as sa
+import sqlmodel
 
 
 # revision identifiers, used by Alembic.
@@ -20,13 +21,50 @@ depends_on: Union[str, Sequence[str], None] = None
 
 def upgrade() -> None:
     """Upgrade schema."""
-    # ### commands auto generated by Alembic - please adjust! ###
-    pass
-    # ### end Alembic commands ###
+    # The tables the app started out with, which create_all() used to make on boot.
+    # Databases made that way are already past this revision.
+    op.create_table(
+        'user',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('full_name', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('hashed_password', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_user_email'), 'user', ['email'], unique=True)
+    op.create_table(
+        'subscription',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('team', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('seats_total', sa.Integer(), nullable=False),
+        sa.Column('seats_unused', sa.Integer(), nullable=False),
+        sa.Column('status', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('last_used', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_subscription_name'), 'subscription', ['name'], unique=False)
+    op.create_table(
+        'oauthtoken',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('provider', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('access_token', sa.Text(), nullable=True),
+        sa.Column('refresh_token', sa.Text(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_oauthtoken_user_id'), 'oauthtoken', ['user_id'], unique=False)
 
 
 def downgrade() -> None:
     """Downgrade schema."""
-    # ### commands auto generated by Alembic - please adjust! ###
-    pass
-    # ### end Alembic commands ###
+    op.drop_index(op.f('ix_oauthtoken_user_id'), table_name='oauthtoken')
+    op.drop_table('oauthtoken')
+    op.drop_index(op.f('ix_subscription_name'), table_name='subscription')
+    op.drop_table('subscription')
+    op.drop_index(op.f('ix_user_email'), table_name='user')
+    op.drop_table('user')
@@ -0,0 +1,30 @@
+"""Add subscription keyset indexes
+
+Revision ID: 3c9e1f7a2d64
+Revises: 97d192572ca7
+Create Date: 2026-10-18 15:02:37.114920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9e1f7a2d64'
+down_revision: Union[str, Sequence[str], None] = '97d192572ca7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_subscription_team_id', 'subscription', ['team', 'id'], unique=False)
+    op.create_index('ix_subscription_amount_id', 'subscription', ['amount', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_subscription_amount_id', table_name='subscription')
+    op.drop_index('ix_subscription_team_id', table_name='subscription')
@@ -0,0 +1,42 @@
+"""Add subscription vendor key
+
+Revision ID: 45131a5d8a24
+Revises: 77c316e92ae3
+Create Date: 2026-10-18 12:20:03.661045
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '45131a5d8a24'
+down_revision: Union[str, Sequence[str], None] = '77c316e92ae3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('subscription', sa.Column('vendor_key', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+    op.create_index(op.f('ix_subscription_vendor_key'), 'subscription', ['vendor_key'], unique=False)
+
+    # Backfill with the same normalization the app uses (lowercase, collapsed whitespace)
+    subscription = sa.table('subscription', sa.column('id', sa.Integer), sa.column('name', sa.String),
+                            sa.column('vendor_key', sa.String))
+    bind = op.get_bind()
+    rows = bind.execute(sa.select(subscription.c.id, subscription.c.name)).all()
+    if rows:
+        bind.execute(
+            subscription.update().where(subscription.c.id == sa.bindparam('row_id')),
+            [{'row_id': row.id, 'vendor_key': " ".join(row.name.lower().split())} for row in rows]
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_subscription_vendor_key'), table_name='subscription')
+    op.drop_column('subscription', 'vendor_key')
@@ -0,0 +1,118 @@
+"""Vendor aliases, re-key subscriptions and merge duplicates
+
+Revision ID: 525c1e99d0f8
+Revises: 45131a5d8a24
+Create Date: 2026-10-18 13:41:52.118094
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import re
+
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '525c1e99d0f8'
+down_revision: Union[str, Sequence[str], None] = '45131a5d8a24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The vendor index as it was at this revision, so the cleanup re-keys rows the same way
+# however app/services/vendor_index.py and the catalog change later. Subscription names
+# are plain names, which resolve through name_key() and the catalog's name aliases only.
+NOISE_WORDS = {
+    "team", "billing", "bills", "receipts", "receipt", "invoices", "invoice", "payments", "payment",
+    "support", "notifications", "noreply", "no-reply", "hq", "inc", "llc", "ltd", "gmbh", "the", "via",
+}
+TLDS = {"com", "so", "io", "app", "ai", "co", "net", "org", "us", "dev"}
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9&+\-]*")
+# name_key() of a catalog alias -> name_key() of its vendor, where the two differ
+CATALOG_ALIASES = {
+    'notion labs': 'notion', 'slack technologies': 'slack', 'linear orbit': 'linear',
+    'zoom video communications': 'zoom', 'jira': 'atlassian', 'confluence': 'atlassian', 'adobe cc': 'adobe',
+    'adobe creative cloud': 'adobe', 'openai': 'chatgpt plus', 'chatgpt': 'chatgpt plus', 'g suite': 'google workspace',
+    'microsoft': 'microsoft 365', 'office 365': 'microsoft 365', 'amazon web services': 'aws',
+    'intuit mailchimp': 'mailchimp', 'anysphere': 'cursor',
+}
+# When duplicates merge, the status kept is the one most in need of attention
+STATUS_RANK = {'cancelled': 0, 'active': 1, 'zombie': 2, 'critical': 3}
+
+
+def name_key(name: str) -> str:
+    words = _WORD_RE.findall(name.lower().replace(".", " "))
+    kept = [w for w in words if w not in NOISE_WORDS]
+    if len(kept) > 1 and kept[-1] in TLDS:
+        kept = kept[:-1]
+    return " ".join(kept or words)
+
+
+def vendor_key(name: str) -> str:
+    key = name_key(name.strip().strip('"').strip())
+    return CATALOG_ALIASES.get(key, key)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'vendoralias',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('alias', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('vendor', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_vendoralias_user_id'), 'vendoralias', ['user_id'], unique=False)
+
+    # One-time cleanup: "Notion Team", "Notion" and "notion.so billing" were separate rows.
+    # Re-key every row through the vendor index, then fold rows that share a vendor and team
+    # into the oldest one, keeping the larger amount and seat counts and the more urgent status.
+    # Rows on different teams are kept, those are separate purchases.
+    subscription = sa.table(
+        'subscription',
+        sa.column('id', sa.Integer), sa.column('name', sa.String), sa.column('vendor_key', sa.String),
+        sa.column('team', sa.String), sa.column('amount', sa.Float),
+        sa.column('seats_total', sa.Integer), sa.column('seats_unused', sa.Integer), sa.column('status', sa.String),
+    )
+    bind = op.get_bind()
+    rows = bind.execute(sa.select(subscription).order_by(subscription.c.id)).all()
+    if not rows:
+        return
+
+    survivors, updates, duplicate_ids = {}, {}, []
+    for row in rows:
+        key = vendor_key(row.name)
+        group = (key, row.team)
+        survivor = survivors.get(group)
+        if survivor is None:
+            survivors[group] = row.id
+            updates[row.id] = {'row_id': row.id, 'vendor_key': key, 'amount': row.amount,
+                               'seats_total': row.seats_total, 'seats_unused': row.seats_unused, 'status': row.status}
+            continue
+        merged = updates[survivor]
+        merged['amount'] = max(merged['amount'], row.amount)
+        merged['seats_total'] = max(merged['seats_total'], row.seats_total)
+        merged['seats_unused'] = min(max(merged['seats_unused'], row.seats_unused), merged['seats_total'])
+        if STATUS_RANK.get(row.status, 0) > STATUS_RANK.get(merged['status'], 0):
+            merged['status'] = row.status
+        duplicate_ids.append(row.id)
+
+    bind.execute(
+        subscription.update().where(subscription.c.id == sa.bindparam('row_id')).values(
+            vendor_key=sa.bindparam('vendor_key'), amount=sa.bindparam('amount'),
+            seats_total=sa.bindparam('seats_total'), seats_unused=sa.bindparam('seats_unused'),
+            status=sa.bindparam('status'),
+        ),
+        list(updates.values())
+    )
+    if duplicate_ids:
+        bind.execute(subscription.delete().where(subscription.c.id.in_(duplicate_ids)))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Merged rows are not restored
+    op.drop_index(op.f('ix_vendoralias_user_id'), table_name='vendoralias')
+    op.drop_table('vendoralias')
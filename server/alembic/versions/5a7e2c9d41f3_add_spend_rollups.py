@@ -0,0 +1,41 @@
+"""Add spend rollups
+
+Revision ID: 5a7e2c9d41f3
+Revises: bc7c1285a706
+Create Date: 2026-10-18 14:12:08.403517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a7e2c9d41f3'
+down_revision: Union[str, Sequence[str], None] = 'bc7c1285a706'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'spendrollup',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('granularity', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('bucket', sa.Date(), nullable=False),
+        sa.Column('team', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('status', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('wasted', sa.Float(), nullable=False),
+        sa.Column('subscriptions', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('granularity', 'bucket', 'team', 'status', name='uq_spendrollup_bucket_group')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('spendrollup')
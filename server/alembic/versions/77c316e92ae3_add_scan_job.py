@@ -0,0 +1,49 @@
+"""Add scan job
+
+Revision ID: 77c316e92ae3
+Revises: b5f2aa99b5d4
+Create Date: 2026-10-18 11:02:17.190342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '77c316e92ae3'
+down_revision: Union[str, Sequence[str], None] = 'b5f2aa99b5d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'scanjob',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('active_user_id', sa.Integer(), nullable=True),
+        sa.Column('status', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('phase', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('max_messages', sa.Integer(), nullable=False),
+        sa.Column('horizon_days', sa.Integer(), nullable=False),
+        sa.Column('messages_seen', sa.Integer(), nullable=False),
+        sa.Column('subscriptions_found', sa.Integer(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('active_user_id')
+    )
+    op.create_index(op.f('ix_scanjob_user_id'), 'scanjob', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_scanjob_user_id'), table_name='scanjob')
+    op.drop_table('scanjob')
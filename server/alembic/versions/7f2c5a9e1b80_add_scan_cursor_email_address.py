@@ -0,0 +1,30 @@
+"""Add scan cursor email address
+
+Revision ID: 7f2c5a9e1b80
+Revises: d6b3e8f0a4c1
+Create Date: 2026-10-18 23:12:48.306915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7f2c5a9e1b80'
+down_revision: Union[str, Sequence[str], None] = 'd6b3e8f0a4c1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('gmailscancursor', sa.Column('email_address', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('gmailscancursor') as batch_op:
+        batch_op.drop_column('email_address')
@@ -0,0 +1,65 @@
+"""Add transaction and transaction import tables
+
+Revision ID: 8d3f6a1c5e27
+Revises: e41d7b09c2a5
+Create Date: 2026-10-18 18:05:37.514208
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d3f6a1c5e27'
+down_revision: Union[str, Sequence[str], None] = 'e41d7b09c2a5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'transaction',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('external_id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('posted_on', sa.Date(), nullable=False),
+        sa.Column('description', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('merchant_key', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('currency', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'external_id', name='uq_transaction_user_external')
+    )
+    op.create_index('ix_transaction_user_merchant_posted', 'transaction', ['user_id', 'merchant_key', 'posted_on'], unique=False)
+    op.create_table(
+        'transactionimport',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('format', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('status', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('phase', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('bytes_total', sa.BigInteger(), nullable=False),
+        sa.Column('bytes_parsed', sa.BigInteger(), nullable=False),
+        sa.Column('rows_imported', sa.Integer(), nullable=False),
+        sa.Column('rows_skipped', sa.Integer(), nullable=False),
+        sa.Column('recurring_found', sa.Integer(), nullable=False),
+        sa.Column('subscriptions_found', sa.Integer(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_transactionimport_user_id'), 'transactionimport', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_transactionimport_user_id'), table_name='transactionimport')
+    op.drop_table('transactionimport')
+    op.drop_index('ix_transaction_user_merchant_posted', table_name='transaction')
+    op.drop_table('transaction')
@@ -0,0 +1,28 @@
+"""Add subscription status/team index
+
+Revision ID: 97d192572ca7
+Revises: 525c1e99d0f8
+Create Date: 2026-10-18 14:26:09.873502
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '97d192572ca7'
+down_revision: Union[str, Sequence[str], None] = '525c1e99d0f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_subscription_status_team', 'subscription', ['status', 'team', 'amount', 'seats_total', 'seats_unused'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_subscription_status_team', table_name='subscription')
@@ -0,0 +1,51 @@
+"""Key vendor aliases by tenant
+
+Revision ID: a9e4d1c7b352
+Revises: f2b7d4e81c3a
+Create Date: 2026-10-18 21:04:17.402281
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9e4d1c7b352'
+down_revision: Union[str, Sequence[str], None] = 'f2b7d4e81c3a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+vendoralias = sa.table('vendoralias', sa.column('user_id', sa.Integer), sa.column('tenant_id', sa.Integer))
+user = sa.table('user', sa.column('id', sa.Integer), sa.column('organization_id', sa.Integer))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # An alias applies to everyone in its user's organization; ones of users without one go
+    op.add_column('vendoralias', sa.Column('tenant_id', sa.Integer(), nullable=True))
+    op.execute(vendoralias.update().values(
+        tenant_id=sa.select(user.c.organization_id).where(user.c.id == vendoralias.c.user_id).scalar_subquery()
+    ))
+    op.execute(vendoralias.delete().where(vendoralias.c.tenant_id.is_(None)))
+    with op.batch_alter_table('vendoralias') as batch_op:
+        batch_op.alter_column('tenant_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.drop_index('ix_vendoralias_user_id')
+        batch_op.drop_column('user_id')
+        batch_op.create_index('ix_vendoralias_tenant_id', ['tenant_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Each alias goes back to the organization's first user
+    op.add_column('vendoralias', sa.Column('user_id', sa.Integer(), nullable=True))
+    op.execute(vendoralias.update().values(
+        user_id=sa.select(sa.func.min(user.c.id)).where(user.c.organization_id == vendoralias.c.tenant_id).scalar_subquery()
+    ))
+    op.execute(vendoralias.delete().where(vendoralias.c.user_id.is_(None)))
+    with op.batch_alter_table('vendoralias') as batch_op:
+        batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.drop_index('ix_vendoralias_tenant_id')
+        batch_op.drop_column('tenant_id')
+        batch_op.create_index('ix_vendoralias_user_id', ['user_id'], unique=False)
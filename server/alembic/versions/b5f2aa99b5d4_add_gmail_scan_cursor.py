@@ -0,0 +1,40 @@
+"""Add gmail scan cursor
+
+Revision ID: b5f2aa99b5d4
+Revises: 2b0c19566505
+Create Date: 2026-10-18 10:12:41.508311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5f2aa99b5d4'
+down_revision: Union[str, Sequence[str], None] = '2b0c19566505'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'gmailscancursor',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('history_id', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('last_internal_date', sa.BigInteger(), nullable=True),
+        sa.Column('processed_ids', sa.Text(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_gmailscancursor_user_id'), 'gmailscancursor', ['user_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_gmailscancursor_user_id'), table_name='gmailscancursor')
+    op.drop_table('gmailscancursor')
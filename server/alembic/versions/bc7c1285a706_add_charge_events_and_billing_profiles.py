@@ -0,0 +1,67 @@
+"""Add charge events and billing profiles
+
+Revision ID: bc7c1285a706
+Revises: 8d3f6a1c5e27
+Create Date: 2026-10-18 09:36:52.191844
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bc7c1285a706'
+down_revision: Union[str, Sequence[str], None] = '8d3f6a1c5e27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'chargeevent',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('vendor_key', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('currency', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('charged_at', sa.DateTime(), nullable=False),
+        sa.Column('message_id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'message_id', name='uq_chargeevent_user_message')
+    )
+    op.create_index('ix_chargeevent_vendor_charged', 'chargeevent', ['vendor_key', 'charged_at'], unique=False)
+    op.create_table(
+        'billingprofile',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('vendor_key', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('vendor_name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('charge_count', sa.Integer(), nullable=False),
+        sa.Column('first_charged_at', sa.DateTime(), nullable=True),
+        sa.Column('last_charged_at', sa.DateTime(), nullable=True),
+        sa.Column('cadence', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('interval_days', sa.Float(), nullable=True),
+        sa.Column('next_expected_at', sa.DateTime(), nullable=True),
+        sa.Column('last_amount', sa.Float(), nullable=False),
+        sa.Column('previous_amount', sa.Float(), nullable=True),
+        sa.Column('price_change_pct', sa.Float(), nullable=True),
+        sa.Column('price_changed_at', sa.DateTime(), nullable=True),
+        sa.Column('recent_charges', sa.Text(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('vendor_key')
+    )
+    op.create_index(op.f('ix_billingprofile_next_expected_at'), 'billingprofile', ['next_expected_at'], unique=False)
+    op.create_index(op.f('ix_billingprofile_price_changed_at'), 'billingprofile', ['price_changed_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_billingprofile_price_changed_at'), table_name='billingprofile')
+    op.drop_index(op.f('ix_billingprofile_next_expected_at'), table_name='billingprofile')
+    op.drop_table('billingprofile')
+    op.drop_index('ix_chargeevent_vendor_charged', table_name='chargeevent')
+    op.drop_table('chargeevent')
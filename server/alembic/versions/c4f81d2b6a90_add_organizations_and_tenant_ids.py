@@ -0,0 +1,178 @@
+"""Add organizations and tenant ids
+
+Revision ID: c4f81d2b6a90
+Revises: 5a7e2c9d41f3
+Create Date: 2026-10-18 17:41:26.118204
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f81d2b6a90'
+down_revision: Union[str, Sequence[str], None] = '5a7e2c9d41f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TENANT_TABLES = ['subscription', 'spendrollup', 'chargeevent', 'billingprofile']
+
+BILLINGPROFILE_COLUMNS = [
+    'id', 'vendor_key', 'vendor_name', 'charge_count', 'first_charged_at', 'last_charged_at', 'cadence',
+    'interval_days', 'next_expected_at', 'last_amount', 'previous_amount', 'price_change_pct', 'price_changed_at',
+    'recent_charges', 'updated_at',
+]
+
+
+def _billingprofile_table(name, *extra):
+    return op.create_table(
+        name,
+        sa.Column('id', sa.Integer(), nullable=False),
+        *extra,
+        sa.Column('vendor_key', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('vendor_name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('charge_count', sa.Integer(), nullable=False),
+        sa.Column('first_charged_at', sa.DateTime(), nullable=True),
+        sa.Column('last_charged_at', sa.DateTime(), nullable=True),
+        sa.Column('cadence', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('interval_days', sa.Float(), nullable=True),
+        sa.Column('next_expected_at', sa.DateTime(), nullable=True),
+        sa.Column('last_amount', sa.Float(), nullable=False),
+        sa.Column('previous_amount', sa.Float(), nullable=True),
+        sa.Column('price_change_pct', sa.Float(), nullable=True),
+        sa.Column('price_changed_at', sa.DateTime(), nullable=True),
+        sa.Column('recent_charges', sa.Text(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'organization',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('storage', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.add_column('user', sa.Column('organization_id', sa.Integer(), nullable=True))
+    op.create_index(op.f('ix_user_organization_id'), 'user', ['organization_id'], unique=False)
+    for table in ['subscription', 'spendrollup', 'chargeevent']:
+        op.add_column(table, sa.Column('tenant_id', sa.Integer(), nullable=True))
+
+    # Everything written so far was one shared workspace: it becomes the "Default"
+    # organization, and every existing user joins it
+    bind = op.get_bind()
+    has_data = any(
+        bind.execute(sa.select(sa.literal(1)).select_from(sa.table(table)).limit(1)).first()
+        for table in ['user', *TENANT_TABLES]
+    )
+    default_id = None
+    if has_data:
+        organization = sa.table(
+            'organization', sa.column('id', sa.Integer), sa.column('name', sa.String),
+            sa.column('storage', sa.String), sa.column('created_at', sa.DateTime),
+        )
+        bind.execute(organization.insert().values(name='Default', storage='shared', created_at=datetime.now(timezone.utc)))
+        default_id = bind.execute(sa.select(sa.func.max(organization.c.id))).scalar_one()
+        user = sa.table('user', sa.column('organization_id', sa.Integer))
+        bind.execute(user.update().values(organization_id=default_id))
+        for table in ['subscription', 'spendrollup', 'chargeevent']:
+            bind.execute(sa.table(table, sa.column('tenant_id', sa.Integer)).update().values(tenant_id=default_id))
+
+    # Created with the table, before migrations
+    has_name_index = 'ix_subscription_name' in {index['name'] for index in sa.inspect(bind).get_indexes('subscription')}
+    with op.batch_alter_table('subscription') as batch_op:
+        batch_op.alter_column('tenant_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.drop_index('ix_subscription_status_team')
+        batch_op.drop_index('ix_subscription_team_id')
+        batch_op.drop_index('ix_subscription_amount_id')
+        batch_op.drop_index('ix_subscription_vendor_key')
+        if has_name_index:
+            batch_op.drop_index('ix_subscription_name')
+        batch_op.create_index('ix_subscription_tenant_status_team', ['tenant_id', 'status', 'team', 'amount', 'seats_total', 'seats_unused'], unique=False)
+        batch_op.create_index('ix_subscription_tenant_id', ['tenant_id', 'id'], unique=False)
+        batch_op.create_index('ix_subscription_tenant_team_id', ['tenant_id', 'team', 'id'], unique=False)
+        batch_op.create_index('ix_subscription_tenant_amount_id', ['tenant_id', 'amount', 'id'], unique=False)
+        batch_op.create_index('ix_subscription_tenant_name_id', ['tenant_id', 'name', 'id'], unique=False)
+        batch_op.create_index('ix_subscription_tenant_vendor', ['tenant_id', 'vendor_key'], unique=False)
+
+    with op.batch_alter_table('spendrollup') as batch_op:
+        batch_op.alter_column('tenant_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.drop_constraint('uq_spendrollup_bucket_group', type_='unique')
+        batch_op.create_unique_constraint('uq_spendrollup_tenant_bucket_group', ['tenant_id', 'granularity', 'bucket', 'team', 'status'])
+
+    with op.batch_alter_table('chargeevent') as batch_op:
+        batch_op.alter_column('tenant_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.drop_index('ix_chargeevent_vendor_charged')
+        batch_op.create_index('ix_chargeevent_tenant_vendor_charged', ['tenant_id', 'vendor_key', 'charged_at'], unique=False)
+
+    # The vendor_key unique constraint has no portable name to drop, so the table is rebuilt
+    column_list = ', '.join(BILLINGPROFILE_COLUMNS)
+    _billingprofile_table(
+        'billingprofile_tenant',
+        sa.Column('tenant_id', sa.Integer(), nullable=False),
+        sa.UniqueConstraint('tenant_id', 'vendor_key', name='uq_billingprofile_tenant_vendor'),
+    )
+    if default_id is not None:
+        op.execute(
+            f'INSERT INTO billingprofile_tenant (tenant_id, {column_list}) '
+            f'SELECT {int(default_id)}, {column_list} FROM billingprofile'
+        )
+    op.drop_index(op.f('ix_billingprofile_price_changed_at'), table_name='billingprofile')
+    op.drop_index(op.f('ix_billingprofile_next_expected_at'), table_name='billingprofile')
+    op.drop_table('billingprofile')
+    op.rename_table('billingprofile_tenant', 'billingprofile')
+    op.create_index('ix_billingprofile_tenant_next_expected', 'billingprofile', ['tenant_id', 'next_expected_at'], unique=False)
+    op.create_index('ix_billingprofile_tenant_price_changed', 'billingprofile', ['tenant_id', 'price_changed_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Tenants collapse back into one workspace; vendors several tenants share fail the
+    # billingprofile copy, and dedicated schemas are left where they are
+    op.drop_index('ix_billingprofile_tenant_price_changed', table_name='billingprofile')
+    op.drop_index('ix_billingprofile_tenant_next_expected', table_name='billingprofile')
+    _billingprofile_table('billingprofile_shared', sa.UniqueConstraint('vendor_key'))
+    column_list = ', '.join(BILLINGPROFILE_COLUMNS)
+    op.execute(f'INSERT INTO billingprofile_shared ({column_list}) SELECT {column_list} FROM billingprofile')
+    op.drop_table('billingprofile')
+    op.rename_table('billingprofile_shared', 'billingprofile')
+    op.create_index(op.f('ix_billingprofile_next_expected_at'), 'billingprofile', ['next_expected_at'], unique=False)
+    op.create_index(op.f('ix_billingprofile_price_changed_at'), 'billingprofile', ['price_changed_at'], unique=False)
+
+    with op.batch_alter_table('chargeevent') as batch_op:
+        batch_op.drop_index('ix_chargeevent_tenant_vendor_charged')
+        batch_op.create_index('ix_chargeevent_vendor_charged', ['vendor_key', 'charged_at'], unique=False)
+        batch_op.drop_column('tenant_id')
+
+    # Rollups are rebuilt on the next write, per-tenant rows can't be folded back here
+    op.execute('DELETE FROM spendrollup')
+    with op.batch_alter_table('spendrollup') as batch_op:
+        batch_op.drop_constraint('uq_spendrollup_tenant_bucket_group', type_='unique')
+        batch_op.create_unique_constraint('uq_spendrollup_bucket_group', ['granularity', 'bucket', 'team', 'status'])
+        batch_op.drop_column('tenant_id')
+
+    with op.batch_alter_table('subscription') as batch_op:
+        batch_op.drop_index('ix_subscription_tenant_vendor')
+        batch_op.drop_index('ix_subscription_tenant_name_id')
+        batch_op.drop_index('ix_subscription_tenant_amount_id')
+        batch_op.drop_index('ix_subscription_tenant_team_id')
+        batch_op.drop_index('ix_subscription_tenant_id')
+        batch_op.drop_index('ix_subscription_tenant_status_team')
+        batch_op.create_index('ix_subscription_name', ['name'], unique=False)
+        batch_op.create_index('ix_subscription_vendor_key', ['vendor_key'], unique=False)
+        batch_op.create_index('ix_subscription_amount_id', ['amount', 'id'], unique=False)
+        batch_op.create_index('ix_subscription_team_id', ['team', 'id'], unique=False)
+        batch_op.create_index('ix_subscription_status_team', ['status', 'team', 'amount', 'seats_total', 'seats_unused'], unique=False)
+        batch_op.drop_column('tenant_id')
+
+    op.drop_index(op.f('ix_user_organization_id'), table_name='user')
+    op.drop_column('user', 'organization_id')
+    op.drop_table('organization')
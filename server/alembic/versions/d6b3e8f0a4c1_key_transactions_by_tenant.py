@@ -0,0 +1,66 @@
+"""Key transactions by tenant
+
+Revision ID: d6b3e8f0a4c1
+Revises: a9e4d1c7b352
+Create Date: 2026-10-18 22:41:09.715304
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6b3e8f0a4c1'
+down_revision: Union[str, Sequence[str], None] = 'a9e4d1c7b352'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+transaction = sa.table(
+    'transaction',
+    sa.column('id', sa.Integer),
+    sa.column('user_id', sa.Integer),
+    sa.column('tenant_id', sa.Integer),
+    sa.column('external_id', sa.String),
+)
+user = sa.table('user', sa.column('id', sa.Integer), sa.column('organization_id', sa.Integer))
+
+
+def _keep_newest(*columns):
+    """Delete all but the newest row of each group of transactions sharing columns."""
+    # Wrapped in a derived table, MySQL won't delete from a table its subquery reads
+    newest = sa.select(sa.func.max(transaction.c.id).label('id')).group_by(*columns).subquery()
+    op.execute(transaction.delete().where(transaction.c.id.not_in(sa.select(newest.c.id))))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Transactions belong to their importer's organization; ones of users without one go
+    op.add_column('transaction', sa.Column('tenant_id', sa.Integer(), nullable=True))
+    op.execute(transaction.update().values(
+        tenant_id=sa.select(user.c.organization_id).where(user.c.id == transaction.c.user_id).scalar_subquery()
+    ))
+    op.execute(transaction.delete().where(transaction.c.tenant_id.is_(None)))
+    # The same statement imported by two people in one organization is one set of transactions
+    _keep_newest(transaction.c.tenant_id, transaction.c.external_id)
+    with op.batch_alter_table('transaction') as batch_op:
+        batch_op.alter_column('tenant_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.drop_index('ix_transaction_user_merchant_posted')
+        batch_op.drop_constraint('uq_transaction_user_external', type_='unique')
+        batch_op.create_unique_constraint('uq_transaction_tenant_external', ['tenant_id', 'external_id'])
+        batch_op.create_index(
+            'ix_transaction_tenant_merchant_posted', ['tenant_id', 'merchant_key', 'posted_on'], unique=False
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('transaction') as batch_op:
+        batch_op.drop_index('ix_transaction_tenant_merchant_posted')
+        batch_op.drop_constraint('uq_transaction_tenant_external', type_='unique')
+        batch_op.drop_column('tenant_id')
+        batch_op.create_unique_constraint('uq_transaction_user_external', ['user_id', 'external_id'])
+        batch_op.create_index(
+            'ix_transaction_user_merchant_posted', ['user_id', 'merchant_key', 'posted_on'], unique=False
+        )
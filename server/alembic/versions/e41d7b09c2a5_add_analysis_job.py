@@ -0,0 +1,46 @@
+"""Add analysis job
+
+Revision ID: e41d7b09c2a5
+Revises: 3c9e1f7a2d64
+Create Date: 2026-10-18 16:40:12.902417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e41d7b09c2a5'
+down_revision: Union[str, Sequence[str], None] = '3c9e1f7a2d64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'analysisjob',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('service', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('status', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('analyzed_count', sa.Integer(), nullable=False),
+        sa.Column('recurring_vendors', sa.Integer(), nullable=False),
+        sa.Column('zombies_found', sa.Integer(), nullable=False),
+        sa.Column('potential_savings', sa.Float(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_analysisjob_user_id'), 'analysisjob', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_analysisjob_user_id'), table_name='analysisjob')
+    op.drop_table('analysisjob')
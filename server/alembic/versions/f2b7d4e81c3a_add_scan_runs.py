@@ -0,0 +1,43 @@
+"""Add scan runs
+
+Revision ID: f2b7d4e81c3a
+Revises: c4f81d2b6a90
+Create Date: 2026-10-18 19:12:40.553817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b7d4e81c3a'
+down_revision: Union[str, Sequence[str], None] = 'c4f81d2b6a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'scanrun',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('status', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('concurrency', sa.Integer(), nullable=False),
+        sa.Column('mailboxes', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.add_column('scanjob', sa.Column('run_id', sa.Integer(), nullable=True))
+    op.create_index(op.f('ix_scanjob_run_id'), 'scanjob', ['run_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_scanjob_run_id'), table_name='scanjob')
+    with op.batch_alter_table('scanjob') as batch_op:
+        batch_op.drop_column('run_id')
+    op.drop_table('scanrun')
@@ -1,20 +1,42 @@
+from typing import NamedTuple, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
-from sqlmodel import Session, select
-from app.core.database import get_session
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.cache import MemoryCache
+from app.core.config import settings
+from app.core.database import get_async_session
 from app.core.security import SECRET_KEY, ALGORITHM
+from app.core.tenancy import check_available, dedicated_async_engine
+from app.models.organization import Organization
 from app.models.user import User
+from app.services.vendor_index import VendorIndex, get_tenant_vendor_index
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl="/api/v1/auth/login"
 )
 
-def get_current_user(
-    session: Session = Depends(get_session),
+# Token subject (email) -> snapshots of the user row, without its password hash, and of
+# the user's organization. Per process, so another worker may serve a stale user or
+# tenant for up to PRINCIPAL_CACHE_TTL seconds after an update.
+principal_cache: Optional[MemoryCache] = (
+    MemoryCache(settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL) if settings.PRINCIPAL_CACHE_TTL > 0 else None
+)
+
+def invalidate_principal(subject: str):
+    if principal_cache:
+        principal_cache.delete(subject)
+
+class Principal(NamedTuple):
+    user: User
+    tenant: Optional[Organization]
+
+async def get_principal(
+    session: AsyncSession = Depends(get_async_session),
     token: str = Depends(reusable_oauth2)
-) -> User:
+) -> Principal:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         token_data = payload.get("sub")
@@ -23,18 +45,63 @@ def get_current_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = session.get(User, token_data) # Error: SQLModel get usually takes PK. My token sub is Email.
-    # Fix: Fetch by Email
-    
-    # Actually, let's look at auth.py again. I used `sub: user.email`.
-    # It is better to use `sub: user.id` in future, but for now email.
-    
-    user = session.exec(select(User).where(User.email == token_data)).first()
+
+    # Tokens carry the user's email as their subject
+    snapshot = principal_cache.get(token_data) if principal_cache else None
+    if snapshot is not None:
+        # Fresh, detached instances per request so no two requests share one object
+        tenant = snapshot["tenant"]
+        return Principal(User(**snapshot["user"]), Organization(**tenant) if tenant else None)
+
+    # The user's organization comes with it, in the same query
+    row = (await session.exec(
+        select(User, Organization)
+        .join(Organization, Organization.id == User.organization_id, isouter=True)
+        .where(User.email == token_data)
+    )).first()
     
-    if not user:
+    if not row:
          raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found",
         )
-    
-    return user
+
+    user, tenant = row
+    if principal_cache:
+        principal_cache.set(token_data, {
+            "user": user.model_dump(exclude={"hashed_password"}),
+            "tenant": tenant.model_dump() if tenant else None,
+        })
+    return Principal(user, tenant)
+
+async def get_current_user(principal: Principal = Depends(get_principal)) -> User:
+    return principal.user
+
+async def get_current_tenant(principal: Principal = Depends(get_principal)) -> Organization:
+    tenant = principal.tenant
+    if not tenant:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User does not belong to an organization",
+        )
+    # A tenant being moved between storages is answered with 503 (see main.py)
+    check_available(tenant)
+    return tenant
+
+async def get_tenant_vendors(
+    session: AsyncSession = Depends(get_async_session),
+    tenant: Organization = Depends(get_current_tenant)
+) -> VendorIndex:
+    """The vendor index with the current tenant's aliases, read from the shared database whatever its storage."""
+    return await session.run_sync(get_tenant_vendor_index, tenant.id)
+
+async def get_tenant_session(
+    session: AsyncSession = Depends(get_async_session),
+    tenant: Organization = Depends(get_current_tenant)
+):
+    """Session for the current tenant's rows: the request's own, or one on its dedicated schema."""
+    if tenant.storage != "dedicated":
+        yield session
+        return
+    async with AsyncSession(dedicated_async_engine(tenant.id), expire_on_commit=False) as dedicated:
+        yield dedicated
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import analytics, integrations, subscriptions, auth
+from app.api.v1.endpoints import analytics, integrations, subscriptions, auth, scans, transactions
 
 api_router = APIRouter()
 
@@ -7,3 +7,5 @@ api_router.include_router(analytics.router)
 api_router.include_router(integrations.router)
 api_router.include_router(subscriptions.router)
 api_router.include_router(auth.router)
+api_router.include_router(scans.router)
+api_router.include_router(transactions.router)
@@ -1,7 +1,12 @@
-from fastapi import APIRouter, Depends
-from sqlmodel import Session, select
-from app.core.database import get_session
-from app.models.subscription import Subscription
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import Annotated
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.api.deps import get_current_tenant, get_tenant_session
+from app.core.responses import ORJSONResponse
+from app.models.organization import Organization
+from app.schemas.analytics import TimeseriesQuery
+from app.services.analytics_service import get_cached_stats
+from app.services.rollup_service import get_timeseries
 
 router = APIRouter(
     prefix="/stats",
@@ -9,53 +14,31 @@ router = APIRouter(
 )
 
 @router.get("")
-def get_stats(session: Session = Depends(get_session)):
-    subscriptions = session.exec(select(Subscription)).all()
-    
-    total_spend = sum(sub.amount for sub in subscriptions if sub.status == "active")
-    
-    wasted_spend = 0
-    zombie_count = 0
-    active_fully_used = 0
-    active_with_waste = 0
-    zombie_count = 0
-    
-    for sub in subscriptions:
-        if sub.status == "active":
-            # Check if it has unused seats
-            if sub.seats_total > 0 and sub.seats_unused > 0:
-                active_with_waste += 1
-                seat_cost = sub.amount / sub.seats_total
-                wasted_spend += seat_cost * sub.seats_unused
-            else:
-                active_fully_used += 1
-                
-        elif sub.status in ["zombie", "critical"]:
-            zombie_count += 1
-            wasted_spend += sub.amount # Full amount is waste for zombies
-            
-    # Calculate health score (Mock logic for now based on waste ratio)
-    health_score = 100
-    if total_spend > 0:
-        waste_ratio = wasted_spend / (total_spend + wasted_spend)
-        health_score = max(0, 100 - int(waste_ratio * 100))
-    # Calculate Spend by Team
-    spend_by_team = {}
-    for sub in subscriptions:
-        if sub.status == "active":
-            team = sub.team or "Unassigned"
-            spend_by_team[team] = spend_by_team.get(team, 0) + sub.amount
-            
-    # Sort by spend desc
-    sorted_teams = [{"team": k, "amount": v} for k, v in sorted(spend_by_team.items(), key=lambda item: item[1], reverse=True)]
+async def get_stats(
+    request: Request,
+    session: AsyncSession = Depends(get_tenant_session),
+    tenant: Organization = Depends(get_current_tenant)
+):
+    stats, etag = await session.run_sync(get_cached_stats, tenant.id)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    # Browsers may send a list of tags, and weak (W/) ones after compression
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return ORJSONResponse(stats, headers=headers)
 
-    return {
-        "total_spend": total_spend,
-        "wasted_spend": wasted_spend,
-        "active_subs": active_fully_used + active_with_waste,
-        "active_fully_used": active_fully_used,
-        "active_with_waste": active_with_waste,
-        "zombie_count": zombie_count,
-        "health_score": health_score,
-        "spend_by_team": sorted_teams
-    }
+@router.get("/timeseries")
+async def get_stats_timeseries(
+    params: Annotated[TimeseriesQuery, Query()],
+    session: AsyncSession = Depends(get_tenant_session),
+    tenant: Organization = Depends(get_current_tenant)
+):
+    try:
+        timeseries = await session.run_sync(
+            lambda sync_session: get_timeseries(
+                sync_session, tenant.id, params.granularity, params.start, params.end, params.group_by
+            )
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ORJSONResponse(timeseries)
@@ -1,17 +1,20 @@
-from fastapi import APIRouter, HTTPException, Depends
+import asyncio
+from fastapi import APIRouter, HTTPException, Depends, Query
 from fastapi.responses import RedirectResponse
-from googleapiclient.discovery import build
+from starlette.concurrency import run_in_threadpool
 
-from sqlmodel import Session, select
-from app.core.database import get_session
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.database import get_async_session
+from app.models.organization import Organization
 from app.models.user import User
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, invalidate_principal
 from app.schemas.auth import LoginRequest, RegisterRequest, Token
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.core.security import verify_password_async, get_password_hash_async, create_access_token
 from app.core.config import settings
-
-from app.core import google_auth
 from app.models.oauth import OAuthToken
+from app.models.scan_job import ScanJob
+from app.services import scan_jobs
 
 import logging
 
@@ -23,18 +26,26 @@ router = APIRouter(
 logger = logging.getLogger(__name__)
 
 @router.post("/register", response_model=Token)
-def register(request: RegisterRequest, session: Session = Depends(get_session)):
+async def register(request: RegisterRequest, session: AsyncSession = Depends(get_async_session)):
     # Check if user exists
-    existing_user = session.exec(select(User).where(User.email == request.email)).first()
+    existing_user = (await session.exec(select(User).where(User.email == request.email))).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
+    # Hand the connection back to the pool while bcrypt runs (its own bounded pool, see app/core/security.py)
+    await session.close()
     
-    # Create new user
-    hashed_password = get_password_hash(request.password)
-    new_user = User(email=request.email, full_name=request.full_name, hashed_password=hashed_password)
+    # Create new user, in an organization of their own
+    hashed_password = await get_password_hash_async(request.password)
+    organization = Organization(name=request.full_name or request.email)
+    session.add(organization)
+    await session.flush()
+    new_user = User(
+        email=request.email, full_name=request.full_name, hashed_password=hashed_password,
+        organization_id=organization.id
+    )
     session.add(new_user)
-    session.commit()
-    session.refresh(new_user)
+    await session.commit()
+    await session.refresh(new_user)
     
     # Create token
     access_token = create_access_token(data={"sub": new_user.email})
@@ -45,12 +56,14 @@ def register(request: RegisterRequest, session: Session = Depends(get_session)):
     }
 
 @router.post("/login", response_model=Token)
-def login(request: LoginRequest, session: Session = Depends(get_session)):
-    user = session.exec(select(User).where(User.email == request.email)).first()
+async def login(request: LoginRequest, session: AsyncSession = Depends(get_async_session)):
+    user = (await session.exec(select(User).where(User.email == request.email))).first()
     if not user:
         raise HTTPException(status_code=401, detail="Account not found. Please register first.")
+    # Don't hold a pooled connection while queued for bcrypt
+    await session.close()
         
-    if not verify_password(request.password, user.hashed_password):
+    if not await verify_password_async(request.password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Incorrect password")
     
     access_token = create_access_token(data={"sub": user.email})
@@ -61,46 +74,49 @@ def login(request: LoginRequest, session: Session = Depends(get_session)):
     }
 
 @router.get("/google/login")
-def login_google():
+async def login_google():
+    # The Google client libraries take a noticeable share of startup to import, so they
+    # are loaded by the first request that needs them
+    from app.core import google_auth
+
     authorization_url = google_auth.get_authorization_url()
     return RedirectResponse(url=authorization_url)
 
 @router.get("/google/callback")
-def callback_google(code: str, session: Session = Depends(get_session)):
-    credentials = google_auth.get_credentials_from_code(code)
+async def callback_google(code: str, session: AsyncSession = Depends(get_async_session)):
+    from app.core import google_auth
+    from app.services.gmail_client import build_service, store_credentials
+
+    # The Google client libraries are blocking HTTP, run them in the threadpool
+    credentials = await run_in_threadpool(google_auth.get_credentials_from_code, code)
     
-    # Get User Info
-    service = build('oauth2', 'v2', credentials=credentials)
-    user_info = service.userinfo().get().execute()
+    # Get User Info. Building the service parses its discovery document, keep that off the loop too
+    service = await run_in_threadpool(build_service, 'oauth2', 'v2', credentials)
+    user_info = await run_in_threadpool(service.userinfo().get().execute)
     email = user_info['email']
     name = user_info.get('name', '')
     
     # Check if user exists
-    user = session.exec(select(User).where(User.email == email)).first()
+    user = (await session.exec(select(User).where(User.email == email))).first()
     if not user:
         # Create new user
-        hashed_password = get_password_hash("google_oauth_" + email) # Placeholder
-        user = User(email=email, full_name=name, hashed_password=hashed_password)
+        hashed_password = await get_password_hash_async("google_oauth_" + email) # Placeholder
+        organization = Organization(name=name or email)
+        session.add(organization)
+        await session.flush()
+        user = User(email=email, full_name=name, hashed_password=hashed_password, organization_id=organization.id)
         session.add(user)
-        session.commit()
-        session.refresh(user)
+        await session.commit()
+        await session.refresh(user)
     
     # Save OAuth Token
-    oauth_token = session.exec(select(OAuthToken).where(OAuthToken.user_id == user.id)).first()
+    oauth_token = (await session.exec(select(OAuthToken).where(OAuthToken.user_id == user.id))).first()
     if not oauth_token:
-        oauth_token = OAuthToken(
-            user_id=user.id,
-            access_token=credentials.token,
-            refresh_token=credentials.refresh_token
-        )
-        session.add(oauth_token)
-    else:
-        oauth_token.access_token = credentials.token
-        if credentials.refresh_token:
-            oauth_token.refresh_token = credentials.refresh_token
-        session.add(oauth_token)
+        oauth_token = OAuthToken(user_id=user.id, access_token=credentials.token)
+    store_credentials(oauth_token, credentials)
+    session.add(oauth_token)
     
-    session.commit()
+    await session.commit()
     
     # Create JWT
     access_token = create_access_token(data={"sub": user.email})
@@ -108,20 +124,37 @@ def callback_google(code: str, session: Session = Depends(get_session)):
     # Redirect to Frontend Callback
     return RedirectResponse(url=f"{settings.FRONTEND_URL}/google-callback?token={access_token}&user={name}")
 
+# How often the legacy scan endpoint checks on its job
+SCAN_POLL_INTERVAL = 1.0
+
 @router.get("/google/scan")
-def scan_google(session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
-    # Find token
-    token = session.exec(select(OAuthToken).where(OAuthToken.user_id == current_user.id)).first()
+async def scan_google(
+    max_messages: int = Query(default=settings.SCAN_MAX_MESSAGES, ge=1, le=50000),
+    horizon_days: int = Query(default=settings.SCAN_HORIZON_DAYS, ge=1, le=3650),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    The blocking form of POST /scans, for clients that predate it: the scan runs as a job
+    on the scan workers, joining one already in flight, and this waits for it to finish.
+    """
+    token = (await session.exec(select(OAuthToken).where(OAuthToken.user_id == current_user.id))).first()
     if not token:
         raise HTTPException(status_code=400, detail="Gmail not connected")
-    
-    from app.services.gmail_scanner import scan_gmail_for_subscriptions
-    results = scan_gmail_for_subscriptions(token, session)
-    
-    return {"status": "success", "found": len(results), "subscriptions": results}
+    await session.close()
+
+    job = await run_in_threadpool(scan_jobs.enqueue_user_scan, current_user.id, max_messages, horizon_days)
+    while job.status in ("queued", "running"):
+        await asyncio.sleep(SCAN_POLL_INTERVAL)
+        job = await session.get(ScanJob, job.id, populate_existing=True)
+        # Don't hold a pooled connection between polls
+        await session.close()
+    if job.status != "succeeded":
+        raise HTTPException(status_code=502, detail=job.error or "Scan failed")
+    return {"status": "success", "found": job.subscriptions_found, "job_id": job.id}
 
 @router.get("/connections")
-def get_connections(session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
+async def get_connections(session: AsyncSession = Depends(get_async_session), current_user: User = Depends(get_current_user)):
     connections = {
         "google": False,
         "quickbooks": False,
@@ -129,7 +162,7 @@ def get_connections(session: Session = Depends(get_session), current_user: User
     }
     
     # Check Google
-    google_token = session.exec(select(OAuthToken).where(OAuthToken.user_id == current_user.id)).first()
+    google_token = (await session.exec(select(OAuthToken).where(OAuthToken.user_id == current_user.id))).first()
     logger.info(f"Checking connections for user {current_user.email} (ID: {current_user.id})")
     if google_token:
         logger.info(f"Found Google Token for user {current_user.id}")
@@ -143,20 +176,24 @@ def get_connections(session: Session = Depends(get_session), current_user: User
 from app.schemas.auth import UserUpdate
 
 @router.put("/me", response_model=Token)
-def update_user(request: UserUpdate, session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
-    user = session.get(User, current_user.id)
+async def update_user(request: UserUpdate, session: AsyncSession = Depends(get_async_session), current_user: User = Depends(get_current_user)):
+    # Hash before touching the database, so no connection is held while bcrypt runs
+    hashed_password = await get_password_hash_async(request.password) if request.password else None
+
+    user = await session.get(User, current_user.id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     if request.full_name:
         user.full_name = request.full_name
     
-    if request.password:
-        user.hashed_password = get_password_hash(request.password)
+    if hashed_password:
+        user.hashed_password = hashed_password
 
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await session.refresh(user)
+    invalidate_principal(user.email)
 
     # Return new token/info
     return {
@@ -1,6 +1,12 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.api.deps import get_current_user
+from app.core.database import get_async_session
+from app.models.analysis_job import AnalysisJob
+from app.models.user import User
 from app.schemas.integration import IntegrationRequest
-import time
+from app.services.accounting_connectors import ConnectorError, get_connector
+from app.services.integration_analysis import enqueue_analysis
 
 router = APIRouter(
     prefix="/integrations",
@@ -8,17 +14,32 @@ router = APIRouter(
 )
 
 @router.post("/connect")
-def connect_integration(request: IntegrationRequest):
-    time.sleep(1.5)
-    if "error" in request.apiKey:
-        raise HTTPException(status_code=400, detail="Invalid API Key or Connection Failed")
+async def connect_integration(request: IntegrationRequest, current_user: User = Depends(get_current_user)):
+    try:
+        await get_connector(request.service).verify(request.apiKey)
+    except ConnectorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     return {"status": "connected", "service": request.service}
 
-@router.post("/analyze")
-def analyze_subscriptions():
-    time.sleep(2)
-    return {
-        "analyzed_count": 142,
-        "zombies_found": 12,
-        "potential_savings": 3240
-    }
+@router.post("/analyze", response_model=AnalysisJob, status_code=202)
+async def analyze_subscriptions(
+    request: IntegrationRequest,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user)
+):
+    try:
+        get_connector(request.service)
+    except ConnectorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    return await enqueue_analysis(session, current_user.id, request.service, request.apiKey)
+
+@router.get("/analyze/{job_id}", response_model=AnalysisJob)
+async def get_analysis(
+    job_id: int,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user)
+):
+    job = await session.get(AnalysisJob, job_id)
+    if not job or job.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    return job
@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.database import get_async_session
+from app.api.deps import get_current_user
+from app.models.user import User
+from app.models.oauth import OAuthToken
+from app.models.scan_job import ScanJob
+from app.schemas.scan import ScanRequest
+from app.services import scan_jobs
+
+router = APIRouter(
+    prefix="/scans",
+    tags=["scans"]
+)
+
+@router.post("", response_model=ScanJob, status_code=202)
+async def create_scan(
+    request: Optional[ScanRequest] = None,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user)
+):
+    token = (await session.exec(select(OAuthToken).where(OAuthToken.user_id == current_user.id))).first()
+    if not token:
+        raise HTTPException(status_code=400, detail="Gmail not connected")
+    await session.close()
+
+    request = request or ScanRequest()
+    # Sync SQLAlchemy, and it hands the job to the worker pool
+    return await run_in_threadpool(
+        scan_jobs.enqueue_user_scan,
+        current_user.id,
+        request.max_messages or settings.SCAN_MAX_MESSAGES,
+        request.horizon_days or settings.SCAN_HORIZON_DAYS,
+    )
+
+@router.get("/{job_id}", response_model=ScanJob)
+async def get_scan(
+    job_id: int, session: AsyncSession = Depends(get_async_session), current_user: User = Depends(get_current_user)
+):
+    job = await session.get(ScanJob, job_id)
+    if not job or job.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Scan not found")
+    return job
@@ -1,29 +1,158 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
-from sqlmodel import Session
-from app.core.database import get_session
+import csv
+import io
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Annotated, Callable, List, Optional, Union
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.api.deps import get_current_tenant, get_tenant_session, get_tenant_vendors
+from app.core.responses import ORJSONResponse
+from app.models.organization import Organization
 from app.models.subscription import Subscription
-from app.services.subscription_service import SubscriptionService
+from app.schemas.subscription import (
+    BulkResult, SubscriptionExportQuery, SubscriptionHistory, SubscriptionListQuery, SubscriptionPage
+)
+from app.services import export_service
+from app.services.subscription_service import SubscriptionService, prepare_bulk_create, prepare_bulk_update
+from app.services.vendor_index import VendorIndex
 
 router = APIRouter(
     prefix="/subscriptions",
     tags=["subscriptions"]
 )
 
-def get_service(session: Session = Depends(get_session)) -> SubscriptionService:
-    return SubscriptionService(session)
+async def run_service(
+    session: AsyncSession, tenant: Organization, call: Callable[[SubscriptionService], object],
+    vendors: Optional[VendorIndex] = None
+):
+    # SubscriptionService is plain sync SQLAlchemy; run_sync drives it through the async driver
+    # on the event loop, so no threadpool worker is held while the database works. Routes that
+    # key names pass the tenant's vendor index, the session may be on a dedicated schema.
+    return await session.run_sync(lambda sync_session: call(SubscriptionService(sync_session, tenant.id, vendors)))
+
+MAX_BULK_ROWS = 50_000
+
+def parse_bulk_rows(body: bytes, content_type: str) -> list:
+    if content_type.startswith("text/csv"):
+        reader = csv.DictReader(io.StringIO(body.decode("utf-8-sig")))
+        # Blank cells fall back to the field default instead of failing validation
+        rows = [{key.strip(): value for key, value in row.items() if key and value not in ("", None)} for row in reader]
+    else:
+        try:
+            rows = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or a text/csv upload")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or a text/csv upload")
+    if len(rows) > MAX_BULK_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_ROWS} rows per request")
+    return rows
+
+async def read_bulk_rows(request: Request) -> list:
+    """Rows from a JSON array body, or from a CSV upload sent as text/csv (header row = field names)."""
+    body = await request.body()
+    # Up to MAX_BULK_ROWS rows to decode, off the event loop
+    return await run_in_threadpool(parse_bulk_rows, body, request.headers.get("content-type", ""))
+
+def bulk_response(result: BulkResult, partial: bool):
+    # All-or-nothing batches that were rejected come back as 422 with the per-row errors
+    if result.failed and not partial:
+        return JSONResponse(status_code=422, content=result.model_dump())
+    return result
+
+# response_model documents the shapes; the rows come from the database as plain values
+# and are written out by ORJSONResponse as they are
+@router.get("", response_model=Union[SubscriptionPage, List[Subscription]])
+async def get_subscriptions(
+    params: Annotated[SubscriptionListQuery, Query()],
+    session: AsyncSession = Depends(get_tenant_session),
+    tenant: Organization = Depends(get_current_tenant)
+):
+    if params.all:
+        return ORJSONResponse(await run_service(session, tenant, lambda service: service.get_all(params)))
 
-@router.get("", response_model=List[Subscription])
-def get_subscriptions(service: SubscriptionService = Depends(get_service)):
-    return service.get_all()
+    fields = [name.strip() for name in params.fields.split(",") if name.strip()] if params.fields else None
+    try:
+        items, next_cursor = await run_service(
+            session, tenant, lambda service: service.list_page(params, params.sort, params.cursor, params.limit, fields)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ORJSONResponse({"items": items, "next_cursor": next_cursor})
+
+@router.get("/export")
+async def export_subscriptions(
+    params: Annotated[SubscriptionExportQuery, Query()],
+    tenant: Organization = Depends(get_current_tenant)
+):
+    if params.format == "parquet" and not export_service.parquet_available():
+        raise HTTPException(status_code=400, detail="Parquet export needs pyarrow installed on the server")
+    return StreamingResponse(
+        export_service.WRITERS[params.format](tenant, params),
+        media_type=export_service.MEDIA_TYPES[params.format],
+        headers={"Content-Disposition": f'attachment; filename="subscriptions.{params.format}"'}
+    )
 
 @router.post("", response_model=Subscription)
-def create_subscription(subscription: Subscription, service: SubscriptionService = Depends(get_service)):
-    return service.create(subscription)
+async def create_subscription(
+    subscription: Subscription,
+    session: AsyncSession = Depends(get_tenant_session),
+    tenant: Organization = Depends(get_current_tenant),
+    vendors: VendorIndex = Depends(get_tenant_vendors)
+):
+    return await run_service(session, tenant, lambda service: service.create(subscription), vendors)
+
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_create_subscriptions(
+    rows: list = Depends(read_bulk_rows),
+    partial: bool = False,
+    session: AsyncSession = Depends(get_tenant_session),
+    tenant: Organization = Depends(get_current_tenant),
+    vendors: VendorIndex = Depends(get_tenant_vendors)
+):
+    # Validating and keying the rows is the CPU-heavy part: done in a worker thread, so only
+    # the writes run on the event loop
+    prepared = await run_in_threadpool(prepare_bulk_create, rows, tenant.id, vendors, partial)
+    return bulk_response(
+        await run_service(session, tenant, lambda service: service.bulk_create(rows, partial, prepared), vendors), partial
+    )
+
+@router.patch("/bulk", response_model=BulkResult)
+async def bulk_update_subscriptions(
+    rows: list = Depends(read_bulk_rows),
+    partial: bool = False,
+    session: AsyncSession = Depends(get_tenant_session),
+    tenant: Organization = Depends(get_current_tenant),
+    vendors: VendorIndex = Depends(get_tenant_vendors)
+):
+    prepared = await run_in_threadpool(prepare_bulk_update, rows, vendors)
+    return bulk_response(
+        await run_service(session, tenant, lambda service: service.bulk_update(rows, partial, prepared), vendors), partial
+    )
+
+@router.get("/{sub_id}/history", response_model=SubscriptionHistory)
+async def get_subscription_history(
+    sub_id: int,
+    limit: int = Query(default=100, ge=1, le=1000),
+    session: AsyncSession = Depends(get_tenant_session),
+    tenant: Organization = Depends(get_current_tenant)
+):
+    history = await run_service(session, tenant, lambda service: service.history(sub_id, limit))
+    if not history:
+        raise HTTPException(status_code=404, detail="Subscription not found")
+    return history
 
 @router.patch("/{sub_id}", response_model=Subscription)
-def update_subscription(sub_id: int, subscription: Subscription, service: SubscriptionService = Depends(get_service)):
-    updated_sub = service.update(sub_id, subscription.model_dump(exclude_unset=True))
+async def update_subscription(
+    sub_id: int,
+    subscription: Subscription,
+    session: AsyncSession = Depends(get_tenant_session),
+    tenant: Organization = Depends(get_current_tenant),
+    vendors: VendorIndex = Depends(get_tenant_vendors)
+):
+    data = subscription.model_dump(exclude_unset=True)
+    updated_sub = await run_service(session, tenant, lambda service: service.update(sub_id, data), vendors)
     if not updated_sub:
         raise HTTPException(status_code=404, detail="Subscription not found")
     return updated_sub
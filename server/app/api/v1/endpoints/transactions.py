@@ -0,0 +1,74 @@
+import os
+import tempfile
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import Literal
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from app.api.deps import get_current_user
+from app.core.config import settings
+from app.core.database import get_async_session
+from app.models.transaction import TransactionImport
+from app.models.user import User
+from app.services import transaction_ingest
+
+# Upload bytes gathered per disk write, each one a trip to the threadpool
+UPLOAD_WRITE_BYTES = 1024 * 1024
+
+router = APIRouter(
+    prefix="/transactions",
+    tags=["transactions"]
+)
+
+@router.post("/imports", response_model=TransactionImport, status_code=202)
+async def import_transactions(
+    request: Request,
+    format: Literal["csv", "ofx", "qbo"] = Query(default="csv"),
+    charges_positive: bool = Query(default=False, description="Card exports that list charges as positive amounts"),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Import a bank/card statement sent as the raw request body (CSV, OFX or QBO).
+    The body is spooled to disk as it arrives and parsed in the background; poll the returned job.
+    """
+    fd, path = tempfile.mkstemp(prefix="statement-", suffix=f".{format}")
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            # Disk writes block, so they run in the threadpool a buffer at a time rather than on the loop
+            buffer, buffered = [], 0
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > settings.INGEST_MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail="Statement file is too large")
+                buffer.append(chunk)
+                buffered += len(chunk)
+                if buffered >= UPLOAD_WRITE_BYTES:
+                    await run_in_threadpool(f.write, b"".join(buffer))
+                    buffer, buffered = [], 0
+            if buffer:
+                await run_in_threadpool(f.write, b"".join(buffer))
+        if not size:
+            raise HTTPException(status_code=400, detail="Empty statement file")
+
+        job = TransactionImport(user_id=current_user.id, format=format, bytes_total=size)
+        session.add(job)
+        await session.commit()
+        await session.refresh(job)
+    except BaseException:
+        os.remove(path)
+        raise
+
+    transaction_ingest.enqueue_import(job.id, path, charges_positive)
+    return job
+
+@router.get("/imports/{job_id}", response_model=TransactionImport)
+async def get_import(
+    job_id: int,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user)
+):
+    job = await session.get(TransactionImport, job_id)
+    if not job or job.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return job
@@ -0,0 +1,83 @@
+import json
+import logging
+import time
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class MemoryCache:
+    """Per-process LRU with a TTL. Fine for a single worker, each worker keeps its own copy."""
+
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[dict]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            return self._get(key)
+
+    def set(self, key: str, value: dict):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+class RedisCache:
+    """
+    Shared cache for multi-worker deployments, any Redis-compatible server works
+    (Redis, Valkey, KeyDB, Dragonfly). Needs the `redis` package.
+    """
+
+    def __init__(self, url: str, ttl: int):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("A Redis cache URL is set but the 'redis' package is not installed") from e
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[dict]:
+        raw = self.client.get(key)
+        return json.loads(raw) if raw else None
+
+    def set(self, key: str, value: dict):
+        self.client.set(key, json.dumps(value), ex=self.ttl)
+
+    def delete(self, key: str):
+        self.client.delete(key)
+
+@lru_cache(maxsize=1)
+def get_cache():
+    url = settings.STATS_CACHE_URL or settings.REDIS_URL
+    if url:
+        return RedisCache(url, settings.STATS_CACHE_TTL)
+    if settings.WORKERS > 1:
+        # Invalidations only reach the worker that made the change
+        logger.warning(
+            f"Dashboard stats are cached per worker with WORKERS={settings.WORKERS}: after a change, the "
+            f"other workers serve stale stats for up to {settings.STATS_CACHE_TTL}s. Set STATS_CACHE_URL "
+            f"or REDIS_URL to share one cache."
+        )
+    return MemoryCache(settings.STATS_CACHE_SIZE, settings.STATS_CACHE_TTL)
@@ -0,0 +1,80 @@
+"""
+Response compression, brotli or gzip by what the client accepts.
+
+Starlette's GZipMiddleware compresses at level 9, which on a 9MB subscription listing
+costs about 5x the CPU of level 6 for 6% less output. Here gzip runs at level 6 and,
+when the client accepts it and the brotli package is installed, brotli at quality 4:
+smaller than gzip 9 for less CPU than gzip 6. Bodies under minimum_size go out as they
+are, and large ones are compressed off the event loop as Starlette does for gzip.
+
+BrotliResponder overrides GZipResponder._compress_body, which is not public API, so
+requirements.txt pins starlette to the minor release this was tested against.
+"""
+from typing import Optional
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def negotiate(accept_encoding: str, available: tuple[str, ...]) -> Optional[str]:
+    """The available encoding the client weighs highest (the first of equals), or None for identity."""
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        coding, quality = coding.strip(), 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            weights[coding] = quality
+    best, best_quality = None, 0.0
+    for coding in available:
+        quality = weights.get(coding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+class BrotliResponder(GZipResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int, **kwargs):
+        super().__init__(app, minimum_size, **kwargs)
+        self.quality = quality
+        self._brotli = None
+
+    def _compress_body(self, body: bytes, more_body: bool) -> bytes:
+        if self._brotli is None:
+            self._brotli = brotli.Compressor(quality=self.quality)
+        if more_body:
+            return self._brotli.process(body) + self._brotli.flush()
+        return self._brotli.process(body) + self._brotli.finish()
+
+class CompressionMiddleware(GZipMiddleware):
+    def __init__(self, app: ASGIApp, minimum_size: int = 1000, compresslevel: int = 6, brotli_quality: int = 4):
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.brotli_quality = brotli_quality
+        self.encodings = ("br", "gzip") if brotli is not None else ("gzip",)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        options = dict(
+            thread_minimum_size=self.thread_minimum_size, exclude_content_types=self.exclude_content_types
+        )
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding == "br":
+            responder = BrotliResponder(self.app, self.minimum_size, self.brotli_quality, **options)
+        elif encoding == "gzip":
+            responder = GZipResponder(self.app, self.minimum_size, self.compresslevel, **options)
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size, exclude_content_types=self.exclude_content_types)
+        await responder(scope, receive, send)
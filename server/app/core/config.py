@@ -6,13 +6,70 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "SaaS Reaper API"
     API_V1_STR: str = "/api/v1"
     DATABASE_URL: str = "sqlite:///./database.db"
+    # Run pending Alembic migrations when a worker starts (app/core/schema.py); off when
+    # deploys run `alembic upgrade head` themselves, and workers refuse an old schema
+    SCHEMA_AUTO_MIGRATE: bool = True
     
     # Google OAuth
     GOOGLE_CLIENT_ID: str = ""
     GOOGLE_CLIENT_SECRET: str = ""
     GOOGLE_REDIRECT_URI: str = "http://localhost:8000/api/v1/auth/google/callback"
+
+    # Gmail scanning: per-pass message budget and how far back a full scan looks
+    SCAN_MAX_MESSAGES: int = 1000
+    SCAN_HORIZON_DAYS: int = 365
+    # Background scan worker threads per API process
+    SCAN_WORKERS: int = 4
+    # Nightly rescans (app/services/scan_orchestrator.py): mailboxes scanned at once, Gmail
+    # quota units each user may spend per second (Gmail allows 250, 0 = unthrottled), and
+    # retries of a request answered with 429/5xx
+    SCAN_ORCHESTRATOR_CONCURRENCY: int = 8
+    GMAIL_USER_QUOTA_UNITS: int = 250
+    GMAIL_MAX_RETRIES: int = 5
+
+    # Dashboard stats cache: a Redis-compatible URL (redis://...) so every worker shares
+    # one copy, REDIS_URL when that is unset, else an in-process LRU per worker. WORKERS
+    # is how many API processes the deployment runs, to warn when their LRUs would
+    # disagree
+    STATS_CACHE_URL: str | None = None
+    REDIS_URL: str | None = None
+    WORKERS: int = 1
+    STATS_CACHE_TTL: int = 300
+    STATS_CACHE_SIZE: int = 1024
+
+    # Password hashing: bcrypt cost, dedicated worker threads, and how many hashes may
+    # queue behind them before requests are turned away with 503
+    PASSWORD_HASH_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    # Authenticated-user cache, keyed by token subject (0 TTL disables it)
+    PRINCIPAL_CACHE_TTL: int = 60
+    PRINCIPAL_CACHE_SIZE: int = 10000
+
+    # Accounting integrations (QuickBooks, Xero): API roots, per-request timeout in
+    # seconds, and retries on 429/5xx/network errors
+    QUICKBOOKS_API_URL: str = "https://quickbooks.api.intuit.com"
+    XERO_API_URL: str = "https://api.xero.com"
+    INTEGRATION_TIMEOUT: float = 10.0
+    INTEGRATION_MAX_RETRIES: int = 3
+
+    # Transaction imports: parser processes (0 = one per CPU core), bytes of the statement
+    # file each one parses at a time, and the largest upload accepted
+    INGEST_WORKERS: int = 0
+    INGEST_CHUNK_BYTES: int = 4 * 1024 * 1024
+    INGEST_MAX_UPLOAD_BYTES: int = 8 * 1024 * 1024 * 1024
+
+    # Spend rollups: daily buckets older than this are folded into their month (0 keeps
+    # them all), and how often each API process runs that compaction (0 = never, e.g.
+    # when a cron job does it)
+    ROLLUP_DAILY_RETENTION_DAYS: int = 400
+    ROLLUP_COMPACT_INTERVAL: int = 3600
     
     # Monitoring
+    # Prometheus metrics at /metrics (app/core/metrics.py), and a logged profile of every
+    # request slower than SLOW_REQUEST_PROFILE_MS (0 = off; needs the pyinstrument package)
+    METRICS_ENABLED: bool = True
+    SLOW_REQUEST_PROFILE_MS: int = 0
     SENTRY_DSN: str | None = None
     WEBHOOK_URL: str | None = None
     
@@ -1,5 +1,8 @@
-from sqlmodel import SQLModel, create_engine, Session
+from functools import lru_cache
+from sqlalchemy.engine import make_url
+from sqlmodel import create_engine, Session
 
+from app.core import metrics
 from app.core.config import settings
 
 # Create engine based on configuration
@@ -16,9 +19,73 @@ engine = create_engine(
     max_overflow=20      # Allow up to 20 extra connections during spikes
 )
 
-def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
+if settings.METRICS_ENABLED:
+    metrics.instrument_engines()
 
 def get_session():
     with Session(engine) as session:
         yield session
+
+# Async driver per backend, swapped into DATABASE_URL for the async engine
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+    "mysql": "aiomysql",
+}
+
+def async_database_url(url: str) -> str:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise NotImplementedError(f"No async driver configured for {backend}")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+@lru_cache(maxsize=1)
+def get_async_engine():
+    # Built on first use, so sync-only processes (scan workers, scripts) never import the async drivers
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = async_database_url(str(settings.DATABASE_URL))
+    # Same pool limits as the sync engine
+    return create_async_engine(url, pool_pre_ping=True, pool_recycle=300, pool_size=10, max_overflow=20)
+
+async def get_async_session():
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+    # expire_on_commit=False: attributes stay loaded after commit, lazy refreshes can't be awaited
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        yield session
+
+# Rows per executemany call
+UPSERT_CHUNK_SIZE = 5000
+
+def upsert_rows(session: Session, model, rows: list[dict], index_elements: list[str], update_columns: list[str]):
+    """
+    INSERT rows into model's table, updating update_columns where index_elements already exist.
+    Uses ON CONFLICT on SQLite/Postgres and ON DUPLICATE KEY UPDATE on MySQL. The statement is
+    compiled once and run as an executemany; compiling a multi-row VALUES per chunk cost far
+    more than the database work.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+    else:
+        raise NotImplementedError(f"upsert is not supported on {dialect}")
+
+    stmt = insert(table)
+    if dialect == "mysql":
+        stmt = stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in update_columns})
+    else:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={c: stmt.excluded[c] for c in update_columns}
+        )
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        session.execute(stmt, rows[start:start + UPSERT_CHUNK_SIZE])
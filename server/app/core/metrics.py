@@ -0,0 +1,254 @@
+"""
+Process metrics, served in Prometheus text format at /metrics.
+
+Counters and histograms live in this process's registry; with several API workers each
+one serves its own, so scrape them per worker (or run one). What is recorded:
+
+- per-route request counts and latency, by the route's path template, from
+  MetricsMiddleware
+- every SQL statement's duration, and each request's query count and time in the
+  database, from SQLAlchemy engine events
+- scanner phase times (list, fetch, parse, upsert) and Gmail calls by endpoint and status
+
+With METRICS_ENABLED off the middleware and engine events are never installed and the
+scanner's PhaseTimer does nothing; only the Gmail call counters, one per network call,
+keep counting.
+SLOW_REQUEST_PROFILE_MS turns on pyinstrument (an optional dependency) for every
+request and logs the profile of those slower than that.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+PHASE_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: dict[tuple[str, ...], float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            self._values[key] += amount
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_labels(self.labels, key)} {value:g}"
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        # Per label set: observations per bucket (the last one is +Inf), sum
+        self._values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels[name]) for name in self.labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            values = [(key, list(counts), total[0]) for key, (counts, total) in self._values.items()]
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                yield f"{self.name}_bucket{_labels((*self.labels, 'le'), (*key, le))} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, key)} {total:g}"
+            yield f"{self.name}_count{_labels(self.labels, key)} {cumulative}"
+
+HTTP_REQUESTS = Counter("http_requests_total", "Requests handled, by route and status.", ("method", "route", "status"))
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "Request latency by route.", ("method", "route"))
+HTTP_DB_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements run per request.", ("method", "route"), COUNT_BUCKETS
+)
+HTTP_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Time per request spent in SQL statements.", ("method", "route"), LATENCY_BUCKETS
+)
+DB_QUERY_SECONDS = Histogram("db_query_duration_seconds", "Duration of every SQL statement.", (), QUERY_BUCKETS)
+SCAN_PHASE_SECONDS = Histogram(
+    "scan_phase_seconds", "Time per Gmail scan spent in each phase.", ("phase",), PHASE_BUCKETS
+)
+GMAIL_CALLS = Counter("gmail_api_calls_total", "Gmail API calls (batched ones counted singly), by endpoint and status.",
+                      ("endpoint", "status"))
+
+REGISTRY = [HTTP_REQUESTS, HTTP_LATENCY, HTTP_DB_QUERIES, HTTP_DB_SECONDS, DB_QUERY_SECONDS, SCAN_PHASE_SECONDS, GMAIL_CALLS]
+
+def render() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+# --- SQL ---------------------------------------------------------------
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+
+# Set by MetricsMiddleware for the request being handled. Threadpool endpoints and
+# AsyncSession greenlets see the same object, so their statements are counted too.
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_started
+    DB_QUERY_SECONDS.observe(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+def instrument_engines():
+    """Time every statement on every engine, async engines' included."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+# --- HTTP --------------------------------------------------------------
+
+def _route(scope) -> str:
+    # The matched route's template, so /subscriptions/42 and /subscriptions/43 are one series.
+    # Rebuilt from the path: included routers' routes only know their path below the prefix.
+    if "route" not in scope:
+        return "unmatched"
+    params = {str(value): name for name, value in scope.get("path_params", {}).items()}
+    return "/".join(f"{{{params[part]}}}" if part in params else part for part in scope["path"].split("/"))
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request metrics, and profiling slow requests if enabled."""
+
+    def __init__(self, app, profile_ms: int = 0):
+        self.app = app
+        self.profile_ms = profile_ms
+        if profile_ms:
+            try:
+                import pyinstrument  # noqa: F401
+            except ImportError as e:
+                raise RuntimeError("SLOW_REQUEST_PROFILE_MS is set but the 'pyinstrument' package is not installed") from e
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        profiler = None
+        if self.profile_ms:
+            from pyinstrument import Profiler
+
+            profiler = Profiler(interval=0.001, async_mode="enabled")
+            profiler.start()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_stats.reset(token)
+            method, route = scope["method"], _route(scope)
+            HTTP_REQUESTS.inc(method=method, route=route, status=status)
+            HTTP_LATENCY.observe(elapsed, method=method, route=route)
+            HTTP_DB_QUERIES.observe(stats.queries, method=method, route=route)
+            HTTP_DB_SECONDS.observe(stats.db_seconds, method=method, route=route)
+            if profiler is not None:
+                profiler.stop()
+                if elapsed * 1000 >= self.profile_ms:
+                    logger.warning(
+                        f"Slow request {method} {scope['path']}: {elapsed * 1000:.0f}ms, {stats.queries} queries "
+                        f"({stats.db_seconds * 1000:.0f}ms)\n{profiler.output_text(unicode=True, show_all=False)}"
+                    )
+
+# --- Scans -------------------------------------------------------------
+
+class PhaseTimer:
+    """
+    Splits a scan's wall time into phases. The scanner's stages are chained generators,
+    so time is charged to the innermost phase running: a fetch that pulls ids from the
+    list pager charges the listing to "list", not "fetch".
+    """
+
+    def __init__(self):
+        self.enabled = settings.METRICS_ENABLED
+        self.totals: dict[str, float] = defaultdict(float)
+        self._stack: list[str] = []
+        self._mark = time.perf_counter()
+
+    def _switch(self):
+        now = time.perf_counter()
+        if self._stack:
+            self.totals[self._stack[-1]] += now - self._mark
+        self._mark = now
+
+    @contextmanager
+    def _phase(self, name: str):
+        self._switch()
+        self._stack.append(name)
+        try:
+            yield
+        finally:
+            self._switch()
+            self._stack.pop()
+
+    def phase(self, name: str):
+        return self._phase(name) if self.enabled else nullcontext()
+
+    def iterate(self, iterable: Iterable, name: str) -> Iterable:
+        """iterable, with the time spent producing each item charged to name."""
+        if not self.enabled:
+            return iterable
+        return self._iterate(iter(iterable), name)
+
+    def _iterate(self, iterator: Iterator, name: str) -> Iterator:
+        while True:
+            with self._phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def record(self):
+        for name, seconds in self.totals.items():
+            SCAN_PHASE_SECONDS.observe(seconds, phase=name)
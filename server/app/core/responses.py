@@ -0,0 +1,35 @@
+"""
+JSON responses serialized with orjson.
+
+Routes with a response_model are already serialized straight to JSON bytes by pydantic,
+so they keep FastAPI's default. This is for routes whose results are already valid,
+large, and plain: rows read from the database, cached stats. Returning an
+ORJSONResponse skips FastAPI's response validation and jsonable_encoder, which walk
+every value in Python, and orjson writes the bytes in one call.
+
+Models found in the content (SQLModel rows, pydantic schemas) are dumped as they are,
+without being validated again.
+"""
+from decimal import Decimal
+from typing import Any
+import orjson
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+def _default(value: Any) -> Any:
+    # Called by orjson for the types it doesn't know
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, Decimal):
+        # As jsonable_encoder does
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
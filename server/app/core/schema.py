@@ -0,0 +1,186 @@
+"""
+Bringing the database schema up to date at startup.
+
+Every API worker calls ensure_schema() as it boots. When the database is already at the
+newest Alembic revision, which is every boot but the first after a deploy with new
+migrations, that costs one query and a read of the migration files; Alembic itself
+isn't even imported, it takes longer to import than the rest of the check. Otherwise
+the worker takes a migration lock (an advisory lock on Postgres and MySQL, a lock file
+next to a SQLite database), checks the revision again, and runs `alembic upgrade head`
+itself if nobody has yet, so the migrations run once however many workers start
+together. With SCHEMA_AUTO_MIGRATE off an out-of-date schema is an error instead, for
+deployments that migrate as a release step.
+
+Databases made by the create_all() that used to run on every boot have no revision.
+Ones with the tables the first revision makes, which is what every install from before
+the migrations has, are stamped with it and migrated from there; ones that already
+match the models are stamped with the newest revision; anything else is refused.
+"""
+import logging
+import os
+import re
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SERVER_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", ".."))
+ALEMBIC_INI = os.path.join(SERVER_DIR, "alembic.ini")
+VERSIONS_DIR = os.path.join(SERVER_DIR, "alembic", "versions")
+# Shared by every worker of every deployment of the app, whichever database it is on
+MIGRATION_LOCK = "spendshred_schema_migration"
+MIGRATION_LOCK_ID = 0x5e5d_5c4e
+# The first revision, the schema create_all() made before there were migrations
+BASELINE_REVISION = "2b0c19566505"
+
+_REVISION = re.compile(r"^revision\b[^=]*=\s*['\"](\w+)['\"]", re.MULTILINE)
+_DOWN_REVISION = re.compile(r"^down_revision\b.*=(.*)$", re.MULTILINE)
+
+def head_revision() -> Optional[str]:
+    """
+    The newest revision, from the migration files as Alembic writes them. None if there
+    isn't exactly one, or a file can't be read that way; ensure_schema() then leaves it
+    to Alembic.
+    """
+    revisions, parents = set(), set()
+    for name in os.listdir(VERSIONS_DIR):
+        if not name.endswith(".py"):
+            continue
+        with open(os.path.join(VERSIONS_DIR, name)) as f:
+            source = f.read()
+        revision, down_revision = _REVISION.search(source), _DOWN_REVISION.search(source)
+        if not revision or not down_revision:
+            return None
+        revisions.add(revision.group(1))
+        parents.update(re.findall(r"['\"](\w+)['\"]", down_revision.group(1)))
+    heads = revisions - parents
+    return heads.pop() if len(heads) == 1 else None
+
+def current_revision(connection: Connection) -> Optional[str]:
+    if not connection.dialect.has_table(connection, "alembic_version"):
+        return None
+    return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+@contextmanager
+def migration_lock(engine: Engine) -> Iterator[None]:
+    """Held by one process at a time, across every process using this database."""
+    dialect = engine.dialect.name
+    if dialect == "sqlite":
+        database = engine.url.database
+        if not database or database == ":memory:":
+            # Private to this process
+            yield
+            return
+        try:
+            import fcntl
+        except ImportError:
+            # Windows: no flock. Start one worker first when there are migrations to run
+            yield
+            return
+
+        with open(f"{database}.migrate.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return
+
+    if dialect == "postgresql":
+        acquire, release = "SELECT pg_advisory_lock(:id)", "SELECT pg_advisory_unlock(:id)"
+    elif dialect == "mysql":
+        acquire, release = "SELECT GET_LOCK(:name, -1)", "SELECT RELEASE_LOCK(:name)"
+    else:
+        raise NotImplementedError(f"No migration lock for {dialect}")
+    # A connection of its own: the lock has to outlive the migration's transaction, so
+    # the next worker to get it sees the new revision
+    with engine.connect() as connection:
+        params = {"id": MIGRATION_LOCK_ID, "name": MIGRATION_LOCK}
+        connection.execute(text(acquire), params)
+        try:
+            yield
+        finally:
+            connection.execute(text(release), params)
+
+def _tables(connection: Connection) -> dict[str, set[str]]:
+    inspector = inspect(connection)
+    return {
+        table: {column["name"] for column in inspector.get_columns(table)}
+        for table in inspector.get_table_names()
+        if table != "alembic_version"
+    }
+
+def _baseline_tables() -> dict[str, set[str]]:
+    """The tables and columns BASELINE_REVISION makes, from running it on a scratch database."""
+    from alembic import command
+    from alembic.config import Config
+    from sqlalchemy import create_engine
+
+    scratch = create_engine("sqlite://")
+    try:
+        with scratch.begin() as connection:
+            config = Config(ALEMBIC_INI)
+            config.attributes.update(configure_logger=False, connection=connection)
+            command.upgrade(config, BASELINE_REVISION)
+            return _tables(connection)
+    finally:
+        scratch.dispose()
+
+def _migrate(engine: Engine):
+    from alembic import command
+    from alembic.autogenerate import compare_metadata
+    from alembic.config import Config
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+    from sqlmodel import SQLModel
+
+    config = Config(ALEMBIC_INI)
+    # Leave the app's logging alone, alembic.ini would replace it
+    config.attributes["configure_logger"] = False
+    head = ScriptDirectory.from_config(config).get_current_head()
+    if not settings.SCHEMA_AUTO_MIGRATE:
+        with engine.connect() as connection:
+            current = MigrationContext.configure(connection).get_current_revision()
+        if current != head:
+            raise RuntimeError(f"Database schema is at revision {current}, not {head}. Run `alembic upgrade head`.")
+        return
+
+    with migration_lock(engine), engine.begin() as connection:
+        # Another worker may have migrated while we waited for the lock
+        current = MigrationContext.configure(connection).get_current_revision()
+        if current == head:
+            return
+        config.attributes["connection"] = connection
+        tables = _tables(connection) if current is None else None
+        if tables:
+            # Tables from create_all() and no revision. Column names are enough to tell the
+            # schemas apart, types differ between dialects in ways that don't matter here.
+            # The app has imported every model by now, as create_all() relied on too.
+            if tables == _baseline_tables():
+                logger.warning(f"Database created without migrations matches revision {BASELINE_REVISION}, "
+                               f"stamping it and migrating to {head}")
+                command.stamp(config, BASELINE_REVISION)
+                command.upgrade(config, head)
+            elif not compare_metadata(MigrationContext.configure(connection), SQLModel.metadata):
+                logger.warning(f"Database created without migrations matches revision {head}, stamping it")
+                command.stamp(config, head)
+            else:
+                raise RuntimeError(
+                    f"The database has tables but no Alembic revision, and they match neither revision "
+                    f"{BASELINE_REVISION} nor the models. Run `alembic stamp <revision>` with the revision it "
+                    f"matches, then `alembic upgrade head`."
+                )
+        else:
+            logger.warning(f"Migrating the database from revision {current} to {head}")
+            command.upgrade(config, head)
+
+def ensure_schema(engine: Engine):
+    """Migrate the database to the newest revision unless it is there, once across all workers."""
+    head = head_revision()
+    with engine.connect() as connection:
+        current = current_revision(connection)
+    if head is None or current != head:
+        _migrate(engine)
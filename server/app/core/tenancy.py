@@ -0,0 +1,95 @@
+"""
+Where a tenant's rows live.
+
+Organizations share the tenant tables by default and are told apart by tenant_id, which
+every index on those tables leads with. A large customer can be given dedicated storage:
+its own copy of the tenant tables in a schema of its own (a database file of its own on
+SQLite, which has no schemas). Its sessions run with the default schema translated to
+that one, so the same models and queries work unchanged, but only the tenant tables exist
+there: a dedicated session must not be used for users, tokens, jobs and the like.
+
+Alembic only migrates the shared schema; app/services/tenant_storage.py creates a
+dedicated schema from the current models when a tenant is moved.
+"""
+import os
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterator
+from sqlalchemy.engine import Engine, make_url
+from sqlmodel import Session, create_engine, select
+from app.core.config import settings
+from app.core.database import async_database_url, engine, get_async_engine
+from app.models.charge_event import BillingProfile, ChargeEvent
+from app.models.organization import Organization
+from app.models.spend_rollup import SpendRollup
+from app.models.subscription import Subscription
+from app.models.user import User
+
+# Tables partitioned by tenant; everything else is shared by all tenants
+TENANT_TABLES = [Subscription.__table__, SpendRollup.__table__, ChargeEvent.__table__, BillingProfile.__table__]
+
+class TenantMoving(Exception):
+    """The tenant's rows are being moved between storages, retry shortly."""
+
+def schema_name(tenant_id: int) -> str:
+    return f"tenant_{tenant_id}"
+
+def _sqlite_url(tenant_id: int):
+    url = make_url(str(settings.DATABASE_URL))
+    base, ext = os.path.splitext(url.database)
+    return url.set(database=f"{base}.{schema_name(tenant_id)}{ext or '.db'}")
+
+def is_sqlite() -> bool:
+    return make_url(str(settings.DATABASE_URL)).get_backend_name() == "sqlite"
+
+@lru_cache(maxsize=None)
+def dedicated_engine(tenant_id: int) -> Engine:
+    if is_sqlite():
+        return create_engine(_sqlite_url(tenant_id), connect_args={"check_same_thread": False})
+    # Same pool as the shared engine, unqualified table names resolve in the tenant's schema
+    return engine.execution_options(schema_translate_map={None: schema_name(tenant_id)})
+
+@lru_cache(maxsize=None)
+def dedicated_async_engine(tenant_id: int):
+    if is_sqlite():
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        return create_async_engine(async_database_url(_sqlite_url(tenant_id).render_as_string(hide_password=False)))
+    return get_async_engine().execution_options(schema_translate_map={None: schema_name(tenant_id)})
+
+def check_available(tenant: Organization):
+    if tenant.storage == "moving":
+        raise TenantMoving(f"Organization {tenant.id} is being moved between storages")
+
+def tenant_engine(tenant: Organization) -> Engine:
+    check_available(tenant)
+    return dedicated_engine(tenant.id) if tenant.storage == "dedicated" else engine
+
+def tenant_async_engine(tenant: Organization):
+    check_available(tenant)
+    return dedicated_async_engine(tenant.id) if tenant.storage == "dedicated" else get_async_engine()
+
+@contextmanager
+def tenant_session(session: Session, tenant: Organization) -> Iterator[Session]:
+    """
+    Session for tenant's rows: session itself for shared storage, or a session on the
+    tenant's own schema. The caller commits what it wrote through it. tenant must belong to
+    session: it is reloaded, since a long scan may have started before a move did.
+    """
+    session.refresh(tenant)
+    check_available(tenant)
+    if tenant.storage != "dedicated":
+        yield session
+        return
+    # Rows read through it are often returned after it closes
+    with Session(dedicated_engine(tenant.id), expire_on_commit=False) as dedicated:
+        yield dedicated
+
+def get_user_tenant(session: Session, user_id: int) -> Organization:
+    """The organization user_id belongs to. Raises LookupError for users without one."""
+    tenant = session.exec(
+        select(Organization).join(User, User.organization_id == Organization.id).where(User.id == user_id)
+    ).first()
+    if tenant is None:
+        raise LookupError(f"User {user_id} has no organization")
+    return tenant
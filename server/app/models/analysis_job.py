@@ -0,0 +1,18 @@
+from typing import Optional
+from sqlmodel import Field, SQLModel
+from sqlalchemy import Column, Text
+from datetime import datetime, timezone
+
+class AnalysisJob(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(index=True)
+    service: str  # quickbooks, xero
+    status: str = Field(default="queued")  # queued, running, succeeded, failed
+    analyzed_count: int = Field(default=0)  # expense transactions read from the provider
+    recurring_vendors: int = Field(default=0)
+    zombies_found: int = Field(default=0)  # recurring charges for subscriptions flagged zombie/critical
+    potential_savings: float = Field(default=0)
+    error: Optional[str] = Field(default=None, sa_column=Column(Text))
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,49 @@
+from typing import Optional
+from sqlmodel import Field, SQLModel
+from sqlalchemy import Column, Index, Text, UniqueConstraint
+from datetime import datetime, timezone
+
+class ChargeEvent(SQLModel, table=True):
+    """One parsed receipt. Written once, never updated."""
+    __table_args__ = (
+        UniqueConstraint("user_id", "message_id", name="uq_chargeevent_user_message"),
+        # /subscriptions/{id}/history reads a vendor's charges newest first
+        Index("ix_chargeevent_tenant_vendor_charged", "tenant_id", "vendor_key", "charged_at"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    tenant_id: int
+    user_id: int
+    vendor_key: str
+    amount: float  # 0 when no amount could be read from the receipt
+    currency: Optional[str] = None
+    charged_at: datetime  # when the receipt was received
+    message_id: str  # Gmail message id
+
+class BillingProfile(SQLModel, table=True):
+    """Billing analysis for one vendor, kept up to date as charge events arrive."""
+    __table_args__ = (
+        UniqueConstraint("tenant_id", "vendor_key", name="uq_billingprofile_tenant_vendor"),
+        # /stats lists a tenant's upcoming charges and recent price changes off these
+        Index("ix_billingprofile_tenant_next_expected", "tenant_id", "next_expected_at"),
+        Index("ix_billingprofile_tenant_price_changed", "tenant_id", "price_changed_at"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    tenant_id: int
+    vendor_key: str
+    vendor_name: str
+    charge_count: int = Field(default=0)  # distinct payments, duplicate receipt mails folded in
+    first_charged_at: Optional[datetime] = None
+    last_charged_at: Optional[datetime] = None
+    cadence: Optional[str] = None  # weekly, monthly, quarterly, yearly; None until regular
+    interval_days: Optional[float] = None  # median gap between recent charges
+    next_expected_at: Optional[datetime] = None
+    last_amount: float = Field(default=0)
+    # Most recent price change: the amount before it (median of the charges leading up), when, and by how much
+    previous_amount: Optional[float] = None
+    price_change_pct: Optional[float] = None
+    price_changed_at: Optional[datetime] = None
+    # JSON [[epoch seconds, amount], ...] of the latest charges, oldest first
+    recent_charges: str = Field(default="[]", sa_column=Column(Text))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -1,6 +1,6 @@
 from typing import Optional
 from sqlmodel import Field, SQLModel
-from sqlalchemy import Column, Text
+from sqlalchemy import BigInteger, Column, Text
 from datetime import datetime, timezone
 
 class OAuthToken(SQLModel, table=True):
@@ -11,3 +11,12 @@ class OAuthToken(SQLModel, table=True):
     refresh_token: Optional[str] = Field(default=None, sa_column=Column(Text))
     expires_at: Optional[datetime] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class GmailScanCursor(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(index=True, unique=True)
+    history_id: Optional[str] = None
+    email_address: Optional[str] = None  # the mailbox's, for the -to:me filter on history scans
+    last_internal_date: Optional[int] = Field(default=None, sa_column=Column(BigInteger))  # epoch ms of newest scanned message
+    processed_ids: str = Field(default="[]", sa_column=Column(Text))  # JSON list, newest last
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
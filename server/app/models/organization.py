@@ -0,0 +1,13 @@
+from typing import Optional
+from sqlmodel import Field, SQLModel
+from datetime import datetime, timezone
+
+class Organization(SQLModel, table=True):
+    """A customer account (tenant). Subscriptions and everything derived from them belong to one."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str
+    # shared: rows live in the common tables, told apart by tenant_id
+    # moving: being copied into its own schema, requests are turned away until it's done
+    # dedicated: rows live in the tenant's own schema, see app/core/tenancy.py
+    storage: str = Field(default="shared")
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,35 @@
+from typing import Optional
+from sqlmodel import Field, SQLModel
+from sqlalchemy import Column, Text
+from datetime import datetime, timezone
+
+class ScanJob(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(index=True)
+    run_id: Optional[int] = Field(default=None, index=True)  # ScanRun this job belongs to, if any
+    # Set to user_id while the job is queued/running and cleared when it finishes.
+    # The unique index lets at most one in-flight scan exist per user (NULLs don't collide).
+    active_user_id: Optional[int] = Field(default=None, unique=True)
+    status: str = Field(default="queued")  # queued, running, succeeded, failed, skipped (orchestrator runs)
+    phase: str = Field(default="queued")  # queued, history, receipts, zombies, saving, done
+    max_messages: int
+    horizon_days: int
+    messages_seen: int = Field(default=0)
+    subscriptions_found: int = Field(default=0)
+    error: Optional[str] = Field(default=None, sa_column=Column(Text))
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class ScanRun(SQLModel, table=True):
+    """
+    One pass of the scan orchestrator over every connected mailbox. Its ScanJob rows are
+    the checkpoint: a run that stops midway is resumed by scanning the jobs not yet done.
+    """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    status: str = Field(default="running")  # running, finished
+    concurrency: int
+    mailboxes: int = Field(default=0)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,25 @@
+from typing import Optional
+from sqlmodel import Field, SQLModel
+from sqlalchemy import UniqueConstraint
+from datetime import date
+
+class SpendRollup(SQLModel, table=True):
+    """
+    Spend and waste of one team/status group as it stood at the end of a day or month.
+    A bucket that has rows holds every non-empty group, so a bucket without rows
+    means nothing changed since the previous one.
+    """
+    __table_args__ = (
+        # Range reads seek on (tenant_id, granularity, bucket); deltas update by the full key
+        UniqueConstraint("tenant_id", "granularity", "bucket", "team", "status", name="uq_spendrollup_tenant_bucket_group"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    tenant_id: int
+    granularity: str  # day, month
+    bucket: date  # first day of the bucket
+    team: str
+    status: str
+    amount: float = Field(default=0)  # summed monthly amount of the group's subscriptions
+    wasted: float = Field(default=0)
+    subscriptions: int = Field(default=0)
@@ -1,9 +1,27 @@
 from typing import Optional
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 class Subscription(SQLModel, table=True):
+    __table_args__ = (
+        # Every query is scoped to one tenant, so every index leads with tenant_id: a tenant's
+        # reads are a range seek however many other tenants share the table.
+        # /stats filters on status and groups active rows by team. The trailing columns make
+        # the index covering, so the aggregates never have to touch the table itself.
+        Index("ix_subscription_tenant_status_team", "tenant_id", "status", "team", "amount", "seats_total", "seats_unused"),
+        # Keyset pagination: filter/sort column first, id as the tiebreaker the cursor seeks on
+        Index("ix_subscription_tenant_id", "tenant_id", "id"),
+        Index("ix_subscription_tenant_team_id", "tenant_id", "team", "id"),
+        Index("ix_subscription_tenant_amount_id", "tenant_id", "amount", "id"),
+        Index("ix_subscription_tenant_name_id", "tenant_id", "name", "id"),
+        Index("ix_subscription_tenant_vendor", "tenant_id", "vendor_key"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    name: str = Field(index=True)
+    # Organization the row belongs to; always set by the service, never taken from clients
+    tenant_id: Optional[int] = Field(default=None, nullable=False)
+    name: str
+    vendor_key: Optional[str] = None  # normalized name used for matching
     team: str = Field(default="Unassigned")
     amount: float
     seats_total: int
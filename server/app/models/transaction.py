@@ -0,0 +1,40 @@
+from typing import Optional
+from sqlmodel import Field, SQLModel
+from sqlalchemy import BigInteger, Column, Index, Text, UniqueConstraint
+from datetime import date, datetime, timezone
+
+class Transaction(SQLModel, table=True):
+    __table_args__ = (
+        # Re-importing an overlapping export updates rows in place instead of duplicating them,
+        # whoever in the organization imports it
+        UniqueConstraint("tenant_id", "external_id", name="uq_transaction_tenant_external"),
+        # Recurring-charge detection walks one tenant's charges merchant by merchant in date order
+        Index("ix_transaction_tenant_merchant_posted", "tenant_id", "merchant_key", "posted_on"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    tenant_id: int
+    user_id: int  # who imported it
+    external_id: str  # OFX FITID or the export's id column, else a hash of the line (see statement_parser.line_ids)
+    posted_on: date
+    description: str
+    merchant_key: str  # normalized merchant, same keys as Subscription.vendor_key
+    amount: float  # negative is money out
+    currency: str = Field(default="USD")
+
+class TransactionImport(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(index=True)
+    format: str  # csv, ofx, qbo
+    status: str = Field(default="queued")  # queued, running, succeeded, failed
+    phase: str = Field(default="queued")  # queued, parsing, detecting, saving, done
+    bytes_total: int = Field(default=0, sa_column=Column(BigInteger, nullable=False))  # statements can pass 2 GB
+    bytes_parsed: int = Field(default=0, sa_column=Column(BigInteger, nullable=False))
+    rows_imported: int = Field(default=0)
+    rows_skipped: int = Field(default=0)  # lines without a parseable date or amount
+    recurring_found: int = Field(default=0)
+    subscriptions_found: int = Field(default=0)
+    error: Optional[str] = Field(default=None, sa_column=Column(Text))
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -7,3 +7,4 @@ class User(SQLModel, table=True):
     full_name: Optional[str] = None
     hashed_password: str
     is_active: bool = Field(default=True)
+    organization_id: Optional[int] = Field(default=None, index=True)
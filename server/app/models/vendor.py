@@ -0,0 +1,8 @@
+from typing import Optional
+from sqlmodel import Field, SQLModel
+
+class VendorAlias(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    tenant_id: int = Field(index=True)  # organization whose senders it applies to
+    alias: str  # sending domain ("billing.acme.io") or display name ("Acme Team")
+    vendor: str  # canonical vendor name the alias resolves to
@@ -0,0 +1,10 @@
+from datetime import date
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
+
+class TimeseriesQuery(BaseModel):
+    granularity: Literal["day", "month"] = "day"
+    # Inclusive bounds; default to the last 30 days (day) or 12 months (month)
+    start: Optional[date] = Field(default=None, alias="from")
+    end: Optional[date] = Field(default=None, alias="to")
+    group_by: Literal["total", "team", "status"] = "total"
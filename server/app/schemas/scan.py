@@ -0,0 +1,6 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+class ScanRequest(BaseModel):
+    max_messages: Optional[int] = Field(default=None, ge=1, le=50000)
+    horizon_days: Optional[int] = Field(default=None, ge=1, le=3650)
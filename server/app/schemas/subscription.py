@@ -0,0 +1,89 @@
+from datetime import datetime
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Any, List, Literal, Optional
+
+class SubscriptionFilter(BaseModel):
+    status: List[str] = []
+    team: Optional[str] = None
+    name_prefix: Optional[str] = None
+    min_amount: Optional[float] = None
+    max_amount: Optional[float] = None
+
+class SubscriptionListQuery(SubscriptionFilter):
+    # sort column, prefixed with "-" for descending
+    sort: str = "id"
+    cursor: Optional[str] = None
+    limit: int = Field(default=100, ge=1, le=1000)
+    # comma-separated column projection, e.g. fields=name,amount,status
+    fields: Optional[str] = None
+    # Legacy: return every matching row as a bare list, no cursor
+    all: bool = False
+
+class SubscriptionExportQuery(SubscriptionFilter):
+    format: Literal["csv", "ndjson", "parquet"] = "csv"
+
+class SubscriptionPage(BaseModel):
+    items: List[dict[str, Any]]
+    next_cursor: Optional[str] = None
+
+SubscriptionStatus = Literal["active", "zombie", "critical", "cancelled"]
+
+class SubscriptionCreate(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    name: str = Field(min_length=1)
+    team: str = "Unassigned"
+    amount: float = Field(ge=0)
+    seats_total: int = Field(ge=0)
+    seats_unused: int = Field(ge=0)
+    status: SubscriptionStatus = "active"
+    last_used: str = "Unknown"
+
+class SubscriptionBulkUpdate(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    id: int
+    name: Optional[str] = Field(default=None, min_length=1)
+    team: Optional[str] = None
+    amount: Optional[float] = Field(default=None, ge=0)
+    seats_total: Optional[int] = Field(default=None, ge=0)
+    seats_unused: Optional[int] = Field(default=None, ge=0)
+    status: Optional[SubscriptionStatus] = None
+    last_used: Optional[str] = None
+
+class BulkRowResult(BaseModel):
+    row: int
+    status: Literal["created", "updated", "error", "skipped"]
+    id: Optional[int] = None
+    errors: List[str] = Field(default_factory=list)
+
+class BulkResult(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BulkRowResult]
+
+class ChargeRecord(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    amount: float
+    currency: Optional[str] = None
+    charged_at: datetime
+    message_id: str
+
+class PriceChange(BaseModel):
+    previous_amount: float
+    amount: float
+    change_pct: float
+    changed_at: datetime
+
+class SubscriptionHistory(BaseModel):
+    subscription_id: int
+    vendor_key: Optional[str] = None
+    cadence: Optional[str] = None  # weekly, monthly, quarterly, yearly; None while irregular
+    interval_days: Optional[float] = None
+    charge_count: int = 0
+    last_amount: Optional[float] = None
+    last_charged_at: Optional[datetime] = None
+    next_expected_at: Optional[datetime] = None
+    price_change: Optional[PriceChange] = None
+    charges: List[ChargeRecord] = Field(default_factory=list)  # newest first
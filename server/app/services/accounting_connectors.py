@@ -0,0 +1,172 @@
+"""
+Accounting provider connectors.
+
+Each connector adapts one provider's REST API to two calls: verify(api_key) checks the
+credentials and iter_expenses(api_key) pages through purchases as Expense tuples.
+All connectors share one pooled httpx.AsyncClient; request() adds retries with
+exponential backoff for 429/5xx responses and network errors.
+
+API keys take the form "<company id>:<access token>" (the QuickBooks realm id or the
+Xero tenant id, then the OAuth access token).
+"""
+import asyncio
+import random
+from typing import AsyncIterator, NamedTuple, Optional
+import httpx
+from app.core.config import settings
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+
+class ConnectorError(Exception):
+    def __init__(self, message: str, status_code: int = 502):
+        super().__init__(message)
+        self.status_code = status_code
+
+class InvalidCredentials(ConnectorError):
+    def __init__(self, message: str = "Invalid API Key or Connection Failed"):
+        super().__init__(message, status_code=400)
+
+class Expense(NamedTuple):
+    vendor: str
+    amount: float
+    currency: str
+    date: str  # ISO date of the transaction
+
+_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """The process-wide client, so every connector shares one connection pool."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.INTEGRATION_TIMEOUT),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+        )
+    return _client
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def split_key(api_key: str) -> tuple[str, str]:
+    company_id, _, token = api_key.partition(":")
+    if not company_id or not token:
+        raise InvalidCredentials("API key must look like '<company id>:<access token>'")
+    return company_id, token
+
+def backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except ValueError:
+            pass  # HTTP-date form, fall back to our own schedule
+    # Full jitter, so clients that failed together don't retry together
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+class AccountingConnector:
+    name = ""
+    url_setting = ""  # settings attribute holding the API root
+
+    def __init__(self, base_url: str, client: Optional[httpx.AsyncClient] = None, max_retries: Optional[int] = None):
+        self.base_url = base_url.rstrip("/")
+        self.client = client or get_http_client()
+        self.max_retries = settings.INTEGRATION_MAX_RETRIES if max_retries is None else max_retries
+
+    def headers(self, company_id: str, token: str) -> dict:
+        return {"Authorization": f"Bearer {token}", "Accept": "application/json"}
+
+    async def request(self, method: str, path: str, api_key: str, **kwargs) -> dict:
+        company_id, token = split_key(api_key)
+        url = self.base_url + path.format(company_id=company_id)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self.client.request(method, url, headers=self.headers(company_id, token), **kwargs)
+            except httpx.TransportError as e:  # connect errors and timeouts
+                if attempt == self.max_retries:
+                    raise ConnectorError(f"{self.name} is unreachable: {e}") from e
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+
+            if response.status_code in (401, 403):
+                raise InvalidCredentials()
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                await asyncio.sleep(backoff_delay(attempt, response.headers.get("retry-after")))
+                continue
+            if response.is_error:
+                raise ConnectorError(f"{self.name} returned HTTP {response.status_code}")
+            return response.json()
+
+    async def verify(self, api_key: str):
+        raise NotImplementedError
+
+    def iter_expenses(self, api_key: str) -> AsyncIterator[Expense]:
+        raise NotImplementedError
+
+class QuickBooksConnector(AccountingConnector):
+    name = "QuickBooks"
+    url_setting = "QUICKBOOKS_API_URL"
+    PAGE_SIZE = 1000
+
+    async def verify(self, api_key: str):
+        await self.request("GET", "/v3/company/{company_id}/companyinfo/{company_id}", api_key)
+
+    async def iter_expenses(self, api_key: str) -> AsyncIterator[Expense]:
+        start = 1  # STARTPOSITION is 1-based
+        while True:
+            query = f"select * from Purchase startposition {start} maxresults {self.PAGE_SIZE}"
+            data = await self.request("GET", "/v3/company/{company_id}/query", api_key, params={"query": query})
+            purchases = data.get("QueryResponse", {}).get("Purchase", [])
+            for purchase in purchases:
+                yield Expense(
+                    vendor=purchase.get("EntityRef", {}).get("name") or "Unknown",
+                    amount=float(purchase.get("TotalAmt", 0)),
+                    currency=purchase.get("CurrencyRef", {}).get("value", "USD"),
+                    date=purchase.get("TxnDate", "")
+                )
+            if len(purchases) < self.PAGE_SIZE:
+                return
+            start += self.PAGE_SIZE
+
+class XeroConnector(AccountingConnector):
+    name = "Xero"
+    url_setting = "XERO_API_URL"
+    PAGE_SIZE = 100  # fixed by the Xero API
+
+    def headers(self, company_id: str, token: str) -> dict:
+        return {**super().headers(company_id, token), "Xero-tenant-id": company_id}
+
+    async def verify(self, api_key: str):
+        await self.request("GET", "/api.xro/2.0/Organisation", api_key)
+
+    async def iter_expenses(self, api_key: str) -> AsyncIterator[Expense]:
+        page = 1
+        while True:
+            data = await self.request(
+                "GET", "/api.xro/2.0/BankTransactions", api_key, params={"page": page, "where": 'Type=="SPEND"'}
+            )
+            transactions = data.get("BankTransactions", [])
+            for transaction in transactions:
+                yield Expense(
+                    vendor=transaction.get("Contact", {}).get("Name") or "Unknown",
+                    amount=float(transaction.get("Total", 0)),
+                    currency=transaction.get("CurrencyCode", "USD"),
+                    date=transaction.get("DateString", "")[:10]
+                )
+            if len(transactions) < self.PAGE_SIZE:
+                return
+            page += 1
+
+CONNECTORS = {
+    "quickbooks": QuickBooksConnector,
+    "xero": XeroConnector,
+}
+
+def get_connector(service: str, client: Optional[httpx.AsyncClient] = None) -> AccountingConnector:
+    connector_class = CONNECTORS.get(service.lower())
+    if not connector_class:
+        raise ConnectorError(f"Unsupported integration '{service}'", status_code=400)
+    return connector_class(getattr(settings, connector_class.url_setting), client)
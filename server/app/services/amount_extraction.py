@@ -0,0 +1,157 @@
+"""
+Receipt amount extraction.
+
+One precompiled token pattern finds currency amounts and the keywords around them.
+When a text has more than one candidate amount they are ranked, so that
+"total"/"charged" amounts beat line items, discounts and zero totals.
+extract_money_batch skips texts with no digit or currency marker, scans each distinct
+text once however often it repeats in the batch, and runs the pattern over all of them
+in one pass, mapping matches back to their text by offset.
+"""
+import re
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Iterable, NamedTuple, Optional
+
+class Money(NamedTuple):
+    amount: float
+    currency: str
+
+SYMBOLS = {
+    "US$": "USD", "A$": "AUD", "C$": "CAD", "$": "USD",
+    "€": "EUR", "£": "GBP", "₹": "INR", "Rs.": "INR", "Rs": "INR",
+    "¥": "JPY", "₩": "KRW",
+}
+CODES = ["USD", "EUR", "GBP", "INR", "JPY", "AUD", "CAD", "CHF", "KRW"]
+# No minor unit, so "¥1,200" and "¥1.200" are both twelve hundred
+ZERO_DECIMAL = {"JPY", "KRW"}
+_BY_TOKEN = {token.upper(): code for token, code in SYMBOLS.items()}
+
+# A total/charged keyword this many characters before an amount counts as labelling it
+KEYWORD_WINDOW = 40
+TOTAL_WEIGHT = 3
+MINOR_WEIGHT = -2
+ZERO_WEIGHT = -5
+
+# Texts are lowercased once up front, which is cheaper than an IGNORECASE pattern
+_symbol = "|".join(re.escape(s.lower()) for s in sorted(SYMBOLS, key=len, reverse=True))
+_code = "|".join(code.lower() for code in CODES)
+# Grouped thousands (1,234 / 1.234 / 1 234 with nbsp or thin space) or plain digits,
+# with an optional 1-2 digit decimal part
+_number = r"\d{1,3}(?:[,.\u00a0\u202f]\d{3})+(?:[.,]\d{1,2})?|\d+(?:[.,]\d{1,2})?"
+
+TOTAL_WORDS = ["grand total", "total", "amount due", "amount paid", "you paid", "charged", "payment of", "billed"]
+MINOR_WORDS = ["subtotal", "sub-total", "tax", "vat", "discount", "credit", "refund", "save", "savings"]
+# Every position is tried against all four alternatives, this lookahead turns most of them
+# away on their first character
+_first = "".join(sorted({*"0123456789", *(token.lower()[0] for token in [*SYMBOLS, *CODES, *TOTAL_WORDS, *MINOR_WORDS])}))
+
+TOKEN_RE = re.compile(
+    rf"""
+    (?=[{re.escape(_first)}])
+    (?:(?P<total>\b(?:{"|".join(re.escape(word) for word in TOTAL_WORDS)})\b)
+    | (?P<minor>\b(?:{"|".join(re.escape(word) for word in MINOR_WORDS)})\b)
+    | (?:(?P<pre_cur>(?<![a-z])(?:{_symbol})|\b(?:{_code})\b)\s?(?P<pre_num>{_number}))
+    | (?:(?P<post_num>{_number})\s?(?P<post_cur>€|£|₹|\b(?:{_code})\b)))
+    """,
+    re.VERBOSE,
+)
+# Cheap checks that a text could hold an amount at all, before TOKEN_RE runs over it
+_HAS_DIGIT = re.compile(r"\d")
+_HAS_CURRENCY = re.compile(rf"{_symbol}|{_code}")
+
+def parse_number(raw: str, currency: str) -> Optional[float]:
+    digits = raw.replace("\u00a0", "").replace("\u202f", "")
+    if currency in ZERO_DECIMAL:
+        digits = digits.replace(",", "").replace(".", "")
+    elif "," in digits and "." in digits:
+        # Whichever separator comes last is the decimal point: 1,234.56 vs 1.234,56
+        if digits.rfind(",") > digits.rfind("."):
+            digits = digits.replace(".", "").replace(",", ".")
+        else:
+            digits = digits.replace(",", "")
+    else:
+        for sep in ",.":
+            if sep in digits:
+                head, _, tail = digits.rpartition(sep)
+                if digits.count(sep) == 1 and len(tail) <= 2:
+                    digits = f"{head}.{tail}"
+                else:
+                    digits = digits.replace(sep, "")
+    try:
+        return float(digits)
+    except ValueError:
+        return None
+
+def _currency(token: str) -> str:
+    return _BY_TOKEN.get(token.upper(), token.upper())
+
+def _rank(candidates: list[tuple]) -> Optional[Money]:
+    best = None
+    for start, raw, currency, last_total, last_minor in candidates:
+        amount = parse_number(raw, currency)
+        if amount is None:
+            continue
+        score = 0
+        if start - last_total <= KEYWORD_WINDOW:
+            score += TOTAL_WEIGHT
+        if start - last_minor <= KEYWORD_WINDOW and last_minor > last_total:
+            score += MINOR_WEIGHT
+        if amount == 0:
+            score += ZERO_WEIGHT
+        # Ties go to the larger amount, a receipt's total is rarely smaller than its lines
+        candidate = (score, amount, currency)
+        if best is None or candidate[:2] > best[:2]:
+            best = candidate
+    return Money(best[1], best[2]) if best else None
+
+def extract_money_batch(texts: Iterable[str]) -> list[Optional[Money]]:
+    """Best-ranked amount for each text (None when a text has no currency amount)."""
+    texts = [(text or "").lower() for text in texts]
+    # Each text that could hold an amount, once: receipts from one vendor often repeat
+    # word for word, and most mail that isn't a receipt has no digits at all
+    scanned = [
+        text for text in dict.fromkeys(texts) if _HAS_DIGIT.search(text) and _HAS_CURRENCY.search(text)
+    ]
+    if not scanned:
+        return [None] * len(texts)
+    # \x00 never appears in mail headers, so no match can straddle two texts
+    combined = "\x00".join(scanned)
+    starts = [0, *accumulate(len(text) + 1 for text in scanned)]
+
+    candidates: list[list[tuple]] = [[] for _ in scanned]
+    last_total = [-KEYWORD_WINDOW - 1] * len(scanned)
+    last_minor = [-KEYWORD_WINDOW - 1] * len(scanned)
+
+    for match in TOKEN_RE.finditer(combined):
+        idx = bisect_right(starts, match.start()) - 1
+        kind = match.lastgroup
+        if kind == "total":
+            last_total[idx] = match.end()
+        elif kind == "minor":
+            last_minor[idx] = match.end()
+        else:
+            # The last group an amount closes tells which side its currency was on
+            if kind == "pre_num":
+                currency, raw = match.group("pre_cur", "pre_num")
+            else:
+                raw, currency = match.group("post_num", "post_cur")
+            candidates[idx].append((match.start(), raw, _currency(currency), last_total[idx], last_minor[idx]))
+
+    found = {}
+    for text, text_candidates in zip(scanned, candidates):
+        if len(text_candidates) == 1:
+            # Nothing to rank it against
+            _, raw, currency, _, _ = text_candidates[0]
+            amount = parse_number(raw, currency)
+            found[text] = Money(amount, currency) if amount is not None else None
+        elif text_candidates:
+            found[text] = _rank(text_candidates)
+    return [found.get(text) for text in texts]
+
+def extract_money(text: str) -> Optional[Money]:
+    return extract_money_batch([text])[0]
+
+def extract_amount(text: str) -> float:
+    money = extract_money(text)
+    return money.amount if money else 0.0
@@ -0,0 +1,174 @@
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import case, func, or_
+from sqlmodel import Session, select
+from app.core.cache import get_cache
+from app.models.charge_event import BillingProfile
+from app.models.subscription import Subscription
+
+WASTE_STATUSES = ["zombie", "critical"]
+# Billing section of the dashboard: charges expected this far ahead, price changes this far back
+UPCOMING_DAYS = 30
+PRICE_CHANGE_DAYS = 90
+BILLING_LIST_LIMIT = 20
+
+def _has_unused_seats():
+    # Active but paying for unused seats
+    return (Subscription.status == "active") & (Subscription.seats_total > 0) & (Subscription.seats_unused > 0)
+
+def wasted_amount():
+    """SQL expression for the share of a row's amount that is wasted."""
+    return case(
+        (_has_unused_seats(), Subscription.amount * Subscription.seats_unused / Subscription.seats_total),
+        (Subscription.status.in_(WASTE_STATUSES), Subscription.amount), # Full amount is waste for zombies
+        else_=0
+    )
+
+def team_label():
+    """SQL expression for the team a row is charted under."""
+    return case((or_(Subscription.team.is_(None), Subscription.team == ""), "Unassigned"), else_=Subscription.team)
+
+def stats_key(tenant_id: int) -> str:
+    return f"stats:{tenant_id}"
+
+def compute_stats_entry(session: Session, tenant_id: int) -> dict:
+    """
+    Raw dashboard aggregates for one tenant computed in the database: one aggregate row for
+    the totals and one GROUP BY team for the breakdown, both range scans of the tenant's
+    slice of the covering index, so nothing scales with the row count in Python or with
+    other tenants.
+    """
+    of_tenant = Subscription.tenant_id == tenant_id
+    is_active = Subscription.status == "active"
+    is_wasted = Subscription.status.in_(WASTE_STATUSES)
+    has_unused_seats = _has_unused_seats()
+
+    totals = session.exec(select(
+        func.coalesce(func.sum(case((is_active, Subscription.amount), else_=0)), 0),
+        func.coalesce(func.sum(wasted_amount()), 0),
+        func.coalesce(func.sum(case((has_unused_seats, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((is_active & ~has_unused_seats, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((is_wasted, 1), else_=0)), 0),
+    ).where(of_tenant)).one()
+
+    team = team_label()
+    rows = session.exec(
+        select(team, func.sum(Subscription.amount), func.count()).where(of_tenant, is_active).group_by(team)
+    ).all()
+
+    return {
+        "totals": dict(zip(["total_spend", "wasted_spend", "active_with_waste", "active_fully_used", "zombie_count"], totals)),
+        "teams": {name: [amount, count] for name, amount, count in rows},
+        "billing": compute_billing(session, tenant_id),
+    }
+
+def compute_billing(session: Session, tenant_id: int) -> dict:
+    """Upcoming charges and recent price changes, read off the billing profiles' indexed dates."""
+    now = datetime.now(timezone.utc)
+    upcoming = session.exec(
+        select(BillingProfile)
+        .where(
+            BillingProfile.tenant_id == tenant_id,
+            BillingProfile.next_expected_at >= now,
+            BillingProfile.next_expected_at <= now + timedelta(days=UPCOMING_DAYS)
+        )
+        .order_by(BillingProfile.next_expected_at)
+        .limit(BILLING_LIST_LIMIT)
+    ).all()
+    changes = session.exec(
+        select(BillingProfile)
+        .where(BillingProfile.tenant_id == tenant_id, BillingProfile.price_changed_at >= now - timedelta(days=PRICE_CHANGE_DAYS))
+        .order_by(BillingProfile.price_changed_at.desc())
+        .limit(BILLING_LIST_LIMIT)
+    ).all()
+    return {
+        "upcoming": [
+            [p.vendor_name, p.last_amount, p.cadence, p.next_expected_at.date().isoformat()] for p in upcoming
+        ],
+        "price_changes": [
+            [p.vendor_name, p.previous_amount, p.last_amount, p.price_change_pct, p.price_changed_at.date().isoformat()]
+            for p in changes
+        ],
+    }
+
+def render_stats(entry: dict) -> dict:
+    totals, billing = entry["totals"], entry["billing"]
+    total_spend, wasted_spend = totals["total_spend"], totals["wasted_spend"]
+
+    # Calculate health score (Mock logic for now based on waste ratio)
+    health_score = 100
+    if total_spend > 0:
+        waste_ratio = wasted_spend / (total_spend + wasted_spend)
+        health_score = max(0, 100 - int(waste_ratio * 100))
+
+    # Spend by Team, sorted by spend desc
+    teams = sorted(entry["teams"].items(), key=lambda item: item[1][0], reverse=True)
+
+    return {
+        "total_spend": total_spend,
+        "wasted_spend": wasted_spend,
+        "active_subs": totals["active_fully_used"] + totals["active_with_waste"],
+        "active_fully_used": totals["active_fully_used"],
+        "active_with_waste": totals["active_with_waste"],
+        "zombie_count": totals["zombie_count"],
+        "health_score": health_score,
+        "spend_by_team": [{"team": name, "amount": amount} for name, (amount, _) in teams],
+        "upcoming_charges": [
+            {"vendor": vendor, "amount": amount, "cadence": cadence, "expected_on": expected_on}
+            for vendor, amount, cadence, expected_on in billing["upcoming"]
+        ],
+        "price_changes": [
+            {"vendor": vendor, "previous_amount": previous, "amount": amount, "change_pct": pct, "changed_on": changed_on}
+            for vendor, previous, amount, pct, changed_on in billing["price_changes"]
+        ],
+    }
+
+def get_dashboard_stats(session: Session, tenant_id: int) -> dict:
+    return render_stats(compute_stats_entry(session, tenant_id))
+
+def _etag(stats: dict) -> str:
+    digest = hashlib.sha1(json.dumps(stats, sort_keys=True).encode()).hexdigest()
+    return f'"{digest[:20]}"'
+
+def _cache_entry(entry: dict) -> dict:
+    stats = render_stats(entry)
+    return {**entry, "stats": stats, "etag": _etag(stats)}
+
+def get_cached_stats(session: Session, tenant_id: int) -> tuple[dict, str]:
+    """A tenant's dashboard stats and their ETag, from the cache when it has them."""
+    cache = get_cache()
+    key = stats_key(tenant_id)
+    cached = cache.get(key)
+    if cached is None:
+        cached = _cache_entry(compute_stats_entry(session, tenant_id))
+        cache.set(key, cached)
+    return cached["stats"], cached["etag"]
+
+def contribution(sub: dict) -> dict:
+    """What one subscription row adds to the raw aggregates, mirroring compute_stats_entry."""
+    amount = sub.get("amount") or 0
+    seats_total, seats_unused = sub.get("seats_total") or 0, sub.get("seats_unused") or 0
+    totals = dict.fromkeys(["total_spend", "wasted_spend", "active_with_waste", "active_fully_used", "zombie_count"], 0)
+    team = None
+    if sub.get("status") == "active":
+        totals["total_spend"] = amount
+        team = sub.get("team") or "Unassigned"
+        if seats_total > 0 and seats_unused > 0:
+            totals["active_with_waste"] = 1
+            totals["wasted_spend"] = amount * seats_unused / seats_total
+        else:
+            totals["active_fully_used"] = 1
+    elif sub.get("status") in WASTE_STATUSES:
+        totals["zombie_count"] = 1
+        totals["wasted_spend"] = amount
+    return {"totals": totals, "team": team, "amount": amount}
+
+def invalidate_stats(tenant_id: int):
+    """
+    Drop a tenant's cached stats after a committed change, for the next read to rebuild.
+    Not adjusted in place: a read may already have rebuilt the entry from the committed
+    rows, and a delta folded into that would count the change twice.
+    """
+    get_cache().delete(stats_key(tenant_id))
@@ -0,0 +1,165 @@
+"""
+Per-vendor billing analysis, maintained incrementally from receipt charge events.
+
+Every receipt a scan parses is stored once as a ChargeEvent. New events then only touch
+their own vendor's BillingProfile: the profile keeps a sorted window of the vendor's
+latest WINDOW_SIZE charges, and cadence, the expected next charge and price changes are
+recomputed from that window alone. A scan costs the same however much history sits
+behind it, and nothing ever re-reads the event table to rebuild a profile.
+"""
+import json
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from statistics import median
+from typing import Iterable, Optional
+from sqlalchemy import insert
+from sqlmodel import Session, select
+from app.models.charge_event import BillingProfile, ChargeEvent
+from app.services.recurring_charges import classify_interval
+
+WINDOW_SIZE = 12
+# A receipt and an invoice mail for one payment land within a few days of each other
+DUPLICATE_DAYS = 3
+# Each charge is compared with the median of this many charges before it
+PRICE_BASELINE = 3
+PRICE_CHANGE_MIN = 0.05
+# IN-list size when checking which message ids are already stored
+LOOKUP_CHUNK = 500
+
+DAY = 86400
+
+def _utc(value: datetime) -> datetime:
+    # SQLite hands datetimes back without tzinfo
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def _from_epoch(seconds: float) -> datetime:
+    return datetime.fromtimestamp(seconds, timezone.utc)
+
+def apply_charges(profile: BillingProfile, charges: Iterable[tuple[float, float]]):
+    """
+    Fold new (epoch seconds, amount) charges into profile and recompute its analysis.
+    Charges may arrive in any order; ones older than a full window only move the counters.
+    """
+    window = [tuple(charge) for charge in json.loads(profile.recent_charges or "[]")]
+    first = _utc(profile.first_charged_at).timestamp() if profile.first_charged_at else None
+
+    for at, amount in sorted(charges):
+        first = at if first is None else min(first, at)
+        i = bisect_left(window, (at,))
+        duplicate = next((j for j in (i - 1, i) if 0 <= j < len(window) and abs(window[j][0] - at) <= DUPLICATE_DAYS * DAY), None)
+        if duplicate is not None:
+            # Same payment seen twice; keep whichever mail had the amount in it
+            if window[duplicate][1] == 0 and amount > 0:
+                window[duplicate] = (window[duplicate][0], amount)
+            continue
+        profile.charge_count += 1
+        if len(window) >= WINDOW_SIZE and at < window[0][0]:
+            continue
+        insort(window, (at, amount))
+        if len(window) > WINDOW_SIZE:
+            window.pop(0)
+
+    if not window:
+        return
+    profile.recent_charges = json.dumps(window)
+    profile.first_charged_at = _from_epoch(first)
+    profile.last_charged_at = _from_epoch(window[-1][0])
+    profile.updated_at = datetime.now(timezone.utc)
+
+    gaps = [(b[0] - a[0]) / DAY for a, b in zip(window, window[1:])]
+    profile.interval_days = round(median(gaps), 1) if gaps else None
+    profile.cadence = classify_interval(profile.interval_days) if gaps else None
+    profile.next_expected_at = (
+        profile.last_charged_at + timedelta(days=profile.interval_days) if profile.cadence else None
+    )
+
+    paid = [(at, amount) for at, amount in window if amount > 0]
+    if not paid:
+        return
+    profile.last_amount = paid[-1][1]
+    change = latest_price_change(paid)
+    # An earlier change stays on the profile until a newer one replaces it
+    if change and (profile.price_changed_at is None or _utc(profile.price_changed_at) < change[2]):
+        profile.previous_amount, profile.price_change_pct, profile.price_changed_at = change
+
+def latest_price_change(paid: list[tuple[float, float]]) -> Optional[tuple[float, float, datetime]]:
+    """
+    (amount before, % change, when) for the newest price change in a window of paid charges.
+    Each charge is compared with the median of the PRICE_BASELINE before it; charges that
+    stay at a new price belong to the change that started it, so a batch holding several
+    charges after a hike still dates the hike to its first one.
+    """
+    change = None
+    for i in range(1, len(paid)):
+        at, amount = paid[i]
+        baseline = median(a for _, a in paid[max(0, i - PRICE_BASELINE):i])
+        if abs(amount - baseline) / baseline < PRICE_CHANGE_MIN:
+            continue
+        if change and abs(amount - change[3]) / change[3] < PRICE_CHANGE_MIN:
+            continue  # still at the price the last change moved to
+        change = (baseline, round((amount - baseline) / baseline * 100, 1), _from_epoch(at), amount)
+    return change[:3] if change else None
+
+def record_charges(session: Session, tenant_id: int, user_id: int, receipts: list[dict]) -> int:
+    """
+    Store receipt signals from user_id's scan as charge events and update the affected
+    vendors' profiles in tenant_id with the ones not seen before. Returns how many events
+    were new. Doesn't commit, the scan commits it together with its cursor.
+    """
+    receipts = {signal["id"]: signal for signal in receipts if signal["vendor_key"]}
+    if not receipts:
+        return 0
+    ids = list(receipts)
+    known = set()
+    for start in range(0, len(ids), LOOKUP_CHUNK):
+        known.update(session.exec(select(ChargeEvent.message_id).where(
+            ChargeEvent.user_id == user_id, ChargeEvent.message_id.in_(ids[start:start + LOOKUP_CHUNK])
+        )))
+    new = [signal for msg_id, signal in receipts.items() if msg_id not in known]
+    if not new:
+        return 0
+
+    session.execute(insert(ChargeEvent), [{
+        "tenant_id": tenant_id,
+        "user_id": user_id,
+        "vendor_key": signal["vendor_key"],
+        "amount": signal["amount"],
+        "currency": signal["currency"],
+        "charged_at": _from_epoch(signal["internal_date"] / 1000),
+        "message_id": signal["id"],
+    } for signal in new])
+
+    by_vendor = defaultdict(list)
+    names = {}
+    for signal in new:
+        by_vendor[signal["vendor_key"]].append((signal["internal_date"] / 1000, signal["amount"]))
+        names[signal["vendor_key"]] = signal["service_name"]
+    profiles = {
+        profile.vendor_key: profile
+        for profile in session.exec(select(BillingProfile).where(
+            BillingProfile.tenant_id == tenant_id, BillingProfile.vendor_key.in_(list(by_vendor))
+        ))
+    }
+    for key, charges in by_vendor.items():
+        profile = profiles.get(key) or BillingProfile(tenant_id=tenant_id, vendor_key=key, vendor_name=names[key])
+        apply_charges(profile, charges)
+        session.add(profile)
+    return len(new)
+
+def get_profile(session: Session, tenant_id: int, vendor_key: Optional[str]) -> Optional[BillingProfile]:
+    if not vendor_key:
+        return None
+    return session.exec(select(BillingProfile).where(
+        BillingProfile.tenant_id == tenant_id, BillingProfile.vendor_key == vendor_key
+    )).first()
+
+def get_charges(session: Session, tenant_id: int, vendor_key: Optional[str], limit: int) -> list[ChargeEvent]:
+    if not vendor_key:
+        return []
+    return list(session.exec(
+        select(ChargeEvent)
+        .where(ChargeEvent.tenant_id == tenant_id, ChargeEvent.vendor_key == vendor_key)
+        .order_by(ChargeEvent.charged_at.desc())
+        .limit(limit)
+    ))
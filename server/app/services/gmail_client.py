@@ -0,0 +1,131 @@
+"""
+Gmail API clients for scans.
+
+googleapiclient's build() reads and parses the API's discovery document and opens a new
+httplib2 transport (so a new TLS connection) on every call, and the credentials it is
+handed only refresh once a request comes back 401, in the middle of the scan. Here the
+discovery documents are read once per process, each thread keeps one transport whose
+connections are reused by every scan the thread runs, and access tokens are refreshed
+before a scan starts whenever they expire within REFRESH_MARGIN. Refreshes of one
+user's token are serialized in this process, so scans that start together refresh it
+once; the new expiry is stored on OAuthToken.expires_at.
+"""
+import threading
+import weakref
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional
+import httplib2
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp, Request
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from sqlmodel import Session
+from app.core.config import settings
+from app.models.oauth import OAuthToken
+from app.services.gmail_quota import QuotaLimiter, ThrottledHttp
+
+TOKEN_URI = "https://oauth2.googleapis.com/token"
+GMAIL_SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
+# Tokens expiring sooner than this are refreshed before a scan; comfortably longer than a scan
+REFRESH_MARGIN = timedelta(minutes=10)
+
+_local = threading.local()
+
+class _RefreshLock:
+    """A lock that can be weakly referenced, so a user's is dropped once no scan holds or waits on it."""
+    __slots__ = ("_lock", "__weakref__")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self._lock.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self._lock.release()
+
+_refresh_locks: "weakref.WeakValueDictionary[int, _RefreshLock]" = weakref.WeakValueDictionary()
+_refresh_locks_guard = threading.Lock()
+
+def _utc(value: datetime) -> datetime:
+    # SQLite hands datetimes back without tzinfo
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+@lru_cache(maxsize=None)
+def discovery_document(api: str, version: str) -> str:
+    # The JSON text, not the parsed document: googleapiclient fills in each method's
+    # parameters in place as scans use them, so every service parses a copy of its own
+    # (under a millisecond for Gmail's) rather than several threads sharing one
+    doc = get_static_doc(api, version)
+    if doc is None:
+        raise LookupError(f"No discovery document bundled for {api} {version}")
+    return doc
+
+def build_service(api: str, version: str, credentials: Credentials, http: Optional[httplib2.Http] = None):
+    """Like googleapiclient's build(), on http (a new transport if None) and a cached discovery document."""
+    if http is None:
+        return build_from_document(discovery_document(api, version), credentials=credentials)
+    return build_from_document(discovery_document(api, version), http=AuthorizedHttp(credentials, http=http))
+
+def thread_transport(limiter: Optional[QuotaLimiter] = None) -> ThrottledHttp:
+    """This thread's Gmail transport, reset for a new scan under limiter. Not to be shared across threads."""
+    http = getattr(_local, "http", None)
+    if http is None:
+        http = _local.http = ThrottledHttp()
+    http.reset(limiter)
+    return http
+
+def _token_http() -> httplib2.Http:
+    # Token endpoint calls aren't Gmail quota, so they get a plain transport of their own
+    http = getattr(_local, "token_http", None)
+    if http is None:
+        http = _local.token_http = httplib2.Http()
+    return http
+
+def build_credentials(token: OAuthToken) -> Credentials:
+    return Credentials(
+        token=token.access_token,
+        refresh_token=token.refresh_token,
+        token_uri=TOKEN_URI,
+        client_id=settings.GOOGLE_CLIENT_ID,
+        client_secret=settings.GOOGLE_CLIENT_SECRET,
+        scopes=GMAIL_SCOPES,
+        # google-auth compares expiry against naive UTC
+        expiry=_utc(token.expires_at).replace(tzinfo=None) if token.expires_at else None,
+    )
+
+def store_credentials(token: OAuthToken, credentials: Credentials):
+    """Copy a (re)issued access token and its expiry onto token; the caller commits."""
+    token.access_token = credentials.token
+    token.expires_at = credentials.expiry.replace(tzinfo=timezone.utc) if credentials.expiry else None
+    if credentials.refresh_token:
+        token.refresh_token = credentials.refresh_token
+
+def needs_refresh(token: OAuthToken, margin: timedelta = REFRESH_MARGIN) -> bool:
+    # Tokens stored before expires_at was filled in are refreshed once to learn it
+    if not token.refresh_token:
+        return False
+    return token.expires_at is None or _utc(token.expires_at) - datetime.now(timezone.utc) < margin
+
+def _refresh_lock(user_id: int) -> _RefreshLock:
+    with _refresh_locks_guard:
+        lock = _refresh_locks.get(user_id)
+        if lock is None:
+            lock = _refresh_locks[user_id] = _RefreshLock()
+        return lock
+
+def fresh_credentials(session: Session, token: OAuthToken) -> Credentials:
+    """Credentials for token, refreshed first (and saved) if it expires within REFRESH_MARGIN."""
+    if needs_refresh(token):
+        with _refresh_lock(token.user_id):
+            # Another scan of this user may have refreshed it while we waited
+            session.refresh(token)
+            if needs_refresh(token):
+                credentials = build_credentials(token)
+                credentials.refresh(Request(_token_http()))
+                store_credentials(token, credentials)
+                session.add(token)
+                session.commit()
+    return build_credentials(token)
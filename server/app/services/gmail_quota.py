@@ -0,0 +1,142 @@
+"""
+Gmail API quota accounting for scans.
+
+Gmail charges each call in quota units and limits every user to a rate of them
+(developers.google.com/gmail/api/reference/quota); a batch is charged for every call
+inside it. ThrottledHttp is an httplib2 transport that waits on a per-user token bucket
+before each request goes out and retries 429/5xx responses with backoff, so a scan that
+runs next to many others stays under its user's quota instead of burning retries. Scans
+of the same user in one process share its bucket.
+"""
+import random
+import re
+import threading
+import time
+import weakref
+from typing import Optional
+import httplib2
+from app.core import metrics
+from app.core.config import settings
+
+# Units per call for the endpoints scans use; anything else is charged like a get
+QUOTA_UNITS = {
+    "messages.list": 5,
+    "messages.get": 5,
+    "history.list": 2,
+    "getProfile": 1,
+}
+DEFAULT_UNITS = 5
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 32.0
+
+_ENDPOINTS = [
+    ("messages.list", re.compile(r"/users/[^/]+/messages$")),
+    ("messages.get", re.compile(r"/users/[^/]+/messages/[^/]+$")),
+    ("history.list", re.compile(r"/users/[^/]+/history$")),
+    ("getProfile", re.compile(r"/users/[^/]+/profile$")),
+]
+_BATCH_PART = re.compile(r"^(?:GET|POST|PUT|PATCH|DELETE) (\S+) HTTP/", re.MULTILINE)
+
+def endpoint_name(path: str) -> Optional[str]:
+    path = path.split("?", 1)[0]
+    return next((name for name, pattern in _ENDPOINTS if pattern.search(path)), None)
+
+def call_units(path: str) -> int:
+    return QUOTA_UNITS.get(endpoint_name(path), DEFAULT_UNITS)
+
+def request_units(uri: str, body=None) -> int:
+    """Quota units Gmail charges for one HTTP request: the sum of its calls for a batch."""
+    if "/batch" in uri and body:
+        text = body.decode("utf-8", "replace") if isinstance(body, bytes) else body
+        parts = _BATCH_PART.findall(text)
+        if parts:
+            return sum(call_units(part) for part in parts)
+    return call_units(uri)
+
+def backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except ValueError:
+            pass  # HTTP-date form, fall back to our own schedule
+    # Full jitter, so scans throttled together don't retry together
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+class QuotaLimiter:
+    """Token bucket of quota units: rate per second, bursting up to one second's worth."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.available = rate
+        self.updated = time.monotonic()
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, units: int):
+        # Units are taken up front and the bucket may go into debt (a batch can cost more
+        # than a second's worth); the caller sleeps until the debt would be paid off
+        with self._lock:
+            now = time.monotonic()
+            self.available = min(self.rate, self.available + (now - self.updated) * self.rate)
+            self.updated = now
+            self.available -= units
+            wait = max(0.0, -self.available / self.rate)
+            self.waited += wait
+        if wait:
+            time.sleep(wait)
+
+class ThrottledHttp(httplib2.Http):
+    """
+    httplib2 transport for one user's Gmail calls: charges the limiter before every
+    request and retries 429/5xx responses up to max_retries times, honouring Retry-After.
+    Counts requests, units, throttled responses and retries for reporting.
+    """
+
+    def __init__(self, limiter: Optional[QuotaLimiter] = None, max_retries: Optional[int] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.max_retries = settings.GMAIL_MAX_RETRIES if max_retries is None else max_retries
+        self.reset(limiter)
+
+    def reset(self, limiter: Optional[QuotaLimiter] = None):
+        """Start accounting for another scan; open connections are kept."""
+        self.limiter = limiter
+        self.requests = self.units = self.throttled = self.retries = 0
+
+    def request(self, uri, method="GET", body=None, headers=None, *args, **kwargs):
+        units = request_units(uri, body)
+        attempt = 0
+        while True:
+            if self.limiter:
+                self.limiter.acquire(units)
+            self.requests += 1
+            self.units += units
+            response, content = super().request(uri, method, body, headers, *args, **kwargs)
+            # Calls inside a batch are counted by the scanner, as their responses come back
+            endpoint = "batch" if "/batch" in uri else endpoint_name(uri) or "other"
+            metrics.GMAIL_CALLS.inc(endpoint=endpoint, status=response.status)
+            if response.status not in RETRY_STATUSES or attempt >= self.max_retries:
+                return response, content
+            if response.status == 429:
+                self.throttled += 1
+            self.retries += 1
+            time.sleep(backoff_delay(attempt, response.get("retry-after")))
+            attempt += 1
+
+# A bucket left alone for a second is full again, so one nobody holds can go
+_limiters: "weakref.WeakValueDictionary[int, QuotaLimiter]" = weakref.WeakValueDictionary()
+_limiters_guard = threading.Lock()
+
+def user_limiter(user_id: int) -> Optional[QuotaLimiter]:
+    """
+    The limiter for user_id's scans in this process: GMAIL_USER_QUOTA_UNITS per second,
+    shared by every scan of theirs running at the same time. None if that is 0.
+    """
+    if settings.GMAIL_USER_QUOTA_UNITS <= 0:
+        return None
+    with _limiters_guard:
+        limiter = _limiters.get(user_id)
+        if limiter is None:
+            limiter = _limiters[user_id] = QuotaLimiter(settings.GMAIL_USER_QUOTA_UNITS)
+        return limiter
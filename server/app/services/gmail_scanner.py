@@ -1,136 +1,451 @@
-import re
 import logging
-from datetime import datetime
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from email.utils import getaddresses
+from itertools import islice
+from typing import Callable, Iterable, Iterator, Optional
+import json
+from sqlalchemy import insert
 from sqlmodel import Session, select
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from app.models.oauth import OAuthToken
+from googleapiclient.errors import HttpError
+from app.models.oauth import OAuthToken, GmailScanCursor
 from app.models.subscription import Subscription
+from app.core import metrics
 from app.core.config import settings
+from app.core.database import upsert_rows
+from app.core.tenancy import check_available, get_user_tenant, tenant_session
+from app.services.vendor_index import VendorIndex, get_tenant_vendor_index
+from app.services.amount_extraction import extract_money_batch
+from app.services.analytics_service import invalidate_stats
+from app.services.billing_engine import record_charges
+from app.services.gmail_client import (
+    build_credentials, build_service, fresh_credentials, store_credentials, thread_transport
+)
+from app.services.gmail_quota import RETRY_STATUSES, backoff_delay, user_limiter
+from app.services.rollup_service import refresh_rollups
 
 logger = logging.getLogger(__name__)
 
-def build_credentials(token: OAuthToken):
-    return Credentials(
-        token=token.access_token,
-        refresh_token=token.refresh_token,
-        token_uri="https://oauth2.googleapis.com/token",
-        client_id=settings.GOOGLE_CLIENT_ID,
-        client_secret=settings.GOOGLE_CLIENT_SECRET,
-        scopes=['https://www.googleapis.com/auth/gmail.readonly']
-    )
+# Gmail accepts up to 100 calls per batch but starts rate limiting well before that
+BATCH_SIZE = 50
+# messages.list and history.list both cap a page at 500
+PAGE_SIZE = 500
+METADATA_HEADERS = ['Subject', 'From', 'To']
 
-def extract_amount(text: str) -> float:
-    # Regex to find currency amounts like $9.99, $10, etc.
-    match = re.search(r'\$(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)', text)
-    if match:
-        try:
-            return float(match.group(1).replace(',', ''))
-        except ValueError:
-            return 0.0
-    return 0.0
-
-def scan_gmail_for_subscriptions(token: OAuthToken, session: Session) -> list[Subscription]:
-    creds = build_credentials(token)
-    service = build('gmail', 'v1', credentials=creds)
-    
-    found_subscriptions = []
-
-    # --- PASS 1: Receipts & Invoices (Active Spend) ---
-    query_receipts = 'subject:(receipt OR invoice OR subscription OR "your order") -to:me'
-    # Increased maxResults from 15 to 100 to catch older emails
-    results_receipts = service.users().messages().list(userId='me', q=query_receipts, maxResults=100).execute()
-    messages_receipts = results_receipts.get('messages', [])
-    
-    for msg in messages_receipts:
-        try:
-            msg_detail = service.users().messages().get(userId='me', id=msg['id']).execute()
-            headers = msg_detail['payload']['headers']
-            snippet = msg_detail.get('snippet', '')
-            
-            subject = next((h['value'] for h in headers if h['name'] == 'Subject'), "Unknown Subject")
-            sender = next((h['value'] for h in headers if h['name'] == 'From'), "Unknown Sender")
-            service_name = sender.split('<')[0].strip().replace('"', '')
-            
-            if not service_name: continue
-
-            amount = extract_amount(subject)
-            if amount == 0.0: amount = extract_amount(snippet)
-
-            existing = session.exec(select(Subscription).where(Subscription.name == service_name)).first()
-            if not existing:
-                new_sub = Subscription(
-                    name=service_name,
-                    amount=amount,
-                    team="Unassigned",
-                    seats_total=1,
-                    seats_unused=0,
-                    status="active",
-                    last_used=datetime.now().strftime("%Y-%m-%d")
+RECEIPT_TERMS = ['receipt', 'invoice', 'subscription', 'your order']
+ZOMBIE_TERMS = ['miss you', 'come back', 'inactive account', 'log back in']
+# Keep only the most recent ids on the cursor so the column doesn't grow with the mailbox
+MAX_PROCESSED_IDS = 2000
+
+def get_header(headers: list[dict], name: str, default: str) -> str:
+    return next((h['value'] for h in headers if h['name'] == name), default)
+
+def build_query(terms: list[str], after_ms: int | None = None) -> str:
+    joined = ' OR '.join(f'"{t}"' if ' ' in t else t for t in terms)
+    query = f'subject:({joined}) -to:me'
+    if after_ms:
+        query += f' after:{after_ms // 1000}'
+    return query
+
+def matches_terms(subject: str, terms: list[str]) -> bool:
+    # Local stand-in for the subject:(...) search, used on messages found through history
+    subject = subject.lower()
+    return any(term in subject for term in terms)
+
+def addressed_to(to: str, address: str) -> bool:
+    # Local stand-in for the query's to:me, likewise
+    address = address.lower()
+    return any(recipient.lower() == address for _, recipient in getaddresses([to]))
+
+def get_scan_cursor(session: Session, user_id: int) -> GmailScanCursor:
+    cursor = session.exec(select(GmailScanCursor).where(GmailScanCursor.user_id == user_id)).first()
+    return cursor or GmailScanCursor(user_id=user_id)
+
+# --- Pipeline: list pages -> fetch -> parse -> upsert ---
+# Every stage is a generator, so a scan holds at most one page of ids and one batch of
+# messages in memory however far back the mailbox goes.
+
+def iter_message_ids(service, query: str, max_messages: int) -> Iterator[str]:
+    """Follow messages.list pages for query until max_messages ids have been listed."""
+    page_token = None
+    remaining = max_messages
+    while remaining > 0:
+        response = service.users().messages().list(
+            userId='me', q=query, maxResults=min(PAGE_SIZE, remaining), pageToken=page_token
+        ).execute()
+        messages = response.get('messages', [])
+        for msg in messages[:remaining]:
+            yield msg['id']
+        remaining -= len(messages)
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return
+
+def open_history(service, start_history_id: str) -> tuple[str, Iterator[str]]:
+    """
+    Start paging users.history from start_history_id.
+    Returns the mailbox's current historyId and an iterator over the ids of added messages.
+    The first page is requested right away, so an expired cursor raises HttpError 404 here
+    rather than halfway through the pipeline.
+    """
+    def history_page(page_token: Optional[str]) -> dict:
+        return service.users().history().list(
+            userId='me', startHistoryId=start_history_id, historyTypes='messageAdded',
+            maxResults=PAGE_SIZE, pageToken=page_token
+        ).execute()
+
+    def added_ids(response: dict) -> Iterator[str]:
+        while True:
+            for record in response.get('history', []):
+                for added in record.get('messagesAdded', []):
+                    message = added['message']
+                    labels = message.get('labelIds', [])
+                    if 'SENT' in labels or 'DRAFT' in labels:
+                        continue
+                    yield message['id']
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return
+            response = history_page(page_token)
+
+    first_page = history_page(None)
+    return first_page.get('historyId', start_history_id), added_ids(first_page)
+
+def iter_message_metadata(service, message_ids: Iterable[str], kind: str) -> Iterator[dict]:
+    """
+    Fetch Subject/From metadata for message_ids using multipart batch requests.
+    Calls inside a batch answered with 429/5xx are sent again in a smaller batch after a
+    backoff; other failures are logged and skipped. Results keep the order of message_ids.
+    """
+    ids = iter(message_ids)
+    while True:
+        # dict.fromkeys drops duplicates, batch request ids have to be unique
+        chunk = list(dict.fromkeys(islice(ids, BATCH_SIZE)))
+        if not chunk:
+            return
+        details = {}
+        pending, attempt = chunk, 0
+
+        while pending:
+            retry = []
+
+            def on_response(request_id, response, exception):
+                if exception is not None:
+                    status = exception.resp.status if isinstance(exception, HttpError) else None
+                    metrics.GMAIL_CALLS.inc(endpoint="messages.get", status=status or "error")
+                    if status in RETRY_STATUSES and attempt < settings.GMAIL_MAX_RETRIES:
+                        retry.append(request_id)
+                        return
+                    logger.error(f"Error processing {kind} {request_id}: {exception}")
+                    return
+                metrics.GMAIL_CALLS.inc(endpoint="messages.get", status=200)
+                details[request_id] = response
+
+            batch = service.new_batch_http_request(callback=on_response)
+            for msg_id in pending:
+                batch.add(
+                    service.users().messages().get(
+                        userId='me', id=msg_id, format='metadata', metadataHeaders=METADATA_HEADERS
+                    ),
+                    request_id=msg_id
                 )
-                session.add(new_sub)
-                found_subscriptions.append(new_sub)
-            else:
-                # Update last used or amount if found again
-                if existing.amount == 0.0 and amount > 0:
-                    existing.amount = amount
-                    session.add(existing)
-                # Add to report even if existing, so user knows we saw it
-                if existing not in found_subscriptions:
-                    found_subscriptions.append(existing)
-
-        except Exception as e:
-            print(f"Error processing receipt {msg['id']}: {e}")
-            continue
+            try:
+                batch.execute()
+            except Exception as e:
+                logger.error(f"Error fetching {kind} batch of {len(pending)} messages: {e}")
+            pending = retry
+            if pending:
+                time.sleep(backoff_delay(attempt))
+                attempt += 1
 
-    # --- PASS 2: Inactivity & Zombie Detection ( The "Reaper" Pass ) ---
-    # Look for "We miss you", "Come back", "Inactive"
-    query_zombies = 'subject:("miss you" OR "come back" OR "inactive account" OR "log back in") -to:me'
-    results_zombies = service.users().messages().list(userId='me', q=query_zombies, maxResults=10).execute()
-    messages_zombies = results_zombies.get('messages', [])
+        for msg_id in chunk:
+            if msg_id in details:
+                yield details[msg_id]
 
-    for msg in messages_zombies:
-        try:
-            msg_detail = service.users().messages().get(userId='me', id=msg['id']).execute()
-            headers = msg_detail['payload']['headers']
-            sender = next((h['value'] for h in headers if h['name'] == 'From'), "Unknown")
-            service_name = sender.split('<')[0].strip().replace('"', '')
-
-            if not service_name: continue
-            
-            print(f"DEBUG: Found ZOMBIE signal from {service_name}")
-
-            existing = session.exec(select(Subscription).where(Subscription.name == service_name)).first()
-            if existing:
-                # Mark as Zombie if active
-                if existing.status == "active":
-                    existing.status = "zombie"
-                    existing.seats_unused = existing.seats_total # Assume full waste
-                    session.add(existing)
+def fetch_message_metadata(service, message_ids: list[str], kind: str) -> list[dict]:
+    return list(iter_message_metadata(service, message_ids, kind))
+
+def parse_messages(
+    details: Iterable[dict], kind: Optional[str], vendors: VendorIndex, mailbox: Optional[str] = None
+) -> Iterator[dict]:
+    """
+    Turn message metadata into scan signals, with the sender resolved to a canonical vendor.
+    With kind=None (history scans) the kind is worked out from the subject and
+    messages that are neither receipts nor zombie mail are dropped, as are ones sent to
+    mailbox (the scanned address), so history finds what the full scan's query would.
+    Amounts are extracted one fetch batch at a time through the batch extractor.
+    """
+    details = iter(details)
+    while True:
+        chunk = []
+        pulled = 0
+        for msg_detail in islice(details, BATCH_SIZE):
+            pulled += 1
+            try:
+                headers = msg_detail['payload']['headers']
+                subject = get_header(headers, 'Subject', "Unknown Subject")
+                sender = get_header(headers, 'From', "Unknown Sender")
+
+                msg_kind = kind
+                if msg_kind is None:
+                    if matches_terms(subject, RECEIPT_TERMS):
+                        msg_kind = "receipt"
+                    elif matches_terms(subject, ZOMBIE_TERMS):
+                        msg_kind = "zombie"
+                    else:
+                        continue
+                    if mailbox and addressed_to(get_header(headers, 'To', ""), mailbox):
+                        continue
+
+                vendor = vendors.resolve(sender)
+                chunk.append({
+                    "id": msg_detail['id'],
+                    "kind": msg_kind,
+                    "vendor_key": vendor.key if vendor else None,
+                    "service_name": vendor.name if vendor else None,
+                    "amount": 0.0,
+                    "currency": None,
+                    "internal_date": int(msg_detail.get('internalDate', 0)),
+                    # Subject and snippet are ranked together, so "total $0.00 ... charged $49.99" picks 49.99
+                    "text": f"{subject}\n{msg_detail.get('snippet', '')}",
+                })
+            except Exception as e:
+                logger.error(f"Error processing {kind or 'message'} {msg_detail.get('id')}: {e}")
+                continue
+        if not pulled:
+            return
+
+        receipts = [signal for signal in chunk if signal["kind"] == "receipt"]
+        for signal, money in zip(receipts, extract_money_batch(s["text"] for s in receipts)):
+            if money:
+                signal["amount"], signal["currency"] = money
+        for signal in chunk:
+            del signal["text"]
+            yield signal
+
+def add_receipt(candidates: dict[str, dict], signal: dict):
+    key = signal["vendor_key"]
+    candidate = candidates.get(key)
+    if candidate is None:
+        candidates[key] = {"name": signal["service_name"], "amount": signal["amount"], "receipt": True, "zombie": False}
+        return
+    candidate["receipt"] = True
+    # Keep the first amount we saw unless it was 0
+    if candidate["amount"] == 0.0 and signal["amount"] > 0:
+        candidate["amount"] = signal["amount"]
+
+def add_zombie(candidates: dict[str, dict], signal: dict):
+    key = signal["vendor_key"]
+    logger.debug(f"Found ZOMBIE signal from {signal['service_name']}")
+    candidate = candidates.setdefault(
+        key, {"name": signal["service_name"], "amount": 0.0, "receipt": False, "zombie": False}
+    )
+    candidate["zombie"] = True
+
+def save_candidates(session: Session, tenant_id: int, candidates: dict[str, dict]) -> list[Subscription]:
+    """
+    Write scan candidates (keyed by normalized vendor) into tenant_id's subscriptions, in
+    a constant number of statements:
+    one IN query for existing rows, one bulk insert, one upsert for changed rows and one
+    IN query to return the results.
+    """
+    if not candidates:
+        return []
+    keys = list(candidates)
+    existing = {}
+    # Teams can hold separate rows for one vendor, the oldest row is the one scans update
+    for sub in session.exec(
+        select(Subscription)
+        .where(Subscription.tenant_id == tenant_id, Subscription.vendor_key.in_(keys))
+        .order_by(Subscription.id)
+    ):
+        existing.setdefault(sub.vendor_key, sub)
+
+    new_rows, changed_rows, reported = [], [], []
+    today = datetime.now().strftime("%Y-%m-%d")
+    for key, candidate in candidates.items():
+        sub = existing.get(key)
+        if sub is None:
+            if candidate["receipt"]:
+                # Receipts create an active row, a zombie signal on top means nobody uses it
+                status, seats_unused, last_used = "active", 0, today
             else:
                 # Found a dormant account we didn't even know we paid for?
                 # Or maybe a free account we forgot. Let's add it as Zombie.
-                new_zombie = Subscription(
-                    name=service_name,
-                    amount=0.0, # Unknown cost
-                    team="Unassigned",
-                    seats_total=1,
-                    seats_unused=1,
-                    status="zombie",
-                    last_used="Long time ago"
-                )
-                session.add(new_zombie)
-                found_subscriptions.append(new_zombie)
-
-        except Exception as e:
-            logger.error(f"Error processing zombie {msg['id']}: {e}")
+                status, seats_unused, last_used = "zombie", 1, "Long time ago"
+            if candidate["zombie"]:
+                status, seats_unused = "zombie", 1 # Assume full waste
+            new_rows.append({
+                "tenant_id": tenant_id,
+                "name": candidate["name"],
+                "vendor_key": key,
+                "amount": candidate["amount"],
+                "team": "Unassigned",
+                "seats_total": 1,
+                "seats_unused": seats_unused,
+                "status": status,
+                "last_used": last_used,
+            })
+            reported.append(key)
             continue
-            
-    # Check if token was refreshed by the Google Client
-    if creds.token and creds.token != token.access_token:
-        logger.info("Access token refreshed. Updating DB...")
-        token.access_token = creds.token
-        session.add(token)
-        
-    session.commit()
+
+        row = sub.model_dump()
+        # Update amount if we only had 0 so far
+        if candidate["receipt"] and sub.amount == 0.0 and candidate["amount"] > 0:
+            row["amount"] = candidate["amount"]
+        # Mark as Zombie if active
+        if candidate["zombie"] and sub.status == "active":
+            row["status"] = "zombie"
+            row["seats_unused"] = sub.seats_total # Assume full waste
+        if row != sub.model_dump():
+            changed_rows.append(row)
+        # Add to report even if existing, so user knows we saw it
+        if candidate["receipt"]:
+            reported.append(key)
+
+    if new_rows:
+        session.execute(insert(Subscription), new_rows)
+    upsert_rows(session, Subscription, changed_rows, ["id"], ["amount", "status", "seats_unused"])
+    if changed_rows:
+        # The upsert bypasses the ORM, don't serve stale attributes from the identity map
+        session.expire_all()
+    if new_rows or changed_rows:
+        refresh_rollups(session, tenant_id)
+
+    if not reported:
+        return []
+    return list(session.exec(
+        select(Subscription).where(Subscription.tenant_id == tenant_id, Subscription.vendor_key.in_(reported))
+    ))
+
+def scan_gmail_for_subscriptions(
+    token: OAuthToken,
+    session: Session,
+    service=None,
+    max_messages: int = settings.SCAN_MAX_MESSAGES,
+    horizon_days: int = settings.SCAN_HORIZON_DAYS,
+    progress: Optional[Callable[[str, int, int], None]] = None,
+    http=None,
+) -> list[Subscription]:
+    """
+    Scan the mailbox behind token for receipts and zombie signals.
+    Full scans list at most max_messages messages per pass and nothing older than horizon_days,
+    history scans read everything added since the cursor.
+    progress, if given, is called as progress(phase, messages_seen, subscriptions_found).
+    http, if given, is the httplib2 transport the Gmail service is built on (see gmail_quota);
+    by default the thread's pooled transport (see gmail_client).
+    """
+    def report(phase: str):
+        if progress:
+            progress(phase, messages_seen, len(candidates))
+
+    # Fail before reading any mail if the tenant's rows can't be written right now
+    tenant = get_user_tenant(session, token.user_id)
+    check_available(tenant)
+
+    if service is None:
+        # Refreshed now if it would expire mid-scan, rather than on a 401 halfway through
+        creds = fresh_credentials(session, token)
+        service = build_service('gmail', 'v1', creds, http or thread_transport(user_limiter(token.user_id)))
+    else:
+        creds = build_credentials(token)
+
+    candidates = {}
+    receipts = []  # every receipt signal, stored as charge events once the scan is done
+    messages_seen = 0
+    timer = metrics.PhaseTimer()
+    vendors = get_tenant_vendor_index(session, tenant.id)
+
+    cursor = get_scan_cursor(session, token.user_id)
+    processed_ids = deque(json.loads(cursor.processed_ids or "[]"), maxlen=MAX_PROCESSED_IDS)
+    processed = set(processed_ids)
+
+    # Set on the cursor only when it is saved with the scan's results: a caller committing
+    # this session mid-scan (or a scan that fails) mustn't move it past unsaved mail
+    email_address, newest = cursor.email_address, cursor.last_internal_date or 0
+
+    def unseen(message_ids: Iterable[str]) -> Iterator[str]:
+        return (msg_id for msg_id in message_ids if msg_id not in processed)
+
+    passes = None
+    if cursor.history_id:
+        try:
+            with timer.phase("list"):
+                history_id, added_ids = open_history(service, cursor.history_id)
+                if not email_address:
+                    # A cursor from before addresses were kept on it
+                    email_address = service.users().getProfile(userId='me').execute().get('emailAddress')
+            # No budget here: stopping early would move the cursor past mail we never read
+            passes = [(None, unseen(timer.iterate(added_ids, "list")))]
+        except HttpError as e:
+            if e.resp.status != 404:
+                raise
+            logger.info(f"History cursor for user {token.user_id} expired, falling back to a full scan")
+    if passes is None:
+        # Read the historyId before listing so nothing delivered mid-scan falls between the two
+        with timer.phase("list"):
+            profile = service.users().getProfile(userId='me').execute()
+        history_id = profile['historyId']
+        email_address = profile.get('emailAddress')
+        horizon = datetime.now(timezone.utc) - timedelta(days=horizon_days)
+        after_ms = max(int(horizon.timestamp() * 1000), cursor.last_internal_date or 0)
+        passes = [
+            # PASS 1: Receipts & Invoices (Active Spend)
+            ("receipt", unseen(timer.iterate(
+                iter_message_ids(service, build_query(RECEIPT_TERMS, after_ms), max_messages), "list"
+            ))),
+            # PASS 2: Inactivity & Zombie Detection ( The "Reaper" Pass )
+            ("zombie", unseen(timer.iterate(
+                iter_message_ids(service, build_query(ZOMBIE_TERMS, after_ms), max_messages), "list"
+            ))),
+        ]
+
+    # Listing and fetching charge their own phases from inside the pipeline, the rest is parsing
+    with timer.phase("parse"):
+        for kind, message_ids in passes:
+            phase = f"{kind}s" if kind else "history"
+            report(phase)
+            details = timer.iterate(iter_message_metadata(service, message_ids, kind or "message"), "fetch")
+            for signal in parse_messages(details, kind, vendors, email_address):
+                messages_seen += 1
+                # Once a batch; progress writes take a database round trip
+                if messages_seen % BATCH_SIZE == 0:
+                    report(phase)
+                newest = max(newest, signal["internal_date"])
+                processed_ids.append(signal["id"])
+                if not signal["vendor_key"]:
+                    continue
+                if signal["kind"] == "receipt":
+                    add_receipt(candidates, signal)
+                    receipts.append(signal)
+                else:
+                    add_zombie(candidates, signal)
+
+    report("saving")
+    with timer.phase("upsert"), tenant_session(session, tenant) as data:
+        found_subscriptions = save_candidates(data, tenant.id, candidates)
+        new_charges = record_charges(data, tenant.id, token.user_id, receipts)
+
+        # Check if token was refreshed by the Google Client
+        if creds.token and creds.token != token.access_token:
+            logger.info("Access token refreshed. Updating DB...")
+            store_credentials(token, creds)
+            session.add(token)
+
+        cursor.history_id = str(history_id)
+        cursor.email_address = email_address
+        cursor.last_internal_date = newest or None
+        cursor.processed_ids = json.dumps(list(processed_ids))
+        cursor.updated_at = datetime.now(timezone.utc)
+        session.add(cursor)
+
+        if data is not session:
+            # Dedicated storage commits separately and first: if the cursor commit fails, the
+            # next scan replays these messages and both writes above skip what's already there
+            data.commit()
+        session.commit()
+    timer.record()
+    if found_subscriptions or new_charges:
+        invalidate_stats(tenant.id)
     return found_subscriptions
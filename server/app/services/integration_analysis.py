@@ -0,0 +1,79 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.database import get_async_engine
+from app.core.tenancy import get_user_tenant, tenant_async_engine
+from app.models.analysis_job import AnalysisJob
+from app.models.subscription import Subscription
+from app.services.accounting_connectors import get_connector
+from app.services.analytics_service import WASTE_STATUSES
+from app.services.vendor_index import get_tenant_vendor_index
+
+logger = logging.getLogger(__name__)
+
+# A vendor billed at least this many times in the books counts as a recurring charge
+RECURRING_MIN_CHARGES = 2
+
+# Strong references to in-flight analyses, the event loop only keeps weak ones
+_tasks: set[asyncio.Task] = set()
+
+async def enqueue_analysis(session: AsyncSession, user_id: int, service: str, api_key: str) -> AnalysisJob:
+    """
+    Record a queued analysis and start it on the event loop.
+    Runs in this process only, so a restart mid-analysis leaves the job to be re-requested.
+    """
+    job = AnalysisJob(user_id=user_id, service=service.lower())
+    session.add(job)
+    await session.commit()
+    await session.refresh(job)
+
+    task = asyncio.create_task(run_analysis(job.id, api_key))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return job
+
+async def run_analysis(job_id: int, api_key: str):
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        job = await session.get(AnalysisJob, job_id)
+        job.status = "running"
+        job.started_at = datetime.now(timezone.utc)
+        session.add(job)
+        await session.commit()
+
+        try:
+            tenant = await session.run_sync(get_user_tenant, job.user_id)
+            vendors = await session.run_sync(get_tenant_vendor_index, tenant.id)
+            charges = defaultdict(list)
+            async for expense in get_connector(job.service).iter_expenses(api_key):
+                job.analyzed_count += 1
+                charges[vendors.key_for(expense.vendor)].append(expense)
+            recurring = {key: items for key, items in charges.items() if len(items) >= RECURRING_MIN_CHARGES}
+
+            # Still being billed for something already flagged as unused
+            flagged = set()
+            if recurring:
+                async with AsyncSession(tenant_async_engine(tenant)) as data:
+                    flagged = set((await data.exec(
+                        select(Subscription.vendor_key).where(
+                            Subscription.tenant_id == tenant.id,
+                            Subscription.vendor_key.in_(list(recurring)),
+                            Subscription.status.in_(WASTE_STATUSES)
+                        )
+                    )).all())
+
+            job.recurring_vendors = len(recurring)
+            job.zombies_found = len(flagged)
+            # The latest charge is what cancelling would save each billing period
+            job.potential_savings = round(sum(max(recurring[key], key=lambda e: e.date).amount for key in flagged), 2)
+            job.status = "succeeded"
+        except Exception as e:
+            logger.exception(f"Analysis job {job_id} failed")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+            session.add(job)
+            await session.commit()
@@ -0,0 +1,115 @@
+"""
+Recurring-charge detection over per-merchant charge series.
+
+A merchant is recurring when it has charged at least MIN_CHARGES times, most gaps between
+charges sit near one billing cadence, and the amount barely moves. Input comes in
+batches of merchants laid end to end (the order an index scan on merchant, date yields):
+keys, the offset where each merchant's charges start, then flat date and amount arrays.
+
+With NumPy installed a whole batch is scored at once with segmented reductions
+(np.add.reduceat); without it the same rules run as a plain loop per merchant.
+"""
+from datetime import date
+from typing import NamedTuple
+
+try:
+    import numpy as np
+except ImportError:  # optional, the loop below gives the same answers
+    np = None
+
+MIN_CHARGES = 3
+# name, days between charges, tolerance in days either side
+CADENCES = (
+    ("weekly", 7, 1),
+    ("monthly", 30.4, 4),
+    ("quarterly", 91.3, 8),
+    ("yearly", 365.25, 12),
+)
+# Share of gaps that have to land on the cadence, so one skipped or late charge is fine
+MIN_REGULARITY = 0.75
+# Coefficient of variation of the amounts: a price change or two is fine, random spend isn't
+MAX_AMOUNT_CV = 0.15
+
+class RecurringCharge(NamedTuple):
+    key: str
+    cadence: str
+    amount: float  # latest charge
+    charges: int
+    last_charged: date
+
+def classify_interval(days: float) -> str | None:
+    """Cadence a typical gap between charges falls on, None if it's none of them."""
+    for name, cadence_days, tolerance in CADENCES:
+        if abs(days - cadence_days) <= tolerance:
+            return name
+    return None
+
+def _cadence(hits: list[int], gaps: int) -> str | None:
+    best = max(range(len(CADENCES)), key=lambda i: hits[i])
+    if gaps and hits[best] / gaps >= MIN_REGULARITY:
+        return CADENCES[best][0]
+    return None
+
+def _detect_loop(keys: list[str], starts: list[int], dates: list[int], amounts: list[float]) -> list[RecurringCharge]:
+    found = []
+    bounds = list(starts) + [len(dates)]
+    for i, key in enumerate(keys):
+        lo, hi = bounds[i], bounds[i + 1]
+        count = hi - lo
+        if count < MIN_CHARGES:
+            continue
+        gaps = [dates[j + 1] - dates[j] for j in range(lo, hi - 1)]
+        hits = [sum(abs(gap - days) <= tolerance for gap in gaps) for _, days, tolerance in CADENCES]
+        cadence = _cadence(hits, len(gaps))
+        if cadence is None:
+            continue
+        values = amounts[lo:hi]
+        mean = sum(values) / count
+        variance = max(sum(v * v for v in values) / count - mean * mean, 0.0)
+        if mean <= 0 or variance ** 0.5 / mean > MAX_AMOUNT_CV:
+            continue
+        found.append(RecurringCharge(key, cadence, round(values[-1], 2), count, date.fromordinal(dates[hi - 1])))
+    return found
+
+def _detect_numpy(keys: list[str], starts: list[int], dates: list[int], amounts: list[float]) -> list[RecurringCharge]:
+    dates = np.asarray(dates, dtype=np.int64)
+    amounts = np.asarray(amounts, dtype=np.float64)
+    starts = np.asarray(starts, dtype=np.int64)
+    counts = np.diff(np.append(starts, len(dates)))
+    ends = starts + counts - 1
+
+    # gaps[j] is the gap between charge j and j+1, padded so reduceat over starts sums each
+    # merchant's own gaps; the gap that crosses into the next merchant is masked out
+    gaps = np.append(np.diff(dates), 0)
+    own = np.ones(len(dates), dtype=bool)
+    own[ends] = False
+    hits = np.stack([
+        np.add.reduceat((np.abs(gaps - days) <= tolerance) & own, starts)
+        for _, days, tolerance in CADENCES
+    ])
+    best = hits.argmax(axis=0)
+    regular = hits[best, np.arange(len(starts))] >= MIN_REGULARITY * np.maximum(counts - 1, 1)
+
+    mean = np.add.reduceat(amounts, starts) / counts
+    variance = np.maximum(np.add.reduceat(amounts * amounts, starts) / counts - mean * mean, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stable = (mean > 0) & (np.sqrt(variance) / mean <= MAX_AMOUNT_CV)
+
+    found = []
+    for i in np.flatnonzero((counts >= MIN_CHARGES) & regular & stable):
+        found.append(RecurringCharge(
+            keys[i], CADENCES[best[i]][0], round(float(amounts[ends[i]]), 2), int(counts[i]),
+            date.fromordinal(int(dates[ends[i]]))
+        ))
+    return found
+
+def detect_recurring(keys: list[str], starts: list[int], dates: list[int], amounts: list[float]) -> list[RecurringCharge]:
+    """
+    Score a batch of merchants. dates are proordinals sorted within each merchant, amounts
+    are positive charge sizes, starts[i] is where keys[i]'s charges begin.
+    """
+    if not keys:
+        return []
+    if np is not None:
+        return _detect_numpy(keys, starts, dates, amounts)
+    return _detect_loop(keys, starts, dates, amounts)
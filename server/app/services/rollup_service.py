@@ -0,0 +1,277 @@
+"""
+Daily and monthly spend rollups per tenant, team and status, for trend charts.
+
+A bucket is a closing snapshot: each group's amount, waste and row count as they stood at
+the end of that day or month. Subscription writes refresh today's and this month's bucket
+in their own transaction: the first write into a bucket snapshots every group, later ones
+add the written rows' before/after difference to their groups, the same deltas the /stats
+cache applies. A periodic compaction re-snapshots the current buckets, which picks up writes
+that went around the services and float drift, and folds daily buckets past retention into
+their month.
+
+Days without writes have no bucket and readers carry the previous one forward, so a read
+touches the buckets in its range plus one before it, however long the history.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, Optional
+from sqlalchemy import and_, bindparam, delete, func, insert, or_, update
+from sqlmodel import Session, select
+from app.core.config import settings
+from app.core.database import engine, upsert_rows
+from app.core.tenancy import dedicated_engine
+from app.models.organization import Organization
+from app.models.spend_rollup import SpendRollup
+from app.models.subscription import Subscription
+from app.services.analytics_service import contribution, team_label, wasted_amount
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ("day", "month")
+# Default range when a read doesn't give one
+DEFAULT_SPAN = {"day": timedelta(days=30), "month": timedelta(days=365)}
+# Most buckets a single read may return
+MAX_BUCKETS = 3660
+
+_KEY = ["tenant_id", "granularity", "bucket", "team", "status"]
+_VALUES = ["amount", "wasted", "subscriptions"]
+
+def _today() -> date:
+    return datetime.now(timezone.utc).date()
+
+def bucket_start(day: date, granularity: str) -> date:
+    return day.replace(day=1) if granularity == "month" else day
+
+def _next_bucket(bucket: date, granularity: str) -> date:
+    if granularity == "month":
+        return (bucket + timedelta(days=32)).replace(day=1)
+    return bucket + timedelta(days=1)
+
+def _bucket_count(first: date, last: date, granularity: str) -> int:
+    if granularity == "month":
+        return (last.year - first.year) * 12 + last.month - first.month + 1
+    return (last - first).days + 1
+
+def _snapshot(session: Session, tenant_id: Optional[int] = None) -> list[tuple]:
+    """
+    (tenant_id, team, status, amount, wasted, count) per group, for one tenant (a range of
+    the covering index) or for every tenant in session's storage.
+    """
+    team = team_label()
+    query = select(
+        Subscription.tenant_id, team, Subscription.status,
+        func.sum(Subscription.amount), func.sum(wasted_amount()), func.count()
+    )
+    if tenant_id is not None:
+        query = query.where(Subscription.tenant_id == tenant_id)
+    return [tuple(row) for row in session.exec(query.group_by(Subscription.tenant_id, team, Subscription.status))]
+
+def _deltas(changes: Iterable[tuple[Optional[dict], Optional[dict]]]) -> dict[tuple[str, str], list]:
+    """[amount, wasted, count] change per (team, status) group for (before, after) row pairs."""
+    deltas = defaultdict(lambda: [0.0, 0.0, 0])
+    for before, after in changes:
+        for sub, sign in ((before, -1), (after, 1)):
+            if sub is None:
+                continue
+            part = contribution(sub)
+            delta = deltas[(sub.get("team") or "Unassigned", sub.get("status") or "active")]
+            delta[0] += sign * part["amount"]
+            delta[1] += sign * part["totals"]["wasted_spend"]
+            delta[2] += sign
+    return {group: delta for group, delta in deltas.items() if any(delta)}
+
+def _rows(snapshot: list[tuple], buckets: list[tuple[str, date]]) -> list[dict]:
+    return [
+        {"tenant_id": tenant_id, "granularity": granularity, "bucket": bucket, "team": team, "status": status,
+         "amount": amount or 0, "wasted": wasted or 0, "subscriptions": count}
+        for granularity, bucket in buckets
+        for tenant_id, team, status, amount, wasted, count in snapshot
+    ]
+
+def _write_snapshot(session: Session, buckets: list[tuple[str, date]], snapshot: list[tuple], tenant_id: Optional[int] = None):
+    """
+    Set buckets to snapshot, for one tenant or all of them. Rows are zeroed and upserted
+    rather than deleted and reinserted, so a concurrent delta waits on the row lock and
+    lands on top instead of failing on the unique key.
+    """
+    for granularity, bucket in buckets:
+        clear = update(SpendRollup).where(SpendRollup.granularity == granularity, SpendRollup.bucket == bucket)
+        if tenant_id is not None:
+            clear = clear.where(SpendRollup.tenant_id == tenant_id)
+        session.execute(clear.values(amount=0, wasted=0, subscriptions=0))
+    upsert_rows(session, SpendRollup, _rows(snapshot, buckets), _KEY, _VALUES)
+
+_table = SpendRollup.__table__
+# Built once: constructing these expressions per write cost more than running them
+_BUCKETS_PRESENT = select(_table.c.granularity).where(_table.c.tenant_id == bindparam("tenant"), or_(
+    and_(_table.c.granularity == "day", _table.c.bucket == bindparam("day")),
+    and_(_table.c.granularity == "month", _table.c.bucket == bindparam("month")),
+)).distinct()
+_ADD_TO_GROUP = update(_table).where(
+    _table.c.tenant_id == bindparam("tenant"),
+    _table.c.granularity == bindparam("g"),
+    _table.c.bucket == bindparam("b"),
+    _table.c.team == bindparam("t"),
+    _table.c.status == bindparam("s"),
+).values(
+    amount=_table.c.amount + bindparam("amount"),
+    wasted=_table.c.wasted + bindparam("wasted"),
+    subscriptions=_table.c.subscriptions + bindparam("subscriptions"),
+)
+
+def _current_buckets() -> list[tuple[str, date]]:
+    today = _today()
+    return [(granularity, bucket_start(today, granularity)) for granularity in GRANULARITIES]
+
+def refresh_rollups(
+    session: Session,
+    tenant_id: int,
+    changes: Optional[Iterable[tuple[Optional[dict], Optional[dict]]]] = None
+):
+    """
+    Bring tenant_id's buckets for today and this month in line with subscription writes
+    made in this session's transaction. changes holds (before, after) row dicts, before
+    None for inserts; None means any group may have moved. Doesn't commit.
+    """
+    buckets = _current_buckets()
+    present = set(session.execute(_BUCKETS_PRESENT, {"tenant": tenant_id, **dict(buckets)}).scalars())
+    full = buckets if changes is None else [b for b in buckets if b[0] not in present]
+    if full:
+        _write_snapshot(session, full, _snapshot(session, tenant_id), tenant_id)
+    partial = [b for b in buckets if b not in full]
+    if not partial:
+        return
+
+    for (team, status), (amount, wasted, count) in _deltas(changes).items():
+        for granularity, bucket in partial:
+            values = {"amount": amount, "wasted": wasted, "subscriptions": count}
+            group = {"tenant": tenant_id, "g": granularity, "b": bucket, "t": team, "s": status}
+            result = session.execute(_ADD_TO_GROUP, {**group, **values})
+            if result.rowcount == 0:
+                # The bucket holds every group that had rows, so a missing one started from zero
+                session.execute(insert(_table), {
+                    "tenant_id": tenant_id, "granularity": granularity, "bucket": bucket, "team": team, "status": status,
+                    **values
+                })
+
+def compact_rollups(session: Session, retain_days: Optional[int] = None) -> int:
+    """
+    For every tenant in session's storage: re-snapshot the current buckets, then fold the
+    daily buckets of months that are wholly past retention into their month bucket and drop
+    them. Returns how many daily rows were removed. Commits.
+    """
+    retain_days = settings.ROLLUP_DAILY_RETENTION_DAYS if retain_days is None else retain_days
+    _write_snapshot(session, _current_buckets(), _snapshot(session))
+    removed = 0
+    if retain_days > 0:
+        cutoff = (_today() - timedelta(days=retain_days)).replace(day=1)
+        is_old_day = and_(SpendRollup.granularity == "day", SpendRollup.bucket < cutoff)
+        # Each tenant's month takes the groups of its last daily bucket in that month
+        closing = {}
+        for row in session.exec(
+            select(SpendRollup.tenant_id, SpendRollup.bucket, SpendRollup.team, SpendRollup.status,
+                   SpendRollup.amount, SpendRollup.wasted, SpendRollup.subscriptions)
+            .where(is_old_day).order_by(SpendRollup.tenant_id, SpendRollup.bucket)
+        ):
+            month = (row.tenant_id, row.bucket.replace(day=1))
+            if month not in closing or closing[month][0] != row.bucket:
+                closing[month] = (row.bucket, [])
+            closing[month][1].append((row.tenant_id, row.team, row.status, row.amount, row.wasted, row.subscriptions))
+        month_rows = []
+        for (_, month), (_, snapshot) in closing.items():
+            month_rows += _rows(snapshot, [("month", month)])
+        upsert_rows(session, SpendRollup, month_rows, _KEY, _VALUES)
+        if closing:
+            removed = session.execute(delete(SpendRollup).where(is_old_day)).rowcount
+    session.commit()
+    return removed
+
+async def compaction_loop(interval: int):
+    """Run compact_rollups now and then every interval seconds, until cancelled."""
+    while True:
+        try:
+            removed = await asyncio.to_thread(_compact)
+            if removed:
+                logger.info(f"Rollup compaction folded {removed} daily rows into months")
+        except Exception:
+            logger.exception("Rollup compaction failed")
+        await asyncio.sleep(interval)
+
+def _compact() -> int:
+    with Session(engine) as session:
+        removed = compact_rollups(session)
+        dedicated = session.exec(select(Organization.id).where(Organization.storage == "dedicated")).all()
+    for tenant_id in dedicated:
+        with Session(dedicated_engine(tenant_id)) as session:
+            removed += compact_rollups(session)
+    return removed
+
+def get_timeseries(
+    session: Session,
+    tenant_id: int,
+    granularity: str = "day",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    group_by: str = "total"
+) -> dict:
+    """
+    A tenant's spend series between start and end (inclusive, end capped at today), one
+    column per bucket and one series per group. spend counts active subscriptions like /stats does,
+    amount counts every status. Raises ValueError for an empty or oversized range.
+    """
+    today = _today()
+    end = min(end or today, today)
+    start = start or end - DEFAULT_SPAN[granularity]
+    if start > end:
+        raise ValueError("'from' must not be after 'to'")
+    first, last = bucket_start(start, granularity), bucket_start(end, granularity)
+    if _bucket_count(first, last, granularity) > MAX_BUCKETS:
+        raise ValueError(f"At most {MAX_BUCKETS} buckets per request, use a coarser granularity or a shorter range")
+
+    of_granularity = and_(SpendRollup.tenant_id == tenant_id, SpendRollup.granularity == granularity)
+    # The newest bucket at or before the range start is what the range opens with
+    seed = session.exec(select(func.max(SpendRollup.bucket)).where(of_granularity, SpendRollup.bucket <= first)).one()
+    rows = session.exec(
+        select(SpendRollup.bucket, SpendRollup.team, SpendRollup.status, SpendRollup.amount, SpendRollup.wasted, SpendRollup.subscriptions)
+        .where(of_granularity, SpendRollup.bucket >= (seed or first), SpendRollup.bucket <= last)
+    ).all()
+
+    by_bucket = defaultdict(lambda: defaultdict(lambda: [0.0, 0.0, 0.0, 0]))
+    for bucket, team, status, amount, wasted, count in rows:
+        group = "total" if group_by == "total" else team if group_by == "team" else status
+        values = by_bucket[max(bucket, first)][group]
+        values[0] += amount if status == "active" else 0
+        values[1] += wasted
+        values[2] += amount
+        values[3] += count
+
+    labels, points, current = [], [], None
+    bucket = first
+    while bucket <= last:
+        current = by_bucket.get(bucket, current)
+        # Nothing recorded yet this early
+        if current is not None:
+            labels.append(bucket.isoformat())
+            points.append(current)
+        bucket = _next_bucket(bucket, granularity)
+
+    # Groups that never had a row in range, e.g. only the zero left behind by an earlier move
+    groups = sorted({group for point in points for group, values in point.items() if values[3]})
+    empty = [0.0, 0.0, 0.0, 0]
+    return {
+        "granularity": granularity,
+        "group_by": group_by,
+        "buckets": labels,
+        "series": [
+            {
+                "group": group,
+                "spend": [round(point.get(group, empty)[0], 2) for point in points],
+                "wasted_spend": [round(point.get(group, empty)[1], 2) for point in points],
+                "amount": [round(point.get(group, empty)[2], 2) for point in points],
+                "subscriptions": [point.get(group, empty)[3] for point in points],
+            }
+            for group in groups
+        ],
+    }
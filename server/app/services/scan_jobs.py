@@ -0,0 +1,133 @@
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from app.core.config import settings
+from app.core.database import engine
+from app.models.oauth import OAuthToken
+from app.models.scan_job import ScanJob
+
+logger = logging.getLogger(__name__)
+
+# Progress is written at most this often (plus on every phase change)
+PROGRESS_INTERVAL = 1.0
+# An in-flight job that hasn't written progress for this long is treated as dead,
+# e.g. its worker process was restarted mid-scan
+STALE_AFTER = timedelta(minutes=10)
+
+executor = ThreadPoolExecutor(max_workers=settings.SCAN_WORKERS, thread_name_prefix="scan-worker")
+
+def _utc(value: datetime) -> datetime:
+    # SQLite hands datetimes back without tzinfo
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def _save(session: Session, job: ScanJob):
+    job.updated_at = datetime.now(timezone.utc)
+    session.add(job)
+    session.commit()
+
+def get_active_job(session: Session, user_id: int) -> Optional[ScanJob]:
+    return session.exec(select(ScanJob).where(ScanJob.active_user_id == user_id)).first()
+
+def enqueue_scan(session: Session, user_id: int, max_messages: int, horizon_days: int) -> ScanJob:
+    """
+    Queue a scan for user_id and hand it to the worker pool.
+    If the user already has a scan in flight, that job is returned instead of starting another.
+    """
+    active = get_active_job(session, user_id)
+    if active:
+        if datetime.now(timezone.utc) - _utc(active.updated_at) < STALE_AFTER:
+            return active
+        logger.warning(f"Scan job {active.id} for user {user_id} went stale, releasing it")
+        active.status = "failed"
+        active.error = "Scan worker stopped responding"
+        active.active_user_id = None
+        active.finished_at = datetime.now(timezone.utc)
+        _save(session, active)
+
+    job = ScanJob(
+        user_id=user_id,
+        active_user_id=user_id,
+        max_messages=max_messages,
+        horizon_days=horizon_days
+    )
+    session.add(job)
+    try:
+        session.commit()
+    except IntegrityError:
+        # Another request queued a scan for this user between our check and insert
+        session.rollback()
+        return get_active_job(session, user_id)
+    session.refresh(job)
+
+    executor.submit(run_scan_job, job.id)
+    return job
+
+def enqueue_user_scan(user_id: int, max_messages: int, horizon_days: int) -> ScanJob:
+    """enqueue_scan on a session of its own, for async routes to run in the threadpool."""
+    with Session(engine) as session:
+        return enqueue_scan(session, user_id, max_messages, horizon_days)
+
+def run_scan_job(job_id: int, **scan_options) -> Optional[ScanJob]:
+    """
+    Run a queued job to completion and return it. scan_options are passed on to
+    scan_gmail_for_subscriptions (e.g. a throttled http transport).
+    """
+    # Imported here: the Google client stack is slow to import and API workers only need it once a scan runs
+    from app.services.gmail_scanner import scan_gmail_for_subscriptions
+
+    # The job is saved through a session of its own, so progress writes never commit the
+    # scan's half-done work (its cursor above all) along with it
+    with Session(engine, expire_on_commit=False) as jobs:
+        job = jobs.get(ScanJob, job_id)
+        if not job or job.status != "queued":
+            return job
+
+        job.status = "running"
+        job.started_at = datetime.now(timezone.utc)
+        _save(jobs, job)
+        last_saved = time.monotonic()
+
+        def progress(phase: str, messages_seen: int, subscriptions_found: int):
+            nonlocal last_saved
+            phase_changed = phase != job.phase
+            job.phase = phase
+            job.messages_seen = messages_seen
+            job.subscriptions_found = subscriptions_found
+            if phase_changed or time.monotonic() - last_saved >= PROGRESS_INTERVAL:
+                _save(jobs, job)
+                last_saved = time.monotonic()
+
+        try:
+            # expire_on_commit=False so the scanner's commits don't reload every object it holds.
+            # Closed without a commit if the scan fails, which rolls back whatever it had written
+            with Session(engine, expire_on_commit=False) as session:
+                token = session.exec(select(OAuthToken).where(OAuthToken.user_id == job.user_id)).first()
+                if not token:
+                    raise ValueError("Gmail not connected")
+                results = scan_gmail_for_subscriptions(
+                    token,
+                    session,
+                    max_messages=job.max_messages,
+                    horizon_days=job.horizon_days,
+                    progress=progress,
+                    **scan_options
+                )
+            job.status = "succeeded"
+            job.phase = "done"
+            job.subscriptions_found = len(results)
+        except Exception as e:
+            logger.exception(f"Scan job {job_id} failed")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.active_user_id = None
+            job.finished_at = datetime.now(timezone.utc)
+            _save(jobs, job)
+        return job
+
+def shutdown():
+    executor.shutdown(wait=False, cancel_futures=True)
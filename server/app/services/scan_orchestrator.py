@@ -0,0 +1,223 @@
+"""
+Rescan of every connected Gmail mailbox, e.g. nightly.
+
+A run records one queued ScanJob per mailbox under a ScanRun, then scans them on a pool
+of SCAN_ORCHESTRATOR_CONCURRENCY threads through the same run_scan_job path API scans
+take. Every mailbox gets its own ThrottledHttp (app/services/gmail_quota.py), so each
+user stays under Gmail's per-user quota however many scans run at once, and 429/5xx
+answers are retried with backoff.
+
+The jobs are the checkpoint. A run that stops midway (crash, deploy, Ctrl-C) is picked
+up by the next invocation, which scans only the jobs not finished yet; scans that were
+in flight start over, and their history cursors make that cheap. Only one orchestrator
+should run at a time. A mailbox whose user already has a scan in flight from the API is
+skipped for the run.
+
+    cd server && python -m app.services.scan_orchestrator --concurrency 8
+    cd server && python -m app.services.scan_orchestrator --every 86400   # as a scheduler
+"""
+import argparse
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Optional
+from sqlalchemy import func, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from app.core.config import settings
+from app.core.database import engine
+from app.models.oauth import OAuthToken
+from app.models.scan_job import ScanJob, ScanRun
+from app.services.gmail_client import thread_transport
+from app.services.gmail_quota import ThrottledHttp, user_limiter
+from app.services.scan_jobs import run_scan_job
+
+logger = logging.getLogger(__name__)
+
+# Builds the Gmail service for (user id, transport); benchmarks point it at a fake server
+ServiceFactory = Callable[[int, ThrottledHttp], object]
+
+@dataclass
+class RunReport:
+    run_id: int
+    mailboxes: int  # in the run
+    scanned: int  # by this invocation
+    succeeded: int
+    failed: int
+    skipped: int
+    seconds: float
+    messages: int
+    requests: int = 0
+    quota_units: int = 0
+    throttled: int = 0
+    retries: int = 0
+
+    @property
+    def mailboxes_per_minute(self) -> float:
+        return self.scanned / self.seconds * 60 if self.seconds else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"run {self.run_id}: {self.scanned} of {self.mailboxes} mailboxes scanned in {self.seconds:.1f}s "
+            f"({self.mailboxes_per_minute:.1f}/min), {self.succeeded} succeeded, {self.failed} failed, "
+            f"{self.skipped} skipped; {self.messages} messages, {self.requests} Gmail requests, "
+            f"{self.quota_units} quota units, {self.throttled} throttled, {self.retries} retried"
+        )
+
+def start_run(
+    session: Session,
+    concurrency: int,
+    max_messages: int = settings.SCAN_MAX_MESSAGES,
+    horizon_days: int = settings.SCAN_HORIZON_DAYS,
+    user_ids: Optional[list[int]] = None,
+) -> ScanRun:
+    """Record a run with a queued job for every user with a Gmail token (or just user_ids)."""
+    query = select(OAuthToken.user_id).where(OAuthToken.provider == "google").distinct().order_by(OAuthToken.user_id)
+    if user_ids:
+        query = query.where(OAuthToken.user_id.in_(user_ids))
+    users = session.exec(query).all()
+
+    run = ScanRun(concurrency=concurrency, mailboxes=len(users))
+    session.add(run)
+    session.flush()
+    if users:
+        session.execute(insert(ScanJob), [
+            {"user_id": user_id, "run_id": run.id, "max_messages": max_messages, "horizon_days": horizon_days}
+            for user_id in users
+        ])
+    session.commit()
+    session.refresh(run)
+    return run
+
+def unfinished_run(session: Session) -> Optional[ScanRun]:
+    return session.exec(select(ScanRun).where(ScanRun.status == "running").order_by(ScanRun.id.desc())).first()
+
+def _pending_job_ids(session: Session, run_id: int) -> list[int]:
+    # Jobs left running belonged to an orchestrator that died; queue them again
+    session.execute(
+        update(ScanJob)
+        .where(ScanJob.run_id == run_id, ScanJob.status == "running")
+        .values(status="queued", phase="queued", active_user_id=None)
+    )
+    session.commit()
+    return session.exec(
+        select(ScanJob.id).where(ScanJob.run_id == run_id, ScanJob.status == "queued").order_by(ScanJob.id)
+    ).all()
+
+def _claim(job_id: int) -> Optional[ScanJob]:
+    """Mark the job as its user's scan in flight; None (and the job skipped) if one already is."""
+    with Session(engine, expire_on_commit=False) as session:
+        job = session.get(ScanJob, job_id)
+        job.active_user_id = job.user_id
+        session.add(job)
+        try:
+            session.commit()
+            return job
+        except IntegrityError:
+            session.rollback()
+        job = session.get(ScanJob, job_id)
+        job.status = "skipped"
+        job.phase = "done"
+        job.error = "Another scan of this mailbox was in flight"
+        job.finished_at = datetime.now(timezone.utc)
+        session.add(job)
+        session.commit()
+        return None
+
+def _scan(job_id: int, service_factory: Optional[ServiceFactory]) -> tuple[Optional[ScanJob], ThrottledHttp]:
+    job = _claim(job_id)
+    http = thread_transport(user_limiter(job.user_id) if job else None)
+    if job is None:
+        return None, http
+    service = service_factory(job.user_id, http) if service_factory else None
+    return run_scan_job(job_id, http=http, service=service), http
+
+def run_scans(
+    run: ScanRun,
+    concurrency: Optional[int] = None,
+    service_factory: Optional[ServiceFactory] = None,
+) -> RunReport:
+    """
+    Scan the run's pending mailboxes, at most concurrency at a time, and mark the run
+    finished. service_factory builds the Gmail service for a mailbox on its transport; by
+    default the scanner builds a real one from the user's credentials.
+    """
+    concurrency = concurrency or run.concurrency
+    with Session(engine) as session:
+        job_ids = _pending_job_ids(session, run.id)
+    logger.info(f"Scan run {run.id}: {len(job_ids)} of {run.mailboxes} mailboxes to scan, {concurrency} at a time")
+
+    report = RunReport(run.id, run.mailboxes, 0, 0, 0, 0, 0.0, 0)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="scan-orchestrator") as pool:
+        for job, http in pool.map(lambda job_id: _scan(job_id, service_factory), job_ids):
+            report.scanned += 1
+            report.requests += http.requests
+            report.quota_units += http.units
+            report.throttled += http.throttled
+            report.retries += http.retries
+            if job is None:
+                report.skipped += 1
+                continue
+            report.messages += job.messages_seen
+            if job.status == "succeeded":
+                report.succeeded += 1
+            else:
+                report.failed += 1
+    report.seconds = time.perf_counter() - start
+
+    with Session(engine) as session:
+        run = session.get(ScanRun, run.id)
+        run.status = "finished"
+        run.finished_at = datetime.now(timezone.utc)
+        session.add(run)
+        session.commit()
+    logger.info(report.summary())
+    return report
+
+def orchestrate(
+    concurrency: int = settings.SCAN_ORCHESTRATOR_CONCURRENCY,
+    new: bool = False,
+    service_factory: Optional[ServiceFactory] = None,
+    **run_options,
+) -> RunReport:
+    """Resume the last unfinished run, or start a new one (always, with new=True)."""
+    with Session(engine, expire_on_commit=False) as session:
+        run = None if new else unfinished_run(session)
+        if run:
+            done = session.exec(
+                select(func.count()).where(ScanJob.run_id == run.id, ScanJob.status.not_in(["queued", "running"]))
+            ).one()
+            logger.info(f"Resuming scan run {run.id} ({done} of {run.mailboxes} mailboxes done)")
+        else:
+            run = start_run(session, concurrency, **run_options)
+    return run_scans(run, concurrency, service_factory)
+
+def main():
+    parser = argparse.ArgumentParser(description="Rescan every connected Gmail mailbox.")
+    parser.add_argument("--concurrency", type=int, default=settings.SCAN_ORCHESTRATOR_CONCURRENCY)
+    parser.add_argument("--new", action="store_true", help="start a new run even if the last one is unfinished")
+    parser.add_argument("--users", type=int, nargs="+", help="only these user ids")
+    parser.add_argument("--max-messages", type=int, default=settings.SCAN_MAX_MESSAGES)
+    parser.add_argument("--horizon-days", type=int, default=settings.SCAN_HORIZON_DAYS)
+    parser.add_argument("--every", type=float, help="keep running, starting a run every this many seconds")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    new = args.new
+    while True:
+        started = time.monotonic()
+        report = orchestrate(
+            args.concurrency, new,
+            user_ids=args.users, max_messages=args.max_messages, horizon_days=args.horizon_days
+        )
+        print(report.summary())
+        if not args.every:
+            return
+        new = False
+        time.sleep(max(0.0, args.every - (time.monotonic() - started)))
+
+if __name__ == "__main__":
+    main()
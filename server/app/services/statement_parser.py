@@ -0,0 +1,239 @@
+"""
+Bank and card statement parsing: CSV exports and OFX/QBO (QuickBooks Web Connect) files.
+
+Files are parsed in byte ranges so several processes can work on one file. A record
+belongs to the range its first byte falls in: the reader of a range skips the partial
+record at its start (the previous range finishes it) and reads past its end to finish
+its own last record. CSV records are lines, so fields with embedded newlines aren't
+supported; bank exports don't use them.
+
+parse_range is what the process pool runs. It only depends on this module and the
+vendor index, so workers stay cheap to start.
+"""
+import csv
+import hashlib
+import re
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import NamedTuple, Optional
+from app.services.vendor_index import Vendor, VendorIndex, name_key
+
+FORMATS = ("csv", "ofx", "qbo")
+# Distinct lines line_ids keeps counts for
+LINE_ID_MEMORY = 100_000
+
+# Header names used by common bank/card exports, matched case-insensitively
+DATE_COLUMNS = ("date", "transaction date", "posted date", "posting date", "trans. date", "booking date")
+DESCRIPTION_COLUMNS = ("description", "payee", "merchant", "name", "details", "memo")
+AMOUNT_COLUMNS = ("amount", "transaction amount")
+DEBIT_COLUMNS = ("debit", "withdrawal", "withdrawals", "money out")
+CREDIT_COLUMNS = ("credit", "deposit", "deposits", "money in")
+CURRENCY_COLUMNS = ("currency",)
+ID_COLUMNS = ("transaction id", "reference", "fitid", "id")
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%d.%m.%Y", "%Y/%m/%d", "%Y%m%d")
+
+# Card processors and wallets put themselves in front of the merchant: "SQ *BLUE BOTTLE"
+_PROCESSOR_RE = re.compile(r"^\s*(?:SQ|TST|SP|PP|PAYPAL|IN|DD|PY|GOOGLE|APPLE\.COM/BILL|AMZN MKTP \w+)\s*\*\s*", re.IGNORECASE)
+# Store numbers, references, card masks, phone numbers, dates: any token with 3+ digits
+_NOISE_RE = re.compile(r"#?\S*\d\S*\d\S*\d\S*")
+US_STATES = {
+    "al", "ak", "az", "ar", "ca", "co", "ct", "de", "fl", "ga", "hi", "id", "il", "in", "ia", "ks", "ky",
+    "la", "me", "md", "ma", "mi", "mn", "ms", "mo", "mt", "ne", "nv", "nh", "nj", "nm", "ny", "nc", "nd",
+    "oh", "ok", "or", "pa", "ri", "sc", "sd", "tn", "tx", "ut", "vt", "va", "wa", "wv", "wi", "wy", "dc",
+}
+
+_STMTTRN_OPEN = b"<STMTTRN>"
+_STMTTRN_RE = re.compile(rb"<STMTTRN>(.*?)</STMTTRN>", re.DOTALL)
+_OFX_TAG_RE = re.compile(r"<(\w+)>([^<\r\n]*)")
+_CURDEF_RE = re.compile(rb"<CURDEF>\s*([A-Za-z]{3})")
+
+class ParsedTransaction(NamedTuple):
+    external_id: str
+    posted_on: date
+    description: str
+    merchant_key: str
+    amount: float  # negative is money out
+    currency: str
+
+class CsvLayout(NamedTuple):
+    columns: dict[str, int]  # role -> column index
+    delimiter: str
+
+def merchant(description: str, vendors: VendorIndex) -> Vendor:
+    """'SQ *NOTION LABS #4821 SAN FRANCISCO CA' -> Vendor('notion', 'Notion')"""
+    cleaned = _NOISE_RE.sub(" ", _PROCESSOR_RE.sub("", description))
+    words = name_key(cleaned).split()
+    # Statement lines carry a location after the merchant, so the longest known prefix wins
+    for end in range(len(words), 0, -1):
+        vendor = vendors.names.get(" ".join(words[:end]))
+        if vendor:
+            return vendor
+    if len(words) > 1 and words[-1] in US_STATES:
+        words = words[:-1]
+    key = " ".join(words) or name_key(description) or description.strip().lower()
+    return Vendor(key, " ".join(cleaned.split()).title() or description.strip())
+
+def parse_date(value: str) -> Optional[date]:
+    value = value.strip()[:10]
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+def parse_amount(value: str) -> Optional[float]:
+    """'$1,234.50' -> 1234.5, '1.234,50' -> 1234.5, '(12.00)' -> -12.0, '' -> None"""
+    value = value.strip().replace("$", "").replace("€", "").replace("£", "").replace(" ", "")
+    negative = value.startswith("(") and value.endswith(")")
+    value = value.strip("()")
+    if not value:
+        return None
+    # The last separator followed by one or two digits is the decimal point, either way round
+    last = max(value.rfind(","), value.rfind("."))
+    if last != -1 and len(value) - last - 1 in (1, 2):
+        value = value[:last].replace(",", "").replace(".", "") + "." + value[last + 1:]
+    else:
+        value = value.replace(",", "")
+    try:
+        amount = float(value)
+    except ValueError:
+        return None
+    return -amount if negative else amount
+
+def csv_layout(header: str) -> CsvLayout:
+    """Work out which columns hold what from an export's header line."""
+    delimiter = max((",", ";", "\t"), key=header.count)
+    names = [name.strip().strip('"').lower() for name in next(csv.reader([header], delimiter=delimiter))]
+    columns = {}
+    for role, candidates in [
+        ("date", DATE_COLUMNS), ("description", DESCRIPTION_COLUMNS), ("amount", AMOUNT_COLUMNS),
+        ("debit", DEBIT_COLUMNS), ("credit", CREDIT_COLUMNS), ("currency", CURRENCY_COLUMNS), ("id", ID_COLUMNS),
+    ]:
+        for candidate in candidates:
+            if candidate in names:
+                columns[role] = names.index(candidate)
+                break
+    if "date" not in columns or "description" not in columns or not ("amount" in columns or "debit" in columns):
+        raise ValueError("CSV header needs date, description and amount (or debit/credit) columns")
+    return CsvLayout(columns, delimiter)
+
+def ofx_currency(head: bytes) -> str:
+    match = _CURDEF_RE.search(head)
+    return match.group(1).decode().upper() if match else "USD"
+
+def read_csv_range(path: str, start: int, end: int) -> bytes:
+    with open(path, "rb") as f:
+        if start:
+            f.seek(start - 1)
+            f.readline()  # rest of a line the previous range owns (just "\n" if start is a line start)
+        data = f.read(max(0, end - f.tell()))
+        if data and not data.endswith(b"\n"):
+            data += f.readline()
+    return data
+
+def read_ofx_range(path: str, start: int, end: int) -> tuple[bytes, int]:
+    """Bytes from start through the end of the last transaction opening before end, and that cut-off."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        # Overlap by a tag's length so an opening tag straddling end is still seen here
+        data = f.read(end - start + len(_STMTTRN_OPEN) - 1)
+        while True:
+            last_open = data.rfind(_STMTTRN_OPEN, 0, end - start + len(_STMTTRN_OPEN) - 1)
+            if last_open == -1 or data.find(b"</STMTTRN>", last_open) != -1:
+                break
+            more = f.read(1 << 16)
+            if not more:
+                break
+            data += more
+    return data, end - start
+
+def parse_range(
+    path: str,
+    fmt: str,
+    start: int,
+    end: int,
+    layout: Optional[CsvLayout],
+    currency: str,
+    vendors: VendorIndex,
+    charges_positive: bool = False,
+) -> tuple[list[ParsedTransaction], int]:
+    """
+    Parse the records starting in [start, end) of path. Returns the transactions and how
+    many records were skipped for lacking a usable date or amount.
+    Each distinct description is normalized once per range; statement lines repeat a lot.
+    """
+    merchants: dict[str, str] = {}
+    dates: dict[str, Optional[date]] = {}
+    rows, skipped = [], 0
+
+    def add(external_id: str, raw_date: str, description: str, amount: Optional[float], row_currency: str):
+        nonlocal skipped
+        posted_on = dates.get(raw_date)
+        if posted_on is None and raw_date not in dates:
+            posted_on = dates[raw_date] = parse_date(raw_date)
+        if posted_on is None or amount is None:
+            skipped += 1
+            return
+        description = description.strip()
+        key = merchants.get(description)
+        if key is None:
+            key = merchants[description] = merchant(description, vendors).key
+        rows.append(ParsedTransaction(external_id, posted_on, description, key, amount, row_currency))
+
+    if fmt == "csv":
+        columns = layout.columns
+        data = read_csv_range(path, start, end)
+        lines = data.decode("utf-8", errors="replace").splitlines()
+        for line, record in zip(lines, csv.reader(lines, delimiter=layout.delimiter)):
+            if not record or len(record) <= max(columns.values()):
+                if line.strip():
+                    skipped += 1
+                continue
+            if "amount" in columns:
+                amount = parse_amount(record[columns["amount"]])
+                if amount is not None and charges_positive:
+                    amount = -amount
+            else:
+                debit = parse_amount(record[columns["debit"]]) or 0.0
+                credit = (parse_amount(record[columns["credit"]]) or 0.0) if "credit" in columns else 0.0
+                amount = abs(credit) - abs(debit) if (debit or credit) else None
+            # Left empty without an id column, for line_ids to fill in file order
+            external_id = record[columns["id"]].strip() if "id" in columns else ""
+            row_currency = record[columns["currency"]].strip().upper() if "currency" in columns else currency
+            add(external_id, record[columns["date"]], record[columns["description"]], amount, row_currency or currency)
+    else:
+        data, cutoff = read_ofx_range(path, start, end)
+        for match in _STMTTRN_RE.finditer(data):
+            if match.start() >= cutoff:
+                break
+            fields = dict(_OFX_TAG_RE.findall(match.group(1).decode("utf-8", errors="replace")))
+            description = fields.get("NAME") or fields.get("PAYEE") or fields.get("MEMO") or "Unknown"
+            external_id = fields.get("FITID", "").strip()
+            external_id = external_id or hashlib.blake2b(match.group(0), digest_size=12).hexdigest()
+            # DTPOSTED is YYYYMMDD[HHMMSS[.XXX][TZ]], the date part is enough here
+            add(external_id, fields.get("DTPOSTED", "")[:8], description, parse_amount(fields.get("TRNAMT", "")), currency)
+    return rows, skipped
+
+def line_ids(rows: list[ParsedTransaction], seen: OrderedDict) -> list[ParsedTransaction]:
+    """
+    Give the rows parse_range left without an external_id one made from their content and
+    how many identical rows came before them in the file: the same line in an overlapping
+    export gets the same id, and identical lines (two same-day charges of one amount)
+    stay two transactions. Ranges must be passed in file order with the same seen, which
+    counts the last LINE_ID_MEMORY distinct lines. Identical lines share a date, so in
+    a statement they sit close together; one seen again after that many others is
+    numbered from the start and merges with its first copy.
+    """
+    numbered = []
+    for row in rows:
+        if not row.external_id:
+            content = f"{row.posted_on}|{row.description}|{row.amount!r}|{row.currency}"
+            ordinal = seen.pop(content, -1) + 1
+            seen[content] = ordinal
+            if len(seen) > LINE_ID_MEMORY:
+                seen.popitem(last=False)
+            digest = hashlib.blake2b(f"{content}|{ordinal}".encode(), digest_size=12).hexdigest()
+            row = row._replace(external_id=digest)
+        numbered.append(row)
+    return numbered
@@ -1,35 +1,324 @@
+import base64
+import json
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import and_, bindparam, insert, or_, update
 from sqlmodel import Session, select
-from typing import List, Optional
+from typing import List, NamedTuple, Optional
 from app.models.subscription import Subscription
+from app.schemas.subscription import (
+    BulkResult, BulkRowResult, ChargeRecord, PriceChange, SubscriptionBulkUpdate, SubscriptionCreate,
+    SubscriptionFilter, SubscriptionHistory
+)
+from app.services.vendor_index import VendorIndex, get_tenant_vendor_index
+from app.services.analytics_service import invalidate_stats
+from app.services.billing_engine import get_charges, get_profile
+from app.services.rollup_service import refresh_rollups
+
+SORTABLE = {"id", "name", "team", "amount", "status"}
+
+def encode_cursor(sort: str, value, last_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([sort, value, last_id]).encode()).decode()
+
+def decode_cursor(cursor: str, sort: str) -> tuple:
+    try:
+        cursor_sort, value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        last_id = int(last_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if cursor_sort != sort:
+        raise ValueError("Cursor belongs to a different sort order")
+    return value, last_id
+
+def _validate_rows(rows: list, model: type[BaseModel]) -> tuple[list, List[BulkRowResult]]:
+    """Validate every row up front, collecting (row number, parsed row) pairs and per-row errors."""
+    valid, errors = [], []
+    for i, row in enumerate(rows):
+        try:
+            valid.append((i, model.model_validate(row)))
+        except ValidationError as e:
+            messages = [f"{'.'.join(str(part) for part in err['loc']) or 'row'}: {err['msg']}" for err in e.errors()]
+            errors.append(BulkRowResult(row=i, status="error", errors=messages))
+    return valid, errors
+
+def _rejected(valid: list, errors: List[BulkRowResult]) -> BulkResult:
+    skipped = [BulkRowResult(row=i, status="skipped") for i, _ in valid]
+    return BulkResult(succeeded=0, failed=len(errors), results=sorted(errors + skipped, key=lambda r: r.row))
+
+class PreparedRows(NamedTuple):
+    """
+    A bulk request's rows validated and turned into column values, the CPU-bound half of
+    bulk_create and bulk_update. Needs no database, so the API does it in a worker thread.
+    """
+    valid: list  # (row number, parsed row)
+    errors: List[BulkRowResult]
+    values: List[dict]  # per valid row: the row to insert, or the columns to update and its id
+
+def prepare_bulk_create(rows: list, tenant_id: int, vendors: VendorIndex, partial: bool = False) -> PreparedRows:
+    valid, errors = _validate_rows(rows, SubscriptionCreate)
+    if errors and not partial:
+        # Rejected as a whole, nothing will be written
+        return PreparedRows(valid, errors, [])
+    values = [{**item.model_dump(), "vendor_key": vendors.key_for(item.name), "tenant_id": tenant_id} for _, item in valid]
+    return PreparedRows(valid, errors, values)
+
+def prepare_bulk_update(rows: list, vendors: VendorIndex) -> PreparedRows:
+    valid, errors = _validate_rows(rows, SubscriptionBulkUpdate)
+    values = []
+    for _, item in valid:
+        # null means "leave unchanged", like an omitted field
+        data = item.model_dump(exclude_unset=True, exclude_none=True)
+        if "name" in data:
+            data["vendor_key"] = vendors.key_for(data["name"])
+        values.append(data)
+    return PreparedRows(valid, errors, values)
 
 class SubscriptionService:
-    def __init__(self, session: Session):
+    """
+    Subscriptions of one tenant; every read and write is scoped to tenant_id.
+    Names are keyed through vendors, the tenant's vendor index (the one scans resolve senders
+    with). Without it the index is read through session, which has to be on the shared
+    database then: aliases aren't kept in dedicated schemas.
+    """
+
+    def __init__(self, session: Session, tenant_id: int, vendors: Optional[VendorIndex] = None):
         self.session = session
+        self.tenant_id = tenant_id
+        self._vendors = vendors
+
+    @property
+    def vendors(self) -> VendorIndex:
+        if self._vendors is None:
+            self._vendors = get_tenant_vendor_index(self.session, self.tenant_id)
+        return self._vendors
+
+    def get_all(self, filters: Optional[SubscriptionFilter] = None) -> List[dict]:
+        """
+        Every matching subscription, as a dict of its fields. Read as plain columns: loading
+        Subscription objects into the session took longer than the query on large tenants,
+        and callers only serialize them.
+        """
+        fields = list(Subscription.model_fields)
+        query = select(*(getattr(Subscription, name) for name in fields))
+        if filters:
+            query = self.filtered(query, filters).order_by(Subscription.id)
+        else:
+            query = query.where(Subscription.tenant_id == self.tenant_id)
+        return [dict(zip(fields, row)) for row in self.session.exec(query).all()]
+
+    def get(self, sub_id: int) -> Optional[Subscription]:
+        sub = self.session.get(Subscription, sub_id)
+        return sub if sub and sub.tenant_id == self.tenant_id else None
+
+    def filtered(self, query, filters: SubscriptionFilter):
+        query = query.where(Subscription.tenant_id == self.tenant_id)
+        if filters.status:
+            query = query.where(Subscription.status.in_(filters.status))
+        if filters.team is not None:
+            query = query.where(Subscription.team == filters.team)
+        if filters.name_prefix:
+            escaped = filters.name_prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            query = query.where(Subscription.name.like(f"{escaped}%", escape="\\"))
+        if filters.min_amount is not None:
+            query = query.where(Subscription.amount >= filters.min_amount)
+        if filters.max_amount is not None:
+            query = query.where(Subscription.amount <= filters.max_amount)
+        return query
+
+    def list_page(
+        self,
+        filters: SubscriptionFilter,
+        sort: str = "id",
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        fields: Optional[List[str]] = None
+    ) -> tuple[List[dict], Optional[str]]:
+        """
+        One page of subscriptions, ordered by (sort column, id). The cursor carries the last
+        row's sort key, so each page is an index seek rather than an OFFSET scan.
+        Raises ValueError for unknown sort/field names or a malformed cursor.
+        """
+        descending = sort.startswith("-")
+        sort_name = sort.lstrip("-")
+        if sort_name not in SORTABLE:
+            raise ValueError(f"Cannot sort by '{sort_name}'")
+        fields = fields or list(Subscription.model_fields)
+        unknown = set(fields) - set(Subscription.model_fields)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        # id and the sort column are needed to build the next cursor even when not requested
+        selected = list(dict.fromkeys([*fields, "id", sort_name]))
 
-    def get_all(self) -> List[Subscription]:
-        return self.session.exec(select(Subscription)).all()
+        sort_col, id_col = getattr(Subscription, sort_name), Subscription.id
+        query = self.filtered(select(*(getattr(Subscription, name) for name in selected)), filters)
+        if cursor:
+            value, last_id = decode_cursor(cursor, sort)
+            if descending:
+                query = query.where(or_(sort_col < value, and_(sort_col == value, id_col < last_id)))
+            else:
+                query = query.where(or_(sort_col > value, and_(sort_col == value, id_col > last_id)))
+        if sort_name == "id":
+            order = [id_col.desc() if descending else id_col.asc()]
+        else:
+            order = [sort_col.desc(), id_col.desc()] if descending else [sort_col.asc(), id_col.asc()]
+        # Fetch one extra row to know whether another page exists
+        rows = self.session.exec(query.order_by(*order).limit(limit + 1)).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]._mapping
+            next_cursor = encode_cursor(sort, last[sort_name], last["id"])
+        # The requested fields lead the selected columns
+        return [dict(zip(fields, row)) for row in rows], next_cursor
 
     def create(self, subscription: Subscription) -> Subscription:
+        subscription.tenant_id = self.tenant_id
+        subscription.vendor_key = self.vendors.key_for(subscription.name)
         self.session.add(subscription)
+        refresh_rollups(self.session, self.tenant_id, [(None, subscription.model_dump())])
         self.session.commit()
         self.session.refresh(subscription)
+        invalidate_stats(self.tenant_id)
         return subscription
 
+    def bulk_create(self, rows: list, partial: bool = False, prepared: Optional[PreparedRows] = None) -> BulkResult:
+        """
+        Insert many subscriptions in one transaction. Without partial, any invalid row
+        rejects the whole batch; with it, valid rows are written and invalid ones reported.
+        prepared is prepare_bulk_create()'s result for rows when the caller already has it.
+        """
+        valid, errors, values = prepared or prepare_bulk_create(rows, self.tenant_id, self.vendors, partial)
+        if errors and not partial:
+            return _rejected(valid, errors)
+
+        ids = self._insert_returning_ids(values)
+        if values:
+            refresh_rollups(self.session, self.tenant_id, [(None, value) for value in values])
+        self.session.commit()
+        if values:
+            invalidate_stats(self.tenant_id)
+
+        created = [BulkRowResult(row=i, status="created", id=new_id) for (i, _), new_id in zip(valid, ids)]
+        return BulkResult(succeeded=len(created), failed=len(errors), results=sorted(errors + created, key=lambda r: r.row))
+
+    def _insert_returning_ids(self, values: List[dict]) -> List[int]:
+        if not values:
+            return []
+        table = Subscription.__table__
+        dialect = self.session.get_bind().dialect
+        if dialect.name == "sqlite":
+            # SQLAlchemy's parameter-ordered RETURNING sends one INSERT per row on SQLite. Rowids are
+            # handed out ascending in VALUES order and this transaction holds the write lock, so
+            # sorting the batched RETURNING ids lines them back up with the parameters.
+            return sorted(self.session.scalars(insert(table).returning(table.c.id), values))
+        if dialect.insert_executemany_returning_sort_by_parameter_order:
+            # Batched multi-row INSERT ... RETURNING, ids come back in parameter order
+            stmt = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+            return list(self.session.scalars(stmt, values))
+        # MySQL has no RETURNING, so let the ORM flush collect each row's lastrowid
+        subscriptions = [Subscription(**value) for value in values]
+        self.session.add_all(subscriptions)
+        self.session.flush()
+        return [sub.id for sub in subscriptions]
+
+    def bulk_update(self, rows: list, partial: bool = False, prepared: Optional[PreparedRows] = None) -> BulkResult:
+        """
+        Apply many partial updates (each row carries its id) in one transaction, same semantics
+        as bulk_create. prepared is prepare_bulk_update()'s result for rows when the caller has it.
+        """
+        valid, errors, values = prepared or prepare_bulk_update(rows, self.vendors)
+        errors = list(errors)
+
+        ids = [item.id for _, item in valid]
+        existing = set(self.session.exec(
+            select(Subscription.id).where(Subscription.tenant_id == self.tenant_id, Subscription.id.in_(ids))
+        ).all()) if ids else set()
+        found, seen = [], set()
+        for (i, item), data in zip(valid, values):
+            if item.id not in existing:
+                errors.append(BulkRowResult(row=i, status="error", id=item.id, errors=["Subscription not found"]))
+            elif item.id in seen:
+                errors.append(BulkRowResult(row=i, status="error", id=item.id, errors=["Duplicate id in batch"]))
+            else:
+                seen.add(item.id)
+                found.append((i, item, data))
+        if errors and not partial:
+            return _rejected([(i, item) for i, item, _ in found], errors)
+
+        # One executemany per distinct set of changed columns. The ORM's bulk update by
+        # primary key degrades to a statement per row on drivers without multi-row rowcounts.
+        groups: dict[tuple, List[dict]] = {}
+        for _, item, data in found:
+            changes = {column: value for column, value in data.items() if column != "id"}
+            if changes:
+                groups.setdefault(tuple(sorted(changes)), []).append({**changes, "row_id": item.id})
+        table = Subscription.__table__
+        for columns, params in groups.items():
+            stmt = (
+                update(table)
+                .where(table.c.tenant_id == self.tenant_id, table.c.id == bindparam("row_id"))
+                .values({c: bindparam(c) for c in columns})
+            )
+            self.session.execute(stmt, params)
+        if groups:
+            # Rows may have moved between any teams and statuses
+            refresh_rollups(self.session, self.tenant_id)
+        self.session.commit()
+        if groups:
+            invalidate_stats(self.tenant_id)
+
+        updated = [BulkRowResult(row=i, status="updated", id=item.id) for i, item, _ in found]
+        return BulkResult(succeeded=len(updated), failed=len(errors), results=sorted(errors + updated, key=lambda r: r.row))
+
+    def history(self, sub_id: int, limit: int = 100) -> Optional[SubscriptionHistory]:
+        """Billing analysis and the latest charges for a subscription's vendor, None if it doesn't exist."""
+        sub = self.get(sub_id)
+        if not sub:
+            return None
+        charges = get_charges(self.session, self.tenant_id, sub.vendor_key, limit)
+        history = SubscriptionHistory(
+            subscription_id=sub.id,
+            vendor_key=sub.vendor_key,
+            charges=[ChargeRecord.model_validate(event) for event in charges]
+        )
+        profile = get_profile(self.session, self.tenant_id, sub.vendor_key)
+        if profile:
+            history.cadence = profile.cadence
+            history.interval_days = profile.interval_days
+            history.charge_count = profile.charge_count
+            history.last_amount = profile.last_amount
+            history.last_charged_at = profile.last_charged_at
+            history.next_expected_at = profile.next_expected_at
+            if profile.price_changed_at:
+                history.price_change = PriceChange(
+                    previous_amount=profile.previous_amount,
+                    amount=profile.last_amount,
+                    change_pct=profile.price_change_pct,
+                    changed_at=profile.price_changed_at
+                )
+        return history
+
     def update(self, sub_id: int, subscription_data: dict) -> Optional[Subscription]:
-        db_sub = self.session.get(Subscription, sub_id)
+        db_sub = self.get(sub_id)
         if not db_sub:
             return None
+        before = db_sub.model_dump()
         
         for key, value in subscription_data.items():
-            setattr(db_sub, key, value)
+            # A row can't be renumbered or handed to another tenant
+            if key not in ("id", "tenant_id"):
+                setattr(db_sub, key, value)
+        db_sub.vendor_key = self.vendors.key_for(db_sub.name)
         
         self.session.add(db_sub)
+        refresh_rollups(self.session, self.tenant_id, [(before, db_sub.model_dump())])
         self.session.commit()
         self.session.refresh(db_sub)
+        invalidate_stats(self.tenant_id)
         return db_sub
     
     def seed_initial_data(self):
-        if not self.session.exec(select(Subscription)).first():
+        if not self.session.exec(select(Subscription).where(Subscription.tenant_id == self.tenant_id)).first():
             seed_data = [
                 Subscription(name="Notion", team="Engineering", amount=120, seats_total=12, seats_unused=0, status="active", last_used="2h ago"),
                 Subscription(name="Figma", team="Design", amount=450, seats_total=10, seats_unused=3, status="zombie", last_used="3mo ago"),
@@ -38,5 +327,9 @@ class SubscriptionService:
                 Subscription(name="Adobe CC", team="Design", amount=600, seats_total=5, seats_unused=1, status="zombie", last_used="4mo ago"),
             ]
             for sub in seed_data:
+                sub.tenant_id = self.tenant_id
+                sub.vendor_key = self.vendors.key_for(sub.name)
                 self.session.add(sub)
+            refresh_rollups(self.session, self.tenant_id)
             self.session.commit()
+            invalidate_stats(self.tenant_id)
@@ -0,0 +1,100 @@
+"""
+Moving a tenant from the shared tables into dedicated storage (see app/core/tenancy.py).
+
+The tenant is marked "moving" first, so the API answers its requests with 503 and
+background writers (scans, statement imports) fail instead of writing rows that would be
+left behind; they re-read the tenant right before writing. API workers cache the tenant
+with the user for PRINCIPAL_CACHE_TTL seconds (app/api/deps.py), so the move waits that
+long before copying anything. Its dedicated tables
+are then (re)created from the current models, its rows copied over in chunks with their
+ids kept, and finally the shared copies are deleted in the same transaction that marks
+the tenant "dedicated". A move that dies halfway leaves the tenant "moving" with all of
+its rows still in the shared tables; running it again starts the copy over.
+
+    cd server && python -m app.services.tenant_storage 42
+"""
+import argparse
+import logging
+import time
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.schema import CreateSchema
+from sqlmodel import Session, SQLModel
+from app.core.config import settings
+from app.core.database import engine
+from app.core.tenancy import TENANT_TABLES, dedicated_engine, is_sqlite, schema_name
+from app.models.organization import Organization
+from app.services.analytics_service import invalidate_stats
+
+logger = logging.getLogger(__name__)
+
+# Rows per copy batch
+COPY_CHUNK_ROWS = 5000
+
+def _mark(tenant_id: int, storage: str) -> Organization:
+    with Session(engine, expire_on_commit=False) as session:
+        tenant = session.get(Organization, tenant_id)
+        if tenant is None:
+            raise LookupError(f"Organization {tenant_id} not found")
+        tenant.storage = storage
+        session.add(tenant)
+        session.commit()
+        return tenant
+
+def _create_tables(tenant_id: int):
+    if not is_sqlite():
+        with engine.begin() as conn:
+            conn.execute(CreateSchema(schema_name(tenant_id), if_not_exists=True))
+    # Whatever an earlier, interrupted move left behind is thrown away
+    target = dedicated_engine(tenant_id)
+    SQLModel.metadata.drop_all(target, tables=TENANT_TABLES)
+    SQLModel.metadata.create_all(target, tables=TENANT_TABLES)
+
+def _copy_table(tenant_id: int, table) -> int:
+    copied = 0
+    query = select(table).where(table.c.tenant_id == tenant_id).order_by(table.c.id)
+    with engine.connect() as source, dedicated_engine(tenant_id).begin() as target:
+        result = source.execution_options(yield_per=COPY_CHUNK_ROWS).execute(query)
+        for chunk in result.mappings().partitions():
+            target.execute(insert(table), [dict(row) for row in chunk])
+            copied += len(chunk)
+        if copied and target.dialect.name == "postgresql":
+            # Rows kept their ids, so move the serial past them
+            target.execute(
+                text("SELECT setval(pg_get_serial_sequence(:table, 'id'), :last)"),
+                {"table": f"{schema_name(tenant_id)}.{table.name}", "last": target.scalar(select(func.max(table.c.id)))},
+            )
+    return copied
+
+def move_to_dedicated(tenant_id: int) -> dict[str, int]:
+    """Move tenant_id's rows into dedicated storage. Returns the rows copied per table."""
+    tenant = _mark(tenant_id, "moving")
+    logger.info(f"Moving organization {tenant_id} ({tenant.name}) to {schema_name(tenant_id)}")
+    if settings.PRINCIPAL_CACHE_TTL > 0:
+        # Until then a worker may still be writing to the shared tables from a cached tenant
+        logger.info(f"Waiting {settings.PRINCIPAL_CACHE_TTL}s for API workers' cached tenants to expire")
+        time.sleep(settings.PRINCIPAL_CACHE_TTL)
+    _create_tables(tenant_id)
+    copied = {table.name: _copy_table(tenant_id, table) for table in TENANT_TABLES}
+
+    with Session(engine) as session:
+        for table in TENANT_TABLES:
+            session.execute(delete(table).where(table.c.tenant_id == tenant_id))
+        tenant = session.get(Organization, tenant_id)
+        tenant.storage = "dedicated"
+        session.add(tenant)
+        session.commit()
+    # Cached stats are keyed by tenant and still right, but don't count on it
+    invalidate_stats(tenant_id)
+    logger.info(f"Organization {tenant_id} moved: {copied}")
+    return copied
+
+def main():
+    parser = argparse.ArgumentParser(description="Move an organization's rows into storage of its own.")
+    parser.add_argument("tenant_id", type=int)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    for table, rows in move_to_dedicated(args.tenant_id).items():
+        print(f"{table}: {rows} rows")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Transaction ingestion: statement file -> Transaction rows -> recurring charges -> Subscription.
+
+The file is cut into INGEST_CHUNK_BYTES ranges that a process pool parses in parallel
+(see statement_parser). The parent upserts each range's rows as it comes back and keeps
+at most two ranges per worker in flight, so memory stays flat for multi-GB files.
+Detection then streams the user's outflows back from the database in (merchant, date)
+order, one batch of merchants at a time, and the recurring ones go through the same
+save_candidates path as Gmail receipts.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Iterator, NamedTuple, Optional
+from sqlalchemy import func
+from sqlmodel import Session, select
+from app.core.config import settings
+from app.core.database import engine, upsert_rows
+from app.core.tenancy import check_available, get_user_tenant, tenant_session
+from app.models.organization import Organization
+from app.models.transaction import Transaction, TransactionImport
+from app.services.analytics_service import invalidate_stats
+from app.services.recurring_charges import CADENCES, RecurringCharge, detect_recurring
+from app.services.statement_parser import csv_layout, line_ids, merchant, ofx_currency, parse_range
+from app.services.vendor_index import get_tenant_vendor_index
+
+logger = logging.getLogger(__name__)
+
+# Charge rows per detection batch (merchants are never split across batches)
+DETECT_BATCH_ROWS = 50_000
+# A recurring merchant counts as current if it charged within this many cycles of the
+# newest transaction in the user's books
+STALE_CYCLES = 2
+# Progress is written at most this often (plus on every phase change)
+PROGRESS_INTERVAL = 1.0
+
+CADENCE_DAYS = {name: days for name, days, _ in CADENCES}
+UPDATE_COLUMNS = ["posted_on", "description", "merchant_key", "amount", "currency"]
+
+# Imports run on these threads; the CPU-heavy parsing fans out to the process pool
+executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="import-worker")
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+class IngestResult(NamedTuple):
+    rows_imported: int
+    rows_skipped: int
+    recurring: list[RecurringCharge]
+    subscriptions_found: int
+
+def ingest_workers() -> int:
+    return settings.INGEST_WORKERS or os.cpu_count() or 1
+
+def _get_pool() -> ProcessPoolExecutor:
+    # Created on first import rather than at startup, most API processes never need it
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=ingest_workers())
+        return _pool
+
+def byte_ranges(start: int, size: int, chunk: int) -> Iterator[tuple[int, int]]:
+    for offset in range(start, size, chunk):
+        yield offset, min(offset + chunk, size)
+
+def iter_parsed_ranges(path: str, fmt: str, vendors, charges_positive: bool = False) -> Iterator[tuple[int, list, int]]:
+    """Yield (range end offset, transactions, skipped) per range, in file order, every transaction with its id."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        head = f.read(1 << 16)
+    layout, currency, data_start = None, ofx_currency(head), 0
+    if fmt == "csv":
+        header_end = head.find(b"\n")
+        header = head[:header_end if header_end != -1 else len(head)]
+        layout = csv_layout(header.decode("utf-8-sig", errors="replace"))
+        data_start = header_end + 1 if header_end != -1 else size
+
+    ranges = byte_ranges(data_start, size, settings.INGEST_CHUNK_BYTES)
+    seen = OrderedDict()  # for line_ids, across the whole file
+    workers = ingest_workers()
+    if workers == 1:
+        # Nothing to fan out to, skip pickling every row back from a subprocess
+        for start, end in ranges:
+            rows, skipped = parse_range(path, fmt, start, end, layout, currency, vendors, charges_positive)
+            yield end, line_ids(rows, seen), skipped
+        return
+
+    pool = _get_pool()
+    pending = deque()
+
+    def submit(span: tuple[int, int]):
+        future = pool.submit(parse_range, path, fmt, span[0], span[1], layout, currency, vendors, charges_positive)
+        pending.append((span[1], future))
+
+    for span in ranges:
+        submit(span)
+        if len(pending) >= 2 * workers:
+            break
+    while pending:
+        end, future = pending.popleft()
+        rows, skipped = future.result()
+        span = next(ranges, None)
+        if span:
+            submit(span)
+        yield end, line_ids(rows, seen), skipped
+
+def save_transactions(session: Session, tenant_id: int, user_id: int, rows: list) -> int:
+    """Upsert transactions user_id imported into tenant_id's, returns how many distinct ones were written."""
+    values = {}
+    for row in rows:
+        # One statement can't touch a key twice under ON CONFLICT, last line wins
+        values[row.external_id] = {"tenant_id": tenant_id, "user_id": user_id, **row._asdict()}
+    upsert_rows(session, Transaction, list(values.values()), ["tenant_id", "external_id"], UPDATE_COLUMNS)
+    return len(values)
+
+def iter_charge_batches(session: Session, tenant_id: int) -> Iterator[tuple[list, list, list, list]]:
+    """
+    The tenant's outflows as (keys, starts, dates, amounts) batches for detect_recurring,
+    same-day charges from one merchant summed into one.
+    """
+    stmt = (
+        select(Transaction.merchant_key, Transaction.posted_on, func.sum(-Transaction.amount))
+        .where(Transaction.tenant_id == tenant_id, Transaction.amount < 0)
+        .group_by(Transaction.merchant_key, Transaction.posted_on)
+        .order_by(Transaction.merchant_key, Transaction.posted_on)
+        .execution_options(yield_per=DETECT_BATCH_ROWS)
+    )
+    keys, starts, dates, amounts = [], [], [], []
+    for key, posted_on, amount in session.exec(stmt):
+        if not keys or keys[-1] != key:
+            if len(dates) >= DETECT_BATCH_ROWS:
+                yield keys, starts, dates, amounts
+                keys, starts, dates, amounts = [], [], [], []
+            keys.append(key)
+            starts.append(len(dates))
+        dates.append(posted_on.toordinal())
+        amounts.append(amount)
+    if keys:
+        yield keys, starts, dates, amounts
+
+def find_recurring(session: Session, tenant_id: int) -> list[RecurringCharge]:
+    newest = session.exec(select(func.max(Transaction.posted_on)).where(Transaction.tenant_id == tenant_id)).one()
+    if newest is None:
+        return []
+    recurring = []
+    for batch in iter_charge_batches(session, tenant_id):
+        for charge in detect_recurring(*batch):
+            # Still billing, not a subscription that was cancelled months before the export ends
+            if (newest - charge.last_charged).days <= STALE_CYCLES * CADENCE_DAYS[charge.cadence]:
+                recurring.append(charge)
+    return recurring
+
+def save_recurring(session: Session, tenant: Organization, recurring: list[RecurringCharge], vendors) -> int:
+    """
+    Upsert recurring charges into the tenant's subscriptions, named after one of their
+    statement lines. Rows written to dedicated storage are committed here.
+    """
+    if not recurring:
+        return 0
+    # Imported here: gmail_scanner brings in the Google client stack, which is slow to import
+    from app.services.gmail_scanner import save_candidates
+
+    descriptions = dict(session.exec(
+        select(Transaction.merchant_key, func.max(Transaction.description))
+        .where(Transaction.tenant_id == tenant.id, Transaction.merchant_key.in_([charge.key for charge in recurring]))
+        .group_by(Transaction.merchant_key)
+    ).all())
+    candidates = {
+        charge.key: {
+            "name": merchant(descriptions.get(charge.key, charge.key), vendors).name,
+            "amount": charge.amount,
+            "receipt": True,
+            "zombie": False,
+        }
+        for charge in recurring
+    }
+    with tenant_session(session, tenant) as data:
+        found = len(save_candidates(data, tenant.id, candidates))
+        if data is not session:
+            data.commit()
+    return found
+
+def ingest_file(
+    session: Session,
+    user_id: int,
+    path: str,
+    fmt: str,
+    charges_positive: bool = False,
+    progress: Optional[Callable[[str, int, int, int], None]] = None,
+) -> IngestResult:
+    """
+    Import a statement file for user_id and upsert the recurring charges it shows.
+    progress, if given, is called as progress(phase, bytes_parsed, rows_imported, rows_skipped).
+    """
+    fmt = "ofx" if fmt == "qbo" else fmt  # QBO is OFX with Intuit's headers
+    tenant = get_user_tenant(session, user_id)
+    check_available(tenant)
+    vendors = get_tenant_vendor_index(session, tenant.id)
+    imported = skipped = 0
+
+    if progress:
+        progress("parsing", 0, 0, 0)
+    for end, rows, range_skipped in iter_parsed_ranges(path, fmt, vendors, charges_positive):
+        imported += save_transactions(session, tenant.id, user_id, rows)
+        skipped += range_skipped
+        session.commit()
+        if progress:
+            progress("parsing", end, imported, skipped)
+
+    if progress:
+        progress("detecting", os.path.getsize(path), imported, skipped)
+    recurring = find_recurring(session, tenant.id)
+    if progress:
+        progress("saving", os.path.getsize(path), imported, skipped)
+    found = save_recurring(session, tenant, recurring, vendors)
+    session.commit()
+    if found:
+        invalidate_stats(tenant.id)
+    return IngestResult(imported, skipped, recurring, found)
+
+def run_import_job(job_id: int, path: str, charges_positive: bool = False):
+    with Session(engine, expire_on_commit=False) as session:
+        job = session.get(TransactionImport, job_id)
+        job.status = "running"
+        job.started_at = datetime.now(timezone.utc)
+        session.add(job)
+        session.commit()
+        last_saved = time.monotonic()
+
+        def progress(phase: str, bytes_parsed: int, rows_imported: int, rows_skipped: int):
+            nonlocal last_saved
+            phase_changed = phase != job.phase
+            job.phase = phase
+            job.bytes_parsed = bytes_parsed
+            job.rows_imported = rows_imported
+            job.rows_skipped = rows_skipped
+            if phase_changed or time.monotonic() - last_saved >= PROGRESS_INTERVAL:
+                session.add(job)
+                session.commit()
+                last_saved = time.monotonic()
+
+        try:
+            result = ingest_file(session, job.user_id, path, job.format, charges_positive, progress)
+            job.status = "succeeded"
+            job.phase = "done"
+            job.recurring_found = len(result.recurring)
+            job.subscriptions_found = result.subscriptions_found
+        except Exception as e:
+            logger.exception(f"Transaction import {job_id} failed")
+            session.rollback()
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+            session.add(job)
+            session.commit()
+            os.remove(path)
+
+def enqueue_import(job_id: int, path: str, charges_positive: bool = False):
+    executor.submit(run_import_job, job_id, path, charges_positive)
+
+def shutdown():
+    executor.shutdown(wait=False, cancel_futures=True)
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,122 @@
+"""
+Sender -> canonical vendor resolution.
+
+The index keeps two hash maps built from the bundled catalog (app/data/vendor_catalog.json):
+sending domain -> vendor and normalized display name -> vendor. A sender resolves by
+walking its domain up one label at a time (billing.mail.notion.so, mail.notion.so, notion.so),
+then by its cleaned-up display name, so each lookup is a handful of dict hits.
+Senders we know nothing about still get a stable key from their cleaned display name.
+"""
+import json
+import os
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional
+from sqlmodel import Session, select
+from app.models.vendor import VendorAlias
+
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "vendor_catalog.json")
+
+# Mail from these domains is sent on behalf of many vendors, only the display name identifies one
+SHARED_DOMAINS = {
+    "gmail.com", "googlemail.com", "outlook.com", "hotmail.com", "yahoo.com", "icloud.com",
+    "stripe.com", "paddle.com", "chargebee.com", "fastspring.com", "recurly.com", "paypal.com",
+    "sendgrid.net", "mailgun.org", "amazonses.com", "intuit.com",
+}
+# Words senders tack onto a vendor name: "Notion Team", "Figma Billing", "Slack Inc."
+NOISE_WORDS = {
+    "team", "billing", "bills", "receipts", "receipt", "invoices", "invoice", "payments", "payment",
+    "support", "notifications", "noreply", "no-reply", "hq", "inc", "llc", "ltd", "gmbh", "the", "via",
+}
+TLDS = {"com", "so", "io", "app", "ai", "co", "net", "org", "us", "dev"}
+
+_ADDRESS_RE = re.compile(r"<([^<>@\s]+@[^<>\s]+)>|([^<>@\s]+@[^<>\s]+)")
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9&+\-]*")
+
+class Vendor(NamedTuple):
+    key: str
+    name: str
+
+def split_sender(sender: str) -> tuple[str, Optional[str]]:
+    """'"Notion Team" <team@makenotion.com>' -> ('Notion Team', 'makenotion.com')"""
+    match = _ADDRESS_RE.search(sender)
+    domain = None
+    if match:
+        address = match.group(1) or match.group(2)
+        domain = address.rsplit("@", 1)[1].lower().rstrip(">.")
+        sender = sender[:match.start()] + sender[match.end():]
+    return sender.strip().strip('"').strip(), domain
+
+def name_key(name: str) -> str:
+    """'notion.so billing' -> 'notion', 'Slack Inc.' -> 'slack'"""
+    words = _WORD_RE.findall(name.lower().replace(".", " "))
+    kept = [w for w in words if w not in NOISE_WORDS]
+    # Drop a trailing TLD left over from names like "notion.so" or "linear.app"
+    if len(kept) > 1 and kept[-1] in TLDS:
+        kept = kept[:-1]
+    return " ".join(kept or words)
+
+def domain_suffixes(domain: str):
+    labels = domain.split(".")
+    for i in range(len(labels) - 1):
+        yield ".".join(labels[i:])
+
+class VendorIndex:
+    def __init__(self, vendors: list[dict]):
+        self.domains: dict[str, Vendor] = {}
+        self.names: dict[str, Vendor] = {}
+        for entry in vendors:
+            self.add(entry["name"], entry.get("domains", []), entry.get("aliases", []))
+
+    def add(self, name: str, domains: list[str] = (), aliases: list[str] = ()):
+        vendor = Vendor(name_key(name), name)
+        for domain in domains:
+            self.domains[domain.lower()] = vendor
+        for alias in [name, *aliases]:
+            self.names[name_key(alias)] = vendor
+
+    def extended(self, aliases: list[VendorAlias]) -> "VendorIndex":
+        """Copy of this index with tenant aliases layered on top."""
+        index = VendorIndex.__new__(VendorIndex)
+        index.domains = dict(self.domains)
+        index.names = dict(self.names)
+        for alias in aliases:
+            if "@" not in alias.alias and "." in alias.alias and " " not in alias.alias:
+                index.add(alias.vendor, domains=[alias.alias])
+            else:
+                index.add(alias.vendor, aliases=[alias.alias])
+        return index
+
+    def resolve(self, sender: str) -> Optional[Vendor]:
+        """Canonical vendor for a From header or a plain name, None if there's nothing to go on."""
+        display_name, domain = split_sender(sender)
+        if domain and domain not in SHARED_DOMAINS:
+            for suffix in domain_suffixes(domain):
+                vendor = self.domains.get(suffix)
+                if vendor:
+                    return vendor
+
+        key = name_key(display_name) if display_name else ""
+        if key:
+            return self.names.get(key) or Vendor(key, display_name)
+        if domain and domain not in SHARED_DOMAINS:
+            # Bare address from an unknown vendor: fall back to its registrable domain
+            registrable = ".".join(domain.split(".")[-2:])
+            return Vendor(name_key(registrable), registrable)
+        return None
+
+    def key_for(self, name: str) -> str:
+        vendor = self.resolve(name)
+        return vendor.key if vendor else name_key(name)
+
+@lru_cache(maxsize=1)
+def get_vendor_index() -> VendorIndex:
+    with open(CATALOG_PATH, encoding="utf-8") as f:
+        return VendorIndex(json.load(f))
+
+def get_tenant_vendor_index(session: Session, tenant_id: int) -> VendorIndex:
+    """The catalog with tenant_id's aliases on top. session is on the shared database, aliases aren't kept in dedicated schemas."""
+    aliases = session.exec(select(VendorAlias).where(VendorAlias.tenant_id == tenant_id)).all()
+    if not aliases:
+        return get_vendor_index()
+    return get_vendor_index().extended(aliases)
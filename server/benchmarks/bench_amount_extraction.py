@@ -0,0 +1,79 @@
+"""
+Throughput and accuracy of receipt amount extraction.
+
+Compares the old single-regex `$` extractor with the ranked extraction engine, per call
+and through the batch API, on snippets drawn from benchmarks/fixtures/amount_snippets.json,
+then through the batch API on a mix with mail that has no amounts and on repeated snippets.
+
+    cd server && python -m benchmarks.bench_amount_extraction --snippets 100000
+"""
+import argparse
+import json
+import os
+import re
+import time
+
+from app.services.amount_extraction import extract_money, extract_money_batch
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "amount_snippets.json")
+
+
+def legacy_extract_amount(text: str) -> float:
+    # The extractor the scanner used before, compiled through re's cache on every call
+    match = re.search(r'\$(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)', text)
+    if match:
+        try:
+            return float(match.group(1).replace(',', ''))
+        except ValueError:
+            return 0.0
+    return 0.0
+
+
+def accuracy(cases: list[dict]):
+    legacy_ok = engine_ok = 0
+    for case in cases:
+        expected = case["amount"] or 0.0
+        legacy_ok += legacy_extract_amount(case["text"]) == expected
+        money = extract_money(case["text"])
+        if case["amount"] is None:
+            engine_ok += money is None
+        else:
+            engine_ok += money is not None and money.amount == expected and money.currency == case["currency"]
+        if case["amount"] is not None and (money is None or money.amount != expected):
+            print(f"  miss: {case['text']!r} -> {money}")
+    print(f"accuracy   legacy {legacy_ok}/{len(cases)}   engine {engine_ok}/{len(cases)} (amount and currency)")
+
+
+def throughput(label: str, fn, snippets: list[str]):
+    start = time.perf_counter()
+    fn(snippets)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<16} {elapsed:>7.3f}s  {len(snippets) / elapsed:>12,.0f} snippets/s  "
+          f"{elapsed * 100_000 / len(snippets):>6.3f}s per 100k")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--snippets", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with open(FIXTURES) as f:
+        cases = json.load(f)
+    accuracy(cases)
+
+    texts = [case["text"] for case in cases]
+    # Each snippet distinct, as the batch API scans repeated texts once
+    snippets = [f"{texts[i % len(texts)]} (ref {i})" for i in range(args.snippets)]
+    throughput("legacy per-call", lambda xs: [legacy_extract_amount(x) for x in xs], snippets)
+    throughput("engine per-call", lambda xs: [extract_money(x) for x in xs], snippets)
+    throughput("engine batch", lambda xs: extract_money_batch(xs), snippets)
+    throughput("engine batch/50", lambda xs: [extract_money_batch(xs[i:i + 50]) for i in range(0, len(xs), 50)], snippets)
+    # A mailbox where half the mail has no amount to find, and receipts that repeat word for word
+    mixed = [snippet if i % 2 else f"We miss you at Notion, log back in ({i})" for i, snippet in enumerate(snippets)]
+    throughput("batch/50 mixed", lambda xs: [extract_money_batch(xs[i:i + 50]) for i in range(0, len(xs), 50)], mixed)
+    repeated = [texts[i % len(texts)] for i in range(args.snippets)]
+    throughput("batch/50 repeats", lambda xs: [extract_money_batch(xs[i:i + 50]) for i in range(0, len(xs), 50)], repeated)
+
+
+if __name__ == "__main__":
+    main()
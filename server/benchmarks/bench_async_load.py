@@ -0,0 +1,161 @@
+"""
+Load test: sync (threadpool) versus async endpoints under many concurrent clients.
+
+Serves the real app plus a /sync router holding sync-def twins of the ported read
+endpoints (Session + threadpool, as they were before the async port), then drives
+both with the same number of concurrent keep-alive clients and reports
+requests/sec and latency percentiles.
+
+    cd server && python -m benchmarks.bench_async_load --clients 500 --duration 15
+
+SQLite answers in microseconds, so the threadpool ceiling shows up most clearly
+against a networked database: pass --database-url mysql+pymysql://... to use one
+(its tables must already exist). Requests run as a bench user of a new organization,
+which only the SQLite run fills with rows.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from fastapi import APIRouter, Depends, Query
+from sqlmodel import Session, SQLModel, create_engine
+from typing import Annotated
+
+from app.api.deps import get_current_user
+from app.core.database import get_session
+from app.core.security import create_access_token
+from app.models.user import User
+from app.schemas.subscription import SubscriptionListQuery
+from app.services.analytics_service import get_cached_stats
+from app.services.subscription_service import SubscriptionService
+from main import app
+
+sync_router = APIRouter(prefix="/sync")
+
+
+@sync_router.get("/subscriptions")
+def sync_subscriptions(
+    params: Annotated[SubscriptionListQuery, Query()],
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    service = SubscriptionService(session, current_user.organization_id)
+    items, next_cursor = service.list_page(params, params.sort, params.cursor, params.limit)
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@sync_router.get("/stats")
+def sync_stats(session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
+    return get_cached_stats(session, current_user.organization_id)[0]
+
+
+app.include_router(sync_router)
+
+PATHS = {
+    "sync": ["/sync/subscriptions?limit=50&sort=-amount", "/sync/stats"],
+    "async": ["/api/v1/subscriptions?limit=50&sort=-amount", "/api/v1/stats"],
+}
+
+
+def percentile(values: list[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def drive(base_url: str, headers: dict, paths: list[str], clients: int, duration: float) -> tuple[int, int, list[float]]:
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=60) as client:
+        async def worker(offset: int):
+            nonlocal errors
+            i = offset
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(paths[i % len(paths)])
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+                i += 1
+
+        await asyncio.gather(*(worker(n) for n in range(clients)))
+    return len(latencies), errors, latencies
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(base_url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(base_url + "/").status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    from benchmarks.generators import create_tenant, populate
+
+    database_url = args.database_url
+    email = f"load-{os.getpid()}@example.com"
+    if not database_url:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'load.db')}"
+        engine = create_engine(database_url)
+        SQLModel.metadata.create_all(engine)
+        _, tenant_id = create_tenant(engine, email)
+        populate(engine, args.rows, tenant_id=tenant_id)
+    else:
+        create_tenant(create_engine(database_url), email)
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': email})}"}
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.bench_async_load:app", "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, "DATABASE_URL": database_url},
+    )
+    try:
+        wait_ready(base_url)
+        print(f"{args.clients} clients, {args.duration:.0f}s per mode, {database_url.split(':')[0]}")
+        print(f"{'mode':>6}  {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for mode, paths in PATHS.items():
+            asyncio.run(drive(base_url, headers, paths, min(args.clients, 20), 2))  # warm up pools and caches
+            done, errors, latencies = asyncio.run(drive(base_url, headers, paths, args.clients, args.duration))
+            if not latencies:
+                print(f"{mode:>6}  no successful requests ({errors} errors)")
+                continue
+            print(f"{mode:>6}  {done / args.duration:>8.0f} {percentile(latencies, 50) * 1000:>8.1f} "
+                  f"{percentile(latencies, 99) * 1000:>8.1f} {errors:>7}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Authenticated-request throughput, and API latency during a login storm.
+
+Drives the app in-process over httpx's ASGI transport:
+  1. GET /auth/connections with a bearer token, principal cache off vs on,
+     reporting requests/sec and SQL statements per request.
+  2. A burst of concurrent logins (real bcrypt cost) while a probe keeps
+     requesting /stats, reporting the probe's latency and how many logins
+     were turned away once the hashing queue filled up.
+
+    cd server && python -m benchmarks.bench_auth --requests 2000 --logins 100
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+
+
+def percentile(values: list[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def authenticated_load(client, headers, total: int, concurrency: int) -> float:
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            response = await client.get("/api/v1/auth/connections", headers=headers)
+            assert response.status_code == 200, response.text
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def login_storm(client, headers, logins: int) -> tuple[list[float], dict]:
+    probe_latencies, statuses = [], {}
+    done = asyncio.Event()
+
+    async def probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            await client.get("/api/v1/stats", headers=headers)
+            probe_latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(0.005)
+
+    async def login():
+        response = await client.post("/api/v1/auth/login", json={"email": "bench@example.com", "password": "bench-password"})
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    probe_task = asyncio.create_task(probe())
+    await asyncio.gather(*(login() for _ in range(logins)))
+    done.set()
+    await probe_task
+    return probe_latencies, statuses
+
+
+async def run(args):
+    from sqlalchemy import event
+    from sqlmodel import SQLModel
+
+    from app.api import deps
+    from app.core.cache import MemoryCache
+    from app.core.config import settings
+    from app.core.database import engine, get_async_engine
+    from main import app
+
+    SQLModel.metadata.create_all(engine)
+    statements = [0]
+    event.listen(get_async_engine().sync_engine, "before_cursor_execute", lambda *a: statements.__setitem__(0, statements[0] + 1))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post("/api/v1/auth/register", json={"email": "bench@example.com", "password": "bench-password"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        print(f"authenticated GET /auth/connections, {args.requests} requests, concurrency {args.concurrency}")
+        print(f"{'principal cache':>16}  {'req/s':>8} {'SQL/req':>8}")
+        for label, cache in [("off", None), ("on", MemoryCache(settings.PRINCIPAL_CACHE_SIZE, 60))]:
+            deps.principal_cache = cache
+            await authenticated_load(client, headers, 50, args.concurrency)  # warm up
+            statements[0] = 0
+            seconds = await authenticated_load(client, headers, args.requests, args.concurrency)
+            print(f"{label:>16}  {args.requests / seconds:>8.0f} {statements[0] / args.requests:>8.2f}")
+
+        idle = []
+        for _ in range(50):
+            start = time.perf_counter()
+            await client.get("/api/v1/stats", headers=headers)
+            idle.append(time.perf_counter() - start)
+        probe, statuses = await login_storm(client, headers, args.logins)
+        print(f"\n{args.logins} concurrent logins, bcrypt rounds {settings.PASSWORD_HASH_ROUNDS}, "
+              f"{settings.PASSWORD_HASH_WORKERS} hash workers, {settings.PASSWORD_HASH_MAX_PENDING} queued max")
+        print(f"login responses: {dict(sorted(statuses.items()))}")
+        print(f"/stats p50/p99 idle: {percentile(idle, 50) * 1000:.1f}/{percentile(idle, 99) * 1000:.1f} ms, "
+              f"during storm: {percentile(probe, 50) * 1000:.1f}/{percentile(probe, 99) * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--logins", type=int, default=100)
+    args = parser.parse_args()
+    # Must be set before the app's engine is created on import
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'auth.db')}"
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Incremental billing analysis vs rebuilding profiles from full history.
+
+Replays several years of receipts for many vendors as a series of weekly scans. Each
+scan goes through record_charges, which touches only the vendors that got new charges;
+the baseline rebuilds those vendors' profiles from every stored charge event, which is
+what recomputing on each scan would cost. Reports the per-scan time early and late in
+the replay, then checks the final profiles against what was planted: cadence, expected
+next charge and price changes.
+
+    cd server && python -m benchmarks.bench_billing --vendors 300 --years 5
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+def plant(vendors: int, years: int, rng: random.Random, now: datetime) -> tuple[list[dict], dict]:
+    """Receipt signals, some vendors mailing a receipt and an invoice per payment, and the truth per vendor."""
+    signals, truth = [], {}
+    for v in range(vendors):
+        key = f"vendor {v}"
+        cadence, every = ("yearly", 365) if v % 10 == 0 else ("monthly", 30.4)
+        price = rng.choice([8.0, 12.0, 20.0, 49.0, 99.0]) * (12 if cadence == "yearly" else 1)
+        hike_at = now - timedelta(days=rng.randint(40, 300)) if v % 4 == 1 and cadence == "monthly" else None
+        day = now - timedelta(days=rng.uniform(0, every * 0.9))
+        truth[key] = {"cadence": cadence, "next": day + timedelta(days=every), "hike": None}
+        while day > now - timedelta(days=365 * years):
+            amount = price * 1.2 if hike_at and day >= hike_at else price
+            if hike_at and day >= hike_at:
+                truth[key]["hike"] = day
+            at = day + timedelta(hours=rng.randint(-20, 20))
+            for copy in range(2 if v % 3 == 0 else 1):
+                signals.append({
+                    "id": f"m-{v}-{len(signals)}", "vendor_key": key, "service_name": f"Vendor {v}",
+                    "amount": amount if copy == 0 else 0.0, "currency": "USD",
+                    "internal_date": int((at + timedelta(hours=copy * 5)).timestamp() * 1000),
+                })
+            day -= timedelta(days=every)
+    signals.sort(key=lambda s: s["internal_date"])
+    return signals, truth
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vendors", type=int, default=300)
+    parser.add_argument("--years", type=int, default=5)
+    args = parser.parse_args()
+    # Must be set before the app's engine is created on import
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'billing.db')}"
+
+    from sqlmodel import Session, SQLModel, select
+
+    from app.core.database import engine
+    from app.models.charge_event import BillingProfile, ChargeEvent
+    from app.services.analytics_service import compute_billing
+    from app.services.billing_engine import apply_charges, record_charges
+
+    SQLModel.metadata.create_all(engine)
+    now = datetime.now(timezone.utc)
+    signals, truth = plant(args.vendors, args.years, random.Random(5), now)
+
+    # Weekly scans, oldest first
+    scans, batch, cutoff = [], [], None
+    for signal in signals:
+        at = signal["internal_date"] / 1000
+        if cutoff is None or at >= cutoff:
+            if batch:
+                scans.append(batch)
+            batch, cutoff = [], at + 7 * 86400
+        batch.append(signal)
+    scans.append(batch)
+    print(f"{len(signals)} receipts from {args.vendors} vendors over {args.years} years, replayed as {len(scans)} weekly scans")
+
+    incremental, rebuild = [], []
+    with Session(engine, expire_on_commit=False) as session:
+        for scan in scans:
+            start = time.perf_counter()
+            record_charges(session, 1, 1, scan)
+            session.commit()
+            incremental.append(time.perf_counter() - start)
+
+            # Baseline: rebuild the touched vendors' profiles from all of their events
+            start = time.perf_counter()
+            keys = list({signal["vendor_key"] for signal in scan})
+            events = session.exec(select(ChargeEvent.vendor_key, ChargeEvent.charged_at, ChargeEvent.amount).where(ChargeEvent.vendor_key.in_(keys))).all()
+            by_vendor = {}
+            for key, charged_at, amount in events:
+                by_vendor.setdefault(key, []).append((charged_at.replace(tzinfo=timezone.utc).timestamp(), amount))
+            for key, charges in by_vendor.items():
+                apply_charges(BillingProfile(vendor_key=key, vendor_name=key), charges)
+            rebuild.append(time.perf_counter() - start)
+
+        tenth = max(1, len(scans) // 10)
+        print(f"{'per scan, ms':>22} {'first 10%':>10} {'last 10%':>10}")
+        for label, times in [("incremental", incremental), ("rebuild from history", rebuild)]:
+            print(f"{label:>22} {sum(times[:tenth]) / tenth * 1000:>10.2f} {sum(times[-tenth:]) / tenth * 1000:>10.2f}")
+
+        profiles = {p.vendor_key: p for p in session.exec(select(BillingProfile))}
+        cadence_ok = sum(profiles[key].cadence == t["cadence"] for key, t in truth.items())
+        next_errors = sorted(
+            abs((profiles[key].next_expected_at.replace(tzinfo=timezone.utc) - t["next"]).total_seconds()) / 86400
+            for key, t in truth.items() if profiles[key].next_expected_at
+        )
+        hikes = {key for key, t in truth.items() if t["hike"]}
+        flagged = {key for key, p in profiles.items() if p.price_changed_at and p.price_change_pct and p.price_change_pct > 0}
+        print(f"cadence correct {cadence_ok}/{len(truth)}, next charge error median {next_errors[len(next_errors) // 2]:.1f} days "
+              f"(max {next_errors[-1]:.1f}), price hikes flagged {len(flagged & hikes)}/{len(hikes)}, false alerts {len(flagged - hikes)}")
+        duplicates = sum(1 for s in signals if s["amount"] == 0)
+        counted = sum(p.charge_count for p in profiles.values())
+        print(f"charge count {counted} for {len(signals) - duplicates} payments ({duplicates} duplicate invoice mails folded in)")
+        billing = compute_billing(session, 1)
+        print(f"/stats billing: {len(billing['upcoming'])} upcoming charges listed, {len(billing['price_changes'])} price changes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Bulk subscription writes versus one create/update call per row.
+
+Times SubscriptionService.create/update in a loop (one commit each, as the UI
+import did over HTTP) against bulk_create/bulk_update on a fresh SQLite file.
+
+    cd server && python -m benchmarks.bench_bulk --rows 10000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.models.subscription import Subscription
+from app.services.subscription_service import SubscriptionService
+
+
+def make_rows(count: int) -> list[dict]:
+    return [
+        {"name": f"Vendor {i}", "team": ["Engineering", "Design", "Sales"][i % 3],
+         "amount": round(5 + i % 500 * 1.5, 2), "seats_total": 10, "seats_unused": i % 4}
+        for i in range(count)
+    ]
+
+
+def fresh_engine():
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bulk.db')}")
+    SQLModel.metadata.create_all(engine)
+    statements = [0]
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.__setitem__(0, statements[0] + 1))
+    return engine, statements
+
+
+def timed(engine, statements, fn) -> tuple[float, int]:
+    with Session(engine) as session:
+        statements[0] = 0
+        start = time.perf_counter()
+        fn(SubscriptionService(session, 1))
+        return time.perf_counter() - start, statements[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    args = parser.parse_args()
+    rows = make_rows(args.rows)
+    patches = [{"id": i + 1, "status": "zombie"} if i % 2 else {"id": i + 1, "amount": 1.0} for i in range(args.rows)]
+
+    def per_row_create(service):
+        for row in rows:
+            service.create(Subscription(**row))
+
+    def per_row_update(service):
+        for patch in patches:
+            service.update(patch["id"], {k: v for k, v in patch.items() if k != "id"})
+
+    results = []
+    engine, statements = fresh_engine()
+    results.append(("create per row", *timed(engine, statements, per_row_create)))
+    results.append(("update per row", *timed(engine, statements, per_row_update)))
+    engine, statements = fresh_engine()
+    results.append(("bulk_create", *timed(engine, statements, lambda service: service.bulk_create(rows))))
+    results.append(("bulk_update", *timed(engine, statements, lambda service: service.bulk_update(patches))))
+
+    print(f"{args.rows} rows")
+    print(f"{'path':>16}  {'seconds':>8} {'statements':>10}")
+    for label, seconds, count in results:
+        print(f"{label:>16}  {seconds:>8.3f} {count:>10}")
+
+
+if __name__ == "__main__":
+    main()
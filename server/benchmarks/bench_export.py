@@ -0,0 +1,93 @@
+"""
+Peak RSS and throughput of the streaming subscription export.
+
+Populates a SQLite file, then runs each export format in a fresh interpreter so
+ru_maxrss reflects the export alone. Exits non-zero if any format goes over the
+RSS ceiling. --legacy adds the old path (every row as JSON, then re-encoded as CSV)
+for comparison.
+
+    cd server && python -m benchmarks.bench_export --rows 1000000 --max-rss-mb 200
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from sqlmodel import SQLModel, create_engine
+
+from benchmarks.generators import create_tenant, populate
+
+CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+if sys.argv[1] == "legacy":
+    from sqlmodel import Session, select
+    from app.core.database import engine
+    from app.models.subscription import Subscription
+    with Session(engine) as session:
+        payload = json.dumps([sub.model_dump() for sub in session.exec(select(Subscription)).all()])
+    rows = json.loads(payload)
+    out = "\\n".join(",".join(str(value) for value in row.values()) for row in rows).encode()
+    total = len(out)
+else:
+    from sqlmodel import Session
+    from app.core.database import engine
+    from app.models.organization import Organization
+    from app.schemas.subscription import SubscriptionFilter
+    from app.services.export_service import WRITERS
+    with Session(engine, expire_on_commit=False) as session:
+        tenant = session.get(Organization, 1)
+    total = sum(len(chunk) for chunk in WRITERS[sys.argv[1]](tenant, SubscriptionFilter()))
+print(total, time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def run(fmt: str, db_path: str) -> tuple[int, float, float]:
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}"}
+    out = subprocess.run([sys.executable, "-c", CHILD, fmt], env=env, capture_output=True, text=True, check=True)
+    size, seconds, maxrss_kb = out.stdout.split()
+    return int(size), float(seconds), int(maxrss_kb) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--formats", nargs="+", default=["csv", "ndjson", "parquet"])
+    parser.add_argument("--max-rss-mb", type=float, default=200)
+    parser.add_argument("--legacy", action="store_true")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "export.db")
+    engine = create_engine(f"sqlite:///{db_path}")
+    SQLModel.metadata.create_all(engine)
+    start = time.perf_counter()
+    _, tenant_id = create_tenant(engine)
+    populate(engine, args.rows, tenant_id=tenant_id)
+    print(f"populated {args.rows} rows in {time.perf_counter() - start:.1f}s")
+
+    # Interpreter + app imports alone, so the export's own share is visible
+    empty_path = os.path.join(tempfile.mkdtemp(), "empty.db")
+    empty = create_engine(f"sqlite:///{empty_path}")
+    SQLModel.metadata.create_all(empty)
+    create_tenant(empty)
+    _, _, baseline = run("csv", empty_path)
+
+    formats = args.formats + (["legacy"] if args.legacy else [])
+    print(f"{'format':>8}  {'MiB out':>8} {'seconds':>8} {'rows/s':>10} {'peak RSS':>9}  (baseline {baseline:.0f} MiB)")
+    failed = False
+    for fmt in formats:
+        try:
+            size, seconds, rss = run(fmt, db_path)
+        except subprocess.CalledProcessError as e:
+            print(f"{fmt:>8}  failed: {e.stderr.strip().splitlines()[-1]}")
+            continue
+        over = fmt != "legacy" and rss > args.max_rss_mb
+        failed |= over
+        print(f"{fmt:>8}  {size / 1024 / 1024:>8.1f} {seconds:>8.2f} {args.rows / seconds:>10.0f} {rss:>8.0f}M{'  OVER' if over else ''}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Per-scan Gmail client setup time, the old way against app/services/gmail_client.py.
+
+Each sample is one scan's setup up to its first Gmail response (getProfile): building
+credentials and the service, then the call. The old way parses the discovery document
+and opens a new connection every scan, and an expired access token costs a 401 and a
+refresh in the middle of that first call. The client factory reuses the document it
+read and the thread's connection, and refreshes expiring tokens before the first
+call. The fake charges connect_latency per new connection for the handshakes.
+
+The last lines start scans of one user with an expired token on several threads at
+once and count the refreshes the token endpoint saw.
+
+    cd server && python -m benchmarks.bench_gmail_client --scans 50 --latency 0.02
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+
+def percentiles(timings: list[float]) -> tuple[float, float]:
+    timings = sorted(timings)
+    return timings[len(timings) // 2], timings[min(len(timings) - 1, int(len(timings) * 0.9))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scans", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per request on the fake")
+    parser.add_argument("--connect-latency", type=float, default=0.04, help="seconds per new connection")
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+    # A file, so the threads below share the database
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'gmail_client.db')}"
+
+    import httplib2
+    from google.oauth2.credentials import Credentials
+    from google_auth_httplib2 import AuthorizedHttp
+    from googleapiclient.discovery import build_from_document
+    from googleapiclient.discovery_cache import get_static_doc
+    from sqlmodel import Session, SQLModel
+
+    from app.core.database import engine
+    from app.models.oauth import OAuthToken
+    from app.services import gmail_client
+    from benchmarks.fake_gmail import FakeGmailServer, generate_mailbox
+    from benchmarks.generators import create_tenant
+
+    SQLModel.metadata.create_all(engine)
+    user_id, _ = create_tenant(engine)
+    with Session(engine) as session:
+        session.add(OAuthToken(user_id=user_id, access_token="expired", refresh_token="refresh"))
+        session.commit()
+
+    def set_token(access_token: str, expires_in: timedelta):
+        with Session(engine) as session:
+            token = session.get(OAuthToken, 1)
+            token.access_token = access_token
+            token.expires_at = datetime.now(timezone.utc) + expires_in
+            session.add(token)
+            session.commit()
+
+    with FakeGmailServer(generate_mailbox(10), args.latency, connect_latency=args.connect_latency) as fake:
+        gmail_client.TOKEN_URI = fake.token_uri
+        # build_service reads the document through this from now on
+        document = json.loads(get_static_doc("gmail", "v1"))
+        document["rootUrl"] = fake.root_url
+        document = json.dumps(document)
+        gmail_client.discovery_document = lambda api, version: document
+
+        def before(session: Session, token: OAuthToken):
+            # What scans did: build() reads and parses the bundled document each call,
+            # with fresh credentials (no expiry) on a fresh transport
+            creds = Credentials(
+                token=token.access_token, refresh_token=token.refresh_token, token_uri=fake.token_uri,
+                client_id="", client_secret="", scopes=gmail_client.GMAIL_SCOPES,
+            )
+            doc = json.loads(get_static_doc("gmail", "v1"))
+            doc["rootUrl"] = fake.root_url
+            service = build_from_document(doc, http=AuthorizedHttp(creds, http=httplib2.Http()))
+            service.users().getProfile(userId="me").execute()
+
+        def after(session: Session, token: OAuthToken):
+            creds = gmail_client.fresh_credentials(session, token)
+            service = gmail_client.build_service("gmail", "v1", creds, gmail_client.thread_transport())
+            service.users().getProfile(userId="me").execute()
+
+        def measure(setup, access_token: str, expires_in: timedelta) -> tuple[float, float, int, int]:
+            fake.reset_counters()
+            timings = []
+            for _ in range(args.scans):
+                set_token(access_token, expires_in)
+                with Session(engine) as session:
+                    token = session.get(OAuthToken, 1)
+                    start = time.perf_counter()
+                    setup(session, token)
+                    timings.append((time.perf_counter() - start) * 1000)
+            return (*percentiles(timings), fake.connections, fake.tokens_issued)
+
+        print(f"{args.scans} scans each; fake: {args.latency * 1000:.0f}ms per request, "
+              f"{args.connect_latency * 1000:.0f}ms per new connection")
+        print(f"{'setup':>8} {'token':>9} {'p50 ms':>8} {'p90 ms':>8} {'connects':>9} {'refreshes':>10}")
+        for label, setup in [("before", before), ("after", after)]:
+            for state, access_token, expires_in in [
+                ("valid", "valid", timedelta(hours=1)),
+                ("expired", "expired", timedelta(seconds=-1)),
+            ]:
+                p50, p90, connects, refreshes = measure(setup, access_token, expires_in)
+                print(f"{label:>8} {state:>9} {p50:>8.1f} {p90:>8.1f} {connects:>9} {refreshes:>10}")
+
+        print(f"\n{args.threads} scans of one user with an expired token, started together:")
+        for label, setup in [("before", before), ("after", after)]:
+            set_token("expired", timedelta(seconds=-1))
+            fake.reset_counters()
+            barrier = threading.Barrier(args.threads)
+
+            def scan():
+                with Session(engine) as session:
+                    token = session.get(OAuthToken, 1)
+                    barrier.wait()
+                    setup(session, token)
+
+            threads = [threading.Thread(target=scan) for _ in range(args.threads)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            print(f"{label:>8}: {fake.tokens_issued} token refreshes")
+
+
+if __name__ == "__main__":
+    main()
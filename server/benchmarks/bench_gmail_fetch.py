@@ -0,0 +1,46 @@
+"""
+Compare per-message Gmail fetching with the batched metadata path.
+
+    cd server && python -m benchmarks.bench_gmail_fetch --messages 200 --latency 0.02
+"""
+import argparse
+import time
+
+from app.services.gmail_scanner import fetch_message_metadata
+from benchmarks.fake_gmail import FakeGmailServer, generate_mailbox
+
+
+def fetch_one_by_one(service, message_ids: list[str]) -> list[dict]:
+    # The pre-batching scanner loop: one full messages.get round trip per id
+    return [service.users().messages().get(userId='me', id=msg_id).execute() for msg_id in message_ids]
+
+
+def run(label: str, fake: FakeGmailServer, fetch, message_ids: list[str]) -> dict:
+    service = fake.service()
+    fake.reset_counters()
+    start = time.perf_counter()
+    fetched = fetch(service, message_ids)
+    elapsed = time.perf_counter() - start
+    result = {"label": label, "messages": len(fetched), "requests": fake.request_count, "seconds": elapsed}
+    print(f"{label:<12} {result['messages']:>6} msgs {result['requests']:>6} requests {elapsed:>8.3f}s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated seconds per HTTP round trip")
+    args = parser.parse_args()
+
+    mailbox = generate_mailbox(receipts=args.messages)
+    message_ids = [m["id"] for m in mailbox]
+    with FakeGmailServer(mailbox, latency=args.latency) as fake:
+        before = run("per-message", fake, fetch_one_by_one, message_ids)
+        after = run("batched", fake, lambda s, ids: fetch_message_metadata(s, ids, "receipt"), message_ids)
+
+    print(f"speedup: {before['seconds'] / after['seconds']:.1f}x, "
+          f"requests: {before['requests']} -> {after['requests']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Count Gmail API calls for repeat scans with the per-user history cursor.
+
+    cd server && python -m benchmarks.bench_incremental_scan --receipts 100 --zombies 10 --new 5
+"""
+import argparse
+import time
+
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.models.oauth import OAuthToken
+from app.services.gmail_scanner import scan_gmail_for_subscriptions
+from benchmarks.fake_gmail import FakeGmailServer, generate_mailbox
+from benchmarks.generators import create_tenant
+
+
+def scan(label: str, fake: FakeGmailServer, token: OAuthToken, session: Session) -> dict:
+    fake.reset_counters()
+    start = time.perf_counter()
+    found = scan_gmail_for_subscriptions(token, session, service=fake.service())
+    elapsed = time.perf_counter() - start
+    calls = dict(sorted(fake.calls.items()))
+    print(f"{label:<22} found={len(found):<4} http={fake.request_count:<4} {elapsed:>7.3f}s  {calls}")
+    return {"label": label, "requests": fake.request_count, "calls": calls, "seconds": elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--receipts", type=int, default=100)
+    parser.add_argument("--zombies", type=int, default=10)
+    parser.add_argument("--new", type=int, default=5, help="messages delivered between scans")
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    create_tenant(engine)
+    mailbox = generate_mailbox(args.receipts, args.zombies)
+
+    with FakeGmailServer(mailbox, latency=args.latency) as fake, Session(engine) as session:
+        token = OAuthToken(user_id=1, access_token="fake")
+        session.add(token)
+        session.commit()
+        session.refresh(token)
+
+        scan("first (full)", fake, token, session)
+        scan("repeat, no new mail", fake, token, session)
+
+        fresh = generate_mailbox(args.new, 1, seed=7, start=len(mailbox))
+        now_ms = str(int(time.time() * 1000))
+        for msg in fresh:
+            msg["internalDate"] = now_ms
+        fake.deliver(fresh)
+        scan(f"repeat, {len(fresh)} new", fake, token, session)
+
+        fake.expire_history()
+        scan("cursor expired", fake, token, session)
+
+
+if __name__ == "__main__":
+    main()
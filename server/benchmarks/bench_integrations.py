@@ -0,0 +1,99 @@
+"""
+Accounting integrations against local fake QuickBooks/Xero servers.
+
+  1. Many concurrent POST /integrations/connect calls, compared with the old stub
+     (a sync endpoint that slept 1.5s in the threadpool), reporting wall time.
+  2. POST /integrations/analyze for each provider while the fake server injects
+     503/429 responses, polling the job handle until it finishes.
+
+    cd server && python -m benchmarks.bench_integrations --clients 200 --expenses 5000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+
+from benchmarks.fake_accounting import VALID_TOKEN, FakeAccountingServer, generate_expenses
+
+
+async def concurrent_connects(client, path: str, clients: int, headers: dict) -> tuple[float, Counter]:
+    statuses = Counter()
+
+    async def connect(service: str):
+        response = await client.post(path, json={"service": service, "apiKey": f"realm-1:{VALID_TOKEN}"}, headers=headers)
+        statuses[response.status_code] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(connect(["quickbooks", "xero"][i % 2]) for i in range(clients)))
+    return time.perf_counter() - start, statuses
+
+
+async def run(args, fake: FakeAccountingServer):
+    from sqlmodel import Session, SQLModel
+
+    from app.core.database import engine
+    from app.models.subscription import Subscription
+    from app.services.subscription_service import SubscriptionService
+    from main import app
+
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        # Flag a few of the fake books' vendors as unused, so analyze has zombies to find.
+        # Organization 1 is the one the bench user registered below gets.
+        for name in ["Figma", "Slack", "Zoom"]:
+            SubscriptionService(session, 1).create(Subscription(name=name, amount=0, seats_total=1, seats_unused=1, status="zombie"))
+
+    @app.post("/legacy/connect")
+    def legacy_connect():
+        time.sleep(1.5)  # what /integrations/connect did before the connectors
+        return {"status": "connected"}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        token = (await client.post("/api/v1/auth/register", json={"email": "bench@example.com", "password": "pw"})).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        print(f"{args.clients} concurrent connects, fake provider latency {fake.latency * 1000:.0f} ms")
+        for label, path in [("legacy stub", "/legacy/connect"), ("connectors", "/api/v1/integrations/connect")]:
+            seconds, statuses = await concurrent_connects(client, path, args.clients, headers)
+            print(f"{label:>12}: {seconds:6.2f}s  {dict(statuses)}")
+        fake.fail_every = args.fail_every
+        print(f"\nanalyze over {args.expenses} expenses, every {args.fail_every}th provider request fails")
+        for service in ["quickbooks", "xero"]:
+            fake.calls.clear()
+            start = time.perf_counter()
+            response = await client.post(
+                "/api/v1/integrations/analyze", json={"service": service, "apiKey": f"realm-1:{VALID_TOKEN}"}, headers=headers
+            )
+            accepted = time.perf_counter() - start
+            job = response.json()
+            while job["status"] in ("queued", "running"):
+                await asyncio.sleep(0.05)
+                job = (await client.get(f"/api/v1/integrations/analyze/{job['id']}", headers=headers)).json()
+            print(f"{service:>12}: accepted in {accepted * 1000:.0f} ms, finished in {time.perf_counter() - start:.2f}s, "
+                  f"{job['status']}, analyzed {job['analyzed_count']}, recurring {job['recurring_vendors']}, "
+                  f"zombies {job['zombies_found']}, savings {job['potential_savings']}  {dict(fake.calls)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--expenses", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--fail-every", type=int, default=7)
+    args = parser.parse_args()
+
+    with FakeAccountingServer(generate_expenses(args.expenses), latency=args.latency) as fake:
+        # Must be set before the app's settings and engine are created on import
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'integrations.db')}"
+        os.environ["QUICKBOOKS_API_URL"] = fake.url
+        os.environ["XERO_API_URL"] = fake.url
+        asyncio.run(run(args, fake))
+
+
+if __name__ == "__main__":
+    main()
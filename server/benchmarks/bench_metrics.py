@@ -0,0 +1,124 @@
+"""
+Overhead of the instrumentation in app/core/metrics.py.
+
+Runs the same work with metrics off, on, and on with the slow-request profiler
+profiling every request: sequential GET /api/v1/subscriptions calls through the ASGI
+app in-process (no sockets, so the middleware and SQL hooks are as large a share of
+each request as they can be), and full scans of a fake mailbox with no latency. Each
+configuration runs in a fresh process, since the settings are read on import. The
+phase split of the instrumented scans is printed last.
+
+    cd server && python -m benchmarks.bench_metrics --requests 2000 --scans 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+CONFIGS = [
+    ("off", {"METRICS_ENABLED": "false"}),
+    ("on", {"METRICS_ENABLED": "true"}),
+    ("on+profiler", {"METRICS_ENABLED": "true", "SLOW_REQUEST_PROFILE_MS": "100000"}),
+]
+
+
+def percentiles(timings: list[float]) -> tuple[float, float]:
+    timings = sorted(timings)
+    return timings[len(timings) // 2], timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+
+
+def child(args):
+    import httpx
+    from sqlalchemy import delete
+    from sqlmodel import Session, SQLModel
+
+    from app.core import metrics
+    from app.core.database import engine
+    from app.core.security import create_access_token
+    from app.models.oauth import GmailScanCursor, OAuthToken
+    from app.services.gmail_scanner import scan_gmail_for_subscriptions
+    from benchmarks.fake_gmail import FakeGmailServer, generate_mailbox
+    from benchmarks.generators import create_tenant, populate
+    from main import app
+
+    SQLModel.metadata.create_all(engine)
+    user_id, tenant_id = create_tenant(engine)
+    populate(engine, args.rows, tenant_id=tenant_id)
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'bench@example.com'})}"}
+
+    async def drive() -> list[float]:
+        timings = []
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+            for i in range(args.requests + 50):
+                start = time.perf_counter()
+                response = await client.get("/api/v1/subscriptions?limit=50&sort=-amount")
+                elapsed = (time.perf_counter() - start) * 1000
+                response.raise_for_status()
+                if i >= 50:  # warm-up
+                    timings.append(elapsed)
+        return timings
+
+    request_p50, request_p99 = percentiles(asyncio.run(drive()))
+
+    scans = []
+    with FakeGmailServer(generate_mailbox(args.receipts, args.receipts // 10), latency=0) as fake, \
+            Session(engine) as session:
+        token = OAuthToken(user_id=user_id, access_token="fake")
+        session.add(token)
+        session.commit()
+        for _ in range(args.scans + 1):
+            session.execute(delete(GmailScanCursor))
+            session.commit()
+            start = time.perf_counter()
+            scan_gmail_for_subscriptions(token, session, service=fake.service())
+            scans.append((time.perf_counter() - start) * 1000)
+    phases = {
+        line.split('"')[1]: float(line.rsplit(" ", 1)[1])
+        for line in metrics.render().splitlines() if line.startswith("scan_phase_seconds_sum")
+    }
+    print(json.dumps({
+        "request_p50": request_p50, "request_p99": request_p99,
+        "scan_p50": percentiles(scans[1:])[0], "phases": phases,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rows", type=int, default=2000, help="subscriptions in the tenant")
+    parser.add_argument("--scans", type=int, default=10)
+    parser.add_argument("--receipts", type=int, default=500)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args)
+        return
+
+    print(f"{args.requests} requests, {args.scans} scans of {args.receipts + args.receipts // 10} messages each")
+    print(f"{'metrics':>12} {'req p50 ms':>11} {'req p99 ms':>11} {'scan p50 ms':>12}")
+    phases = None
+    for label, env in CONFIGS:
+        database = os.path.join(tempfile.mkdtemp(), "metrics.db")
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_metrics", "--child", "--requests", str(args.requests),
+             "--rows", str(args.rows), "--scans", str(args.scans), "--receipts", str(args.receipts)],
+            env={**os.environ, **env, "DATABASE_URL": f"sqlite:///{database}"},
+            capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{label:>12} {result['request_p50']:>11.3f} {result['request_p99']:>11.3f} {result['scan_p50']:>12.1f}")
+        phases = phases or result["phases"]
+
+    total = sum(phases.values())
+    print("\nscan phases (metrics on): " + ", ".join(
+        f"{phase} {seconds / total:.0%}" for phase, seconds in sorted(phases.items(), key=lambda item: -item[1])
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Throughput of the multi-account scan orchestrator against the local fake Gmail server.
+
+Every user scans the same synthetic mailbox under their own /u/<user>/ prefix, so the
+fake enforces Gmail's per-user quota on each of them separately. Full scans are timed
+at each concurrency, first with the per-user limiter off (scans run into 429s and
+back off) and then on (scans pace themselves under the quota), reporting mailboxes/min
+and the 429s the fake answered. The last part starts a run in a child process, kills
+it midway, and resumes the run here: only the mailboxes the child didn't finish are
+scanned again.
+
+    cd server && python -m benchmarks.bench_scan_orchestrator --users 40 --concurrency 1 4 16
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=40)
+    parser.add_argument("--receipts", type=int, default=150)
+    parser.add_argument("--zombies", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--quota", type=float, default=250, help="quota units per user per second the fake allows")
+    parser.add_argument("--error-rate", type=float, default=0.01, help="share of calls the fake fails with 503")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        os.environ["DATABASE_URL"] = args.child
+    else:
+        # Must be set before the app's engine is created on import; a file, so the crash
+        # demo's child process sees the same database
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'orchestrator.db')}"
+
+    import logging
+    from sqlalchemy import delete, func
+    from sqlmodel import Session, SQLModel, select
+
+    from app.core.config import settings
+    from app.core.database import engine
+    from app.models.oauth import GmailScanCursor, OAuthToken
+    from app.models.scan_job import ScanJob
+    # The scanner itself, so create_all() makes every table a scan reads and writes
+    from app.services import gmail_scanner, scan_orchestrator  # noqa: F401
+    from benchmarks.fake_gmail import FakeGmailServer, generate_mailbox
+    from benchmarks.generators import create_tenant
+
+    logging.basicConfig(level=logging.CRITICAL)  # the error_rate 503s would log every retry
+    mailbox = generate_mailbox(args.receipts, args.zombies)
+
+    def orchestrate(fake: FakeGmailServer, concurrency: int, new: bool = True):
+        # Full scans each time, not history scans from the last run's cursors
+        with Session(engine) as session:
+            session.execute(delete(GmailScanCursor))
+            session.commit()
+        return scan_orchestrator.orchestrate(
+            concurrency, new, service_factory=lambda user_id, http: fake.service(http=http, user=user_id)
+        )
+
+    with FakeGmailServer(mailbox, args.latency, args.quota, args.error_rate) as fake:
+        if args.child:
+            orchestrate(fake, args.concurrency[0])
+            return
+
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            for i in range(args.users):
+                user_id, _ = create_tenant(engine, f"user{i}@example.com")
+                session.add(OAuthToken(user_id=user_id, access_token="fake"))
+            session.commit()
+
+        print(f"{args.users} mailboxes of {len(mailbox)} messages; fake: {args.latency * 1000:.0f}ms per request, "
+              f"{args.quota:.0f} units/s per user, {args.error_rate:.0%} 503s")
+        print(f"{'limiter':>8} {'workers':>8} {'seconds':>8} {'mbox/min':>9} {'failed':>7} {'requests':>9} "
+              f"{'429s':>6} {'503s':>6}")
+        for limit in [0, int(args.quota)]:
+            settings.GMAIL_USER_QUOTA_UNITS = limit
+            for concurrency in args.concurrency:
+                fake.reset_counters()
+                report = orchestrate(fake, concurrency)
+                print(f"{'on' if limit else 'off':>8} {concurrency:>8} {report.seconds:>8.1f} "
+                      f"{report.mailboxes_per_minute:>9.1f} {report.failed:>7} {fake.request_count:>9} "
+                      f"{fake.throttled:>6} {fake.errors:>6}")
+
+        # Crash and resume: kill a run once half its mailboxes are done
+        concurrency = args.concurrency[-1]
+        with Session(engine) as session:
+            last_run = session.exec(select(func.max(ScanJob.run_id))).one() or 0
+        child = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.bench_scan_orchestrator", "--child", os.environ["DATABASE_URL"],
+             "--receipts", str(args.receipts), "--zombies", str(args.zombies), "--latency", str(args.latency),
+             "--quota", str(args.quota), "--error-rate", str(args.error_rate), "--concurrency", str(concurrency)],
+        )
+        done = 0
+        with Session(engine) as session:
+            while done < args.users // 2 and child.poll() is None:
+                time.sleep(0.05)
+                done = session.exec(
+                    select(func.count()).where(ScanJob.run_id > last_run, ScanJob.status == "succeeded")
+                ).one()
+        child.send_signal(signal.SIGKILL)
+        child.wait()
+        print(f"\nkilled a run at concurrency {concurrency} with {done} of {args.users} mailboxes done")
+        report = scan_orchestrator.orchestrate(
+            concurrency, service_factory=lambda user_id, http: fake.service(http=http, user=user_id)
+        )
+        print(f"resumed: {report.summary()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Count DB statements and time the write side of a scan over a synthetic mailbox.
+
+Runs the same scan twice against a fresh SQLite file: once with the old
+one-SELECT-per-message write loop and once with the bulk candidate upsert.
+
+    cd server && python -m benchmarks.bench_scan_upsert --messages 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, select
+
+import app.services.gmail_scanner as gmail_scanner
+from app.models.oauth import OAuthToken
+from app.models.subscription import Subscription
+from benchmarks.fake_gmail import FakeGmailServer, VENDORS, generate_mailbox
+from benchmarks.generators import create_tenant
+
+
+def per_message_save(session: Session, tenant_id: int, signals: list[dict]) -> list[Subscription]:
+    # The pre-bulk write path: a SELECT by name for every message
+    found = []
+    for signal in signals:
+        existing = session.exec(select(Subscription).where(Subscription.name == signal["service_name"])).first()
+        if signal["kind"] == "receipt":
+            if not existing:
+                existing = Subscription(tenant_id=tenant_id, name=signal["service_name"], amount=signal["amount"], team="Unassigned",
+                                        seats_total=1, seats_unused=0, status="active",
+                                        last_used=datetime.now().strftime("%Y-%m-%d"))
+                session.add(existing)
+            elif existing.amount == 0.0 and signal["amount"] > 0:
+                existing.amount = signal["amount"]
+            if existing not in found:
+                found.append(existing)
+        elif existing:
+            if existing.status == "active":
+                existing.status = "zombie"
+                existing.seats_unused = existing.seats_total
+        else:
+            session.add(Subscription(tenant_id=tenant_id, name=signal["service_name"], amount=0.0, team="Unassigned", seats_total=1,
+                                     seats_unused=1, status="zombie", last_used="Long time ago"))
+    return found
+
+
+def run(label: str, fake: FakeGmailServer, max_messages: int, legacy: bool) -> dict:
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    create_tenant(engine)
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    original_save = gmail_scanner.save_candidates
+    if legacy:
+        # Replay the collected signals through the old loop instead of the bulk writer
+        signals = []
+        original_add_receipt, original_add_zombie = gmail_scanner.add_receipt, gmail_scanner.add_zombie
+        gmail_scanner.add_receipt = lambda candidates, signal: signals.append(signal)
+        gmail_scanner.add_zombie = lambda candidates, signal: signals.append(signal)
+        gmail_scanner.save_candidates = lambda session, tenant_id, candidates: per_message_save(session, tenant_id, signals)
+
+    try:
+        with Session(engine) as session:
+            token = OAuthToken(user_id=1, access_token="fake")
+            session.add(token)
+            session.commit()
+            session.refresh(token)
+            statements.clear()
+            start = time.perf_counter()
+            found = gmail_scanner.scan_gmail_for_subscriptions(
+                token, session, service=fake.service(), max_messages=max_messages
+            )
+            elapsed = time.perf_counter() - start
+    finally:
+        gmail_scanner.save_candidates = original_save
+        if legacy:
+            gmail_scanner.add_receipt, gmail_scanner.add_zombie = original_add_receipt, original_add_zombie
+
+    subscription_statements = [s for s in statements if "subscription" in s.lower()]
+    print(f"{label:<12} found={len(found):<4} statements={len(statements):<6} "
+          f"on subscription={len(subscription_statements):<6} {elapsed:>7.3f}s")
+    return {"label": label, "statements": len(statements), "seconds": elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--zombie-ratio", type=float, default=0.1)
+    args = parser.parse_args()
+
+    zombies = int(args.messages * args.zombie_ratio)
+    mailbox = generate_mailbox(args.messages - zombies, zombies)
+    print(f"{len(mailbox)} messages from {len(VENDORS)} vendors")
+    with FakeGmailServer(mailbox, latency=0) as fake:
+        run("per-message", fake, args.messages, legacy=True)
+        run("bulk", fake, args.messages, legacy=False)
+
+
+if __name__ == "__main__":
+    main()
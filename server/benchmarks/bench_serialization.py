@@ -0,0 +1,71 @@
+"""
+CPU time and bytes on the wire of large GET /api/v1/subscriptions responses.
+
+A tenant with --rows subscriptions is listed whole (?all=true) and a page at a time
+(?limit=1000), through the ASGI app in-process, asking for each encoding in turn. CPU
+time is the process's, so it counts the compression Starlette hands to worker threads,
+and the database work on the same thread; it is the median of --requests requests.
+Run on a checkout from before app/core/responses.py and app/core/compression.py for
+the old numbers.
+
+    cd server && python -m benchmarks.bench_serialization --rows 50000 --requests 5
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+ENCODINGS = ["identity", "gzip", "br"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--requests", type=int, default=5)
+    args = parser.parse_args()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'serialization.db')}"
+
+    import httpx
+    from sqlmodel import SQLModel
+
+    from app.core.database import engine
+    from app.core.security import create_access_token
+    from benchmarks.generators import create_tenant, populate
+    from main import app
+
+    SQLModel.metadata.create_all(engine)
+    _, tenant_id = create_tenant(engine)
+    populate(engine, args.rows, tenant_id=tenant_id)
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'bench@example.com'})}"}
+
+    async def measure(client: httpx.AsyncClient, url: str, encoding: str) -> tuple[float, int, str]:
+        timings = []
+        for _ in range(args.requests + 1):
+            start = time.process_time()
+            # Streamed, so httpx doesn't decode the body and its size is what was sent
+            async with client.stream("GET", url, headers={"Accept-Encoding": encoding}) as response:
+                response.raise_for_status()
+                size = sum([len(chunk) async for chunk in response.aiter_raw()])
+            timings.append((time.process_time() - start) * 1000)
+        timings = sorted(timings[1:])
+        return timings[len(timings) // 2], size, response.headers.get("content-encoding", "identity")
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+            print(f"{args.rows} subscriptions, median of {args.requests} requests")
+            print(f"{'request':>18} {'accept':>9} {'sent as':>9} {'CPU ms':>8} {'bytes':>10}")
+            for label, url in [
+                ("all=true", "/api/v1/subscriptions?all=true"),
+                ("limit=1000", "/api/v1/subscriptions?limit=1000&sort=-amount"),
+            ]:
+                for encoding in ENCODINGS:
+                    cpu, size, sent = await measure(client, url, encoding)
+                    print(f"{label:>18} {encoding:>9} {sent:>9} {cpu:>8.1f} {size:>10}")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
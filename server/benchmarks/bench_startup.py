@@ -0,0 +1,98 @@
+"""
+API worker cold start: how long from spawning a process until it has answered a request.
+
+Each sample is a fresh interpreter that imports main, runs the app's startup (the schema
+check in app/core/schema.py, which migrates an empty database) and serves GET / through
+the ASGI app. The import and startup times are measured inside the child, the total from
+the parent's spawn to the answer, so it includes the interpreter's own start. The first
+boot is on an empty database and runs every migration; the rest find it at head, like
+every worker of a deploy but the first. The child also reports whether the Google client
+libraries were imported, which only requests that talk to Google should do.
+
+Exits with status 1 when the warm boots' median total is over --budget-ms.
+
+    cd server && python -m benchmarks.bench_startup --boots 10 --budget-ms 2000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+GOOGLE_MODULES = ("googleapiclient", "google_auth_oauthlib", "google_auth_httplib2", "httplib2")
+
+
+def child():
+    start = time.perf_counter()
+    import asyncio
+
+    import httpx
+
+    import main
+    imported = time.perf_counter()
+
+    async def boot() -> tuple[float, float]:
+        async with main.app.router.lifespan_context(main.app):
+            started = time.perf_counter()
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                (await client.get("/")).raise_for_status()
+            return started, time.perf_counter()
+
+    started, answered = asyncio.run(boot())
+    print(json.dumps({
+        "import_ms": (imported - start) * 1000,
+        "startup_ms": (started - imported) * 1000,
+        "first_request_ms": (answered - started) * 1000,
+        "google_loaded": any(module in sys.modules for module in GOOGLE_MODULES),
+    }), flush=True)
+
+
+def boot(database_url: str) -> dict:
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child"],
+        env={**os.environ, "DATABASE_URL": database_url}, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    line = process.stdout.readline()
+    total = (time.perf_counter() - start) * 1000
+    process.wait()
+    if process.returncode:
+        raise RuntimeError(f"Boot failed with status {process.returncode}")
+    return {**json.loads(line), "total_ms": total}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--boots", type=int, default=10, help="warm boots, after the first")
+    parser.add_argument("--budget-ms", type=float, default=2000, help="for the warm boots' median total")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return
+
+    database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'startup.db')}"
+    first = boot(database_url)
+    warm = [boot(database_url) for _ in range(args.boots)]
+
+    def median(samples: list[dict], key: str) -> float:
+        return sorted(sample[key] for sample in samples)[len(samples) // 2]
+
+    print(f"{'boot':>12} {'import ms':>10} {'startup ms':>11} {'request ms':>11} {'total ms':>9} {'google':>7}")
+    print(f"{'first':>12} {first['import_ms']:>10.0f} {first['startup_ms']:>11.0f} {first['first_request_ms']:>11.1f} "
+          f"{first['total_ms']:>9.0f} {'yes' if first['google_loaded'] else 'no':>7}")
+    print(f"{'warm median':>12} {median(warm, 'import_ms'):>10.0f} {median(warm, 'startup_ms'):>11.0f} "
+          f"{median(warm, 'first_request_ms'):>11.1f} {median(warm, 'total_ms'):>9.0f} "
+          f"{'yes' if any(sample['google_loaded'] for sample in warm) else 'no':>7}")
+
+    total = median(warm, "total_ms")
+    print(f"\nbudget {args.budget_ms:.0f}ms: {'ok' if total <= args.budget_ms else 'OVER'} ({total:.0f}ms)")
+    if total > args.budget_ms:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
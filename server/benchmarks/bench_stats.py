@@ -0,0 +1,80 @@
+"""
+Latency and Python memory of /stats as the subscription table grows.
+
+Compares the old load-every-row implementation with the SQL aggregation in
+app/services/analytics_service.py on SQLite files of increasing size.
+
+    cd server && python -m benchmarks.bench_stats --rows 1000 10000 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.models.subscription import Subscription
+from app.services.analytics_service import get_dashboard_stats
+from benchmarks.generators import populate
+
+
+def legacy_stats(session: Session) -> dict:
+    # The endpoint before SQL aggregation: every row into Python, three loops
+    subscriptions = session.exec(select(Subscription)).all()
+    total_spend = sum(sub.amount for sub in subscriptions if sub.status == "active")
+    wasted_spend = 0
+    active_fully_used = active_with_waste = zombie_count = 0
+    for sub in subscriptions:
+        if sub.status == "active":
+            if sub.seats_total > 0 and sub.seats_unused > 0:
+                active_with_waste += 1
+                wasted_spend += sub.amount / sub.seats_total * sub.seats_unused
+            else:
+                active_fully_used += 1
+        elif sub.status in ["zombie", "critical"]:
+            zombie_count += 1
+            wasted_spend += sub.amount
+    spend_by_team = {}
+    for sub in subscriptions:
+        if sub.status == "active":
+            team = sub.team or "Unassigned"
+            spend_by_team[team] = spend_by_team.get(team, 0) + sub.amount
+    return {"total_spend": total_spend, "wasted_spend": wasted_spend, "zombie_count": zombie_count,
+            "spend_by_team": sorted(spend_by_team.items(), key=lambda item: item[1], reverse=True)}
+
+
+def measure(engine, fn, repeat: int = 5) -> tuple[float, float, dict]:
+    timings = []
+    for _ in range(repeat):
+        with Session(engine) as session:
+            tracemalloc.start()
+            start = time.perf_counter()
+            result = fn(session)
+            timings.append(time.perf_counter() - start)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    timings.sort()
+    return timings[len(timings) // 2], peak / 1024 / 1024, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8}  {'legacy ms':>10} {'legacy MiB':>10}  {'sql ms':>8} {'sql MiB':>8}")
+    for rows in args.rows:
+        engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'stats.db')}")
+        SQLModel.metadata.create_all(engine)
+        populate(engine, rows)
+        legacy_s, legacy_mb, legacy = measure(engine, legacy_stats, args.repeat)
+        sql_s, sql_mb, stats = measure(engine, lambda session: get_dashboard_stats(session, 1), args.repeat)
+        assert abs(legacy["total_spend"] - stats["total_spend"]) < 1e-3 * max(1, stats["total_spend"])
+        assert abs(legacy["wasted_spend"] - stats["wasted_spend"]) < 1e-3 * max(1, stats["wasted_spend"])
+        print(f"{rows:>8}  {legacy_s * 1000:>10.1f} {legacy_mb:>10.2f}  {sql_s * 1000:>8.1f} {sql_mb:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Per-tenant read latency as the number of tenants sharing the tables grows.
+
+One probe tenant with a fixed number of subscriptions is measured while other tenants
+are added around it, up to 10k: a page of /subscriptions sorted by amount, the uncached
+/stats aggregates and a monthly /stats/timeseries over the last year. With every index
+leading with tenant_id the probe's reads are range seeks over its own rows, so p50/p99
+should stay flat while the shared tables grow by orders of magnitude. The last line
+moves the probe tenant into dedicated storage and reads it there.
+
+    cd server && python -m benchmarks.bench_tenants --tenants 100 1000 10000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+
+def percentiles(fn, reads: int) -> tuple[float, float]:
+    timings = []
+    for _ in range(reads):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2], timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tenants", type=int, nargs="+", default=[100, 1_000, 10_000])
+    parser.add_argument("--rows-per-tenant", type=int, default=20)
+    parser.add_argument("--probe-rows", type=int, default=500)
+    parser.add_argument("--months", type=int, default=12, help="monthly rollup buckets per tenant")
+    parser.add_argument("--reads", type=int, default=200)
+    args = parser.parse_args()
+    # Must be set before the app's engine is created on import
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'tenants.db')}"
+    # No API workers caching the tenant for the move to wait out
+    os.environ["PRINCIPAL_CACHE_TTL"] = "0"
+
+    from sqlalchemy import func, insert
+    from sqlmodel import Session, SQLModel, select
+
+    from app.core.database import engine
+    from app.core.tenancy import tenant_engine
+    from app.models.organization import Organization
+    from app.models.spend_rollup import SpendRollup
+    from app.models.subscription import Subscription
+    from app.schemas.subscription import SubscriptionFilter
+    from app.services import rollup_service
+    from app.services.analytics_service import compute_stats_entry
+    from app.services.subscription_service import SubscriptionService
+    from app.services.tenant_storage import move_to_dedicated
+    from benchmarks.generators import STATUSES, TEAMS
+
+    SQLModel.metadata.create_all(engine)
+    rng = random.Random(11)
+    today = date.today()
+    months = [rollup_service.bucket_start(today - timedelta(days=30 * i), "month") for i in range(args.months, 0, -1)]
+
+    def add_tenants(session: Session, first: int, last: int, rows: int):
+        session.execute(insert(Organization), [{"id": i, "name": f"Tenant {i}"} for i in range(first, last + 1)])
+        batch = []
+        for tenant_id in range(first, last + 1):
+            for i in range(rows):
+                seats = rng.randint(1, 50)
+                batch.append({
+                    "tenant_id": tenant_id, "name": f"Vendor {i}", "vendor_key": f"vendor {i}", "team": rng.choice(TEAMS),
+                    "amount": round(rng.uniform(5, 2000), 2), "seats_total": seats,
+                    "seats_unused": rng.randint(0, seats) if rng.random() < 0.3 else 0,
+                    "status": rng.choice(STATUSES), "last_used": "Unknown",
+                })
+            if len(batch) >= 10_000:
+                session.execute(insert(Subscription), batch)
+                batch = []
+        if batch:
+            session.execute(insert(Subscription), batch)
+        # Every tenant gets a year of monthly history plus today's buckets, like a live one
+        snapshot = rollup_service._snapshot(session)
+        rollup_service._write_snapshot(session, [("month", bucket) for bucket in months], snapshot)
+        rollup_service._write_snapshot(session, rollup_service._current_buckets(), snapshot)
+        session.commit()
+
+    def measure(session: Session) -> list[tuple[float, float]]:
+        service = SubscriptionService(session, 1)
+        page = SubscriptionFilter()
+        since = today - timedelta(days=365)
+        return [
+            percentiles(lambda: service.list_page(page, "-amount", None, 50), args.reads),
+            percentiles(lambda: compute_stats_entry(session, 1), args.reads),
+            percentiles(lambda: rollup_service.get_timeseries(session, 1, "month", since, today, "team"), args.reads),
+        ]
+
+    def report(label: str, session: Session, subscriptions: int, rollups: int):
+        cells = "".join(f" {p50:>7.2f} {p99:>7.2f}" for p50, p99 in measure(session))
+        print(f"{label:>10} {subscriptions:>10} {rollups:>10}{cells}")
+
+    print(f"probe tenant: {args.probe_rows} subscriptions; others: {args.rows_per_tenant} each; "
+          f"{args.reads} reads per cell, ms")
+    print(f"{'tenants':>10} {'subs rows':>10} {'rollups':>10} {'list p50':>8} {'p99':>7} {'stats p50':>8} {'p99':>7} "
+          f"{'series p50':>8} {'p99':>7}")
+    with Session(engine) as session:
+        add_tenants(session, 1, 1, args.probe_rows)
+        count = 1
+        for target in sorted(args.tenants):
+            if target > count:
+                start = time.perf_counter()
+                add_tenants(session, count + 1, target, args.rows_per_tenant)
+                count = target
+                loaded = time.perf_counter() - start
+            else:
+                loaded = 0
+            subscriptions = session.exec(select(func.count()).select_from(Subscription)).one()
+            rollups = session.exec(select(func.count()).select_from(SpendRollup)).one()
+            report(f"{count}", session, subscriptions, rollups)
+            if loaded > 5:
+                print(f"{'':>10} (tenants added in {loaded:.0f}s)")
+
+    move_to_dedicated(1)
+    with Session(engine) as session:
+        probe = session.get(Organization, 1)
+    with Session(tenant_engine(probe)) as session:
+        subscriptions = session.exec(select(func.count()).select_from(Subscription)).one()
+        rollups = session.exec(select(func.count()).select_from(SpendRollup)).one()
+        report("dedicated", session, subscriptions, rollups)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Spend rollup maintenance cost and /stats/timeseries read cost as history grows.
+
+Loads a subscription table, then replays several years of day-by-day edits through
+SubscriptionService (status and team moves, price changes), with the rollup clock moved
+forward each day and compaction run at every month end. Reports what the rollup adds to
+a single update, how many rollup rows each read touches against the table's size, and read
+latency for short and multi-year ranges. The last line checks the closing buckets against
+what the raw table says now.
+
+    cd server && python -m benchmarks.bench_timeseries --rows 50000 --years 5
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--edits-per-day", type=int, default=3)
+    parser.add_argument("--reads", type=int, default=50)
+    args = parser.parse_args()
+    # Must be set before the app's engine is created on import
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'timeseries.db')}"
+
+    from sqlalchemy import func
+    from sqlmodel import Session, SQLModel, select
+
+    from app.core.database import engine
+    from app.models.spend_rollup import SpendRollup
+    from app.services import rollup_service, subscription_service
+    from app.services.analytics_service import compute_stats_entry
+    from benchmarks.generators import STATUSES, TEAMS, populate
+
+    SQLModel.metadata.create_all(engine)
+    populate(engine, args.rows)
+    rng = random.Random(3)
+    end = date.today()
+    day = end - timedelta(days=365 * args.years)
+    clock = rollup_service._today
+    rollup_service._today = lambda: day
+
+    update_ms, refresh_ms = [], []
+    refresh = rollup_service.refresh_rollups
+    def timed_refresh(*a, **kw):
+        start = time.perf_counter()
+        refresh(*a, **kw)
+        refresh_ms.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    with Session(engine) as session:
+        service = subscription_service.SubscriptionService(session, 1)
+        subscription_service.refresh_rollups = timed_refresh
+        while day <= end:
+            for _ in range(args.edits_per_day):
+                change = rng.choice([
+                    {"status": rng.choice(STATUSES)},
+                    {"team": rng.choice(TEAMS)},
+                    {"amount": round(rng.uniform(5, 2000), 2)},
+                ])
+                t = time.perf_counter()
+                service.update(rng.randint(1, args.rows), change)
+                update_ms.append((time.perf_counter() - t) * 1000)
+            if (day + timedelta(days=1)).day == 1:
+                rollup_service.compact_rollups(session)
+            day += timedelta(days=1)
+    replay = time.perf_counter() - start
+    rollup_service._today = clock
+
+    with Session(engine) as session:
+        counts = dict(session.exec(select(SpendRollup.granularity, func.count()).group_by(SpendRollup.granularity)).all())
+        print(f"{args.rows} subscriptions, {len(update_ms)} updates over {args.years} years replayed in {replay:.0f}s; "
+              f"rollup rows: {counts.get('day', 0)} daily, {counts.get('month', 0)} monthly")
+        update_ms.sort()
+        refresh_ms.sort()
+        print(f"per update: {update_ms[len(update_ms) // 2]:.2f} ms median, of which rollup refresh "
+              f"{refresh_ms[len(refresh_ms) // 2]:.2f} ms (p99 {refresh_ms[int(len(refresh_ms) * 0.99)]:.2f} ms)")
+
+        start = time.perf_counter()
+        compute_stats_entry(session, 1)
+        print(f"baseline, one snapshot aggregated from the raw table: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        reads = [
+            ("day", end - timedelta(days=30), "total"),
+            ("day", end - timedelta(days=365), "team"),
+            ("month", end - timedelta(days=365 * args.years), "total"),
+            ("month", end - timedelta(days=365 * args.years), "team"),
+            ("month", end - timedelta(days=365 * args.years), "status"),
+        ]
+        print(f"{'read':>28} {'buckets':>8} {'rows read':>10} {'ms':>8}")
+        for granularity, since, group_by in reads:
+            start = time.perf_counter()
+            for _ in range(args.reads):
+                series = rollup_service.get_timeseries(session, 1, granularity, since, end, group_by)
+            ms = (time.perf_counter() - start) / args.reads * 1000
+            first = rollup_service.bucket_start(since, granularity)
+            seed = session.exec(select(func.max(SpendRollup.bucket)).where(
+                SpendRollup.tenant_id == 1, SpendRollup.granularity == granularity, SpendRollup.bucket <= first)).one()
+            touched = session.exec(select(func.count()).select_from(SpendRollup).where(
+                SpendRollup.tenant_id == 1, SpendRollup.granularity == granularity,
+                SpendRollup.bucket >= (seed or first), SpendRollup.bucket <= end)).one()
+            label = f"{granularity} since {since}, by {group_by}"
+            print(f"{label:>28} {len(series['buckets']):>8} {touched:>10} {ms:>8.2f}")
+
+        live = compute_stats_entry(session, 1)["totals"]
+        closing = rollup_service.get_timeseries(session, 1, "day", end, end)["series"][0]
+        print(f"closing bucket vs table: spend {closing['spend'][-1]:.2f} / {live['total_spend']:.2f}, "
+              f"waste {closing['wasted_spend'][-1]:.2f} / {live['wasted_spend']:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Transaction ingestion throughput, memory and detection accuracy.
+
+Writes a synthetic card export (CSV, or OFX with --format ofx): a year of monthly, weekly
+and yearly subscriptions from known vendors, some cancelled halfway through, buried in
+one-off spend across thousands of merchants, shuffled. Then ingests it into a fresh
+SQLite file and reports rows/s, peak RSS of the parent and the parser processes (Linux), and
+how the detected subscriptions compare with the ones planted. Detection is timed with
+and without NumPy.
+
+    cd server && python -m benchmarks.bench_transactions --rows 1000000 --workers 4
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+import random
+import resource
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks.fake_gmail import VENDORS
+
+CITIES = ["SAN FRANCISCO CA", "NEW YORK NY", "AUSTIN TX", "SEATTLE WA", "DUBLIN", "LONDON"]
+PREFIXES = ["", "", "SQ *", "PAYPAL *", "TST* "]
+WORDS = ["BLUE", "RIVER", "CORNER", "GOLDEN", "CITY", "MARKET", "CAFE", "DELI", "HARDWARE", "BOOKS", "GRILL", "PARKING"]
+
+def plant_subscriptions(rng: random.Random, today: date) -> tuple[list[tuple], set[str]]:
+    """Recurring charges as (date, description, amount), and the vendors that are still billing."""
+    charges, current = [], set()
+    plans = [(vendor, 30, rng.choice([8, 12, 15, 49.99, 99])) for vendor in VENDORS[:12]]
+    plans += [(vendor, 7, 9.99) for vendor in VENDORS[12:14]]
+    plans += [(vendor, 365, 240.0) for vendor in VENDORS[14:16]]
+    for i, (vendor, every, amount) in enumerate(plans):
+        cancelled = i % 5 == 4 and every < 365  # stopped billing six months ago
+        last = today - timedelta(days=180 if cancelled else rng.randint(0, every - 1))
+        if not cancelled:
+            current.add(vendor.lower())
+        day = last
+        while day > today - timedelta(days=max(365, every * 3 + 1)):
+            jitter = rng.randint(-1, 1) if every > 7 else 0
+            price = amount * (1.1 if day > today - timedelta(days=90) and i % 3 == 0 else 1)  # a price change
+            charges.append((day + timedelta(days=jitter), f"{rng.choice(PREFIXES)}{vendor.upper()} {rng.choice(CITIES)}", -round(price, 2)))
+            day -= timedelta(days=every)
+    return charges, current
+
+def write_statement(path: str, rows: int, fmt: str, seed: int = 11) -> set[str]:
+    rng = random.Random(seed)
+    today = date.today()
+    charges, current = plant_subscriptions(rng, today)
+    merchants = [f"{a} {b} {c}" for a in WORDS for b in WORDS for c in WORDS if len({a, b, c}) == 3]
+    while len(charges) < rows:
+        charges.append((
+            today - timedelta(days=rng.randint(0, 365)),
+            f"{rng.choice(PREFIXES)}{rng.choice(merchants)} {rng.choice(CITIES)}",
+            -round(rng.uniform(2, 400), 2) if rng.random() < 0.95 else round(rng.uniform(10, 2000), 2),
+        ))
+    rng.shuffle(charges)
+
+    with open(path, "w", encoding="utf-8") as f:
+        if fmt == "csv":
+            f.write("Date,Description,Amount,Reference\n")
+            for i, (day, description, amount) in enumerate(charges):
+                f.write(f"{day:%m/%d/%Y},\"{description}\",{amount:.2f},{i:09d}\n")
+        else:
+            f.write("OFXHEADER:100\nDATA:OFXSGML\n\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><CURDEF>USD\n<BANKTRANLIST>\n")
+            for i, (day, description, amount) in enumerate(charges):
+                f.write(f"<STMTTRN>\n<TRNTYPE>{'DEBIT' if amount < 0 else 'CREDIT'}\n<DTPOSTED>{day:%Y%m%d}120000\n"
+                        f"<TRNAMT>{amount:.2f}\n<FITID>{i:09d}\n<NAME>{description}\n</STMTTRN>\n")
+            f.write("</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n")
+    return current
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--format", choices=["csv", "ofx"], default="csv")
+    parser.add_argument("--workers", type=int, default=0, help="parser processes, 0 = one per core")
+    parser.add_argument("--chunk-mb", type=int, default=4)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    # Must be set before the app's settings and engine are created on import
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'transactions.db')}"
+    os.environ["INGEST_WORKERS"] = str(args.workers)
+    os.environ["INGEST_CHUNK_BYTES"] = str(args.chunk_mb * 1024 * 1024)
+
+    from sqlalchemy import func
+    from sqlmodel import Session, SQLModel, select
+
+    from app.core.database import engine
+    from app.models.subscription import Subscription
+    from app.models.transaction import Transaction
+    from app.services import recurring_charges, transaction_ingest
+    from benchmarks.generators import create_tenant
+
+    SQLModel.metadata.create_all(engine)
+    user_id, tenant_id = create_tenant(engine)
+    path = os.path.join(workdir, f"statement.{args.format}")
+    start = time.perf_counter()
+    # In a child process, so the generator's rows don't count towards the parent's peak RSS
+    with ProcessPoolExecutor(max_workers=1) as generator:
+        planted = generator.submit(write_statement, path, args.rows, args.format).result()
+    size_mb = os.path.getsize(path) / 2 ** 20
+    print(f"{args.rows} rows, {size_mb:.0f} MiB {args.format}, written in {time.perf_counter() - start:.1f}s; "
+          f"{transaction_ingest.ingest_workers()} parser process(es), {args.chunk_mb} MiB ranges")
+
+    with Session(engine, expire_on_commit=False) as session:
+        for label in ["first import", "re-import"]:
+            start = time.perf_counter()
+            result = transaction_ingest.ingest_file(session, user_id, path, args.format)
+            seconds = time.perf_counter() - start
+            print(f"{label:>13}: {seconds:6.1f}s  {result.rows_imported / seconds:>9,.0f} rows/s  "
+                  f"imported {result.rows_imported}, skipped {result.rows_skipped}, "
+                  f"recurring {len(result.recurring)}, subscriptions {result.subscriptions_found}")
+        print(f"transaction rows in table: {session.exec(select(func.count()).select_from(Transaction)).one()}")
+
+        timings = {}
+        for label, module in [("numpy", recurring_charges.np), ("loop", None)]:
+            if label == "numpy" and module is None:
+                continue
+            saved, recurring_charges.np = recurring_charges.np, module
+            start = time.perf_counter()
+            found = transaction_ingest.find_recurring(session, tenant_id)
+            timings[label] = (time.perf_counter() - start, {charge.key for charge in found})
+            recurring_charges.np = saved
+        print("detection: " + ", ".join(f"{label} {seconds:.2f}s" for label, (seconds, _) in timings.items()))
+        if len({frozenset(keys) for _, keys in timings.values()}) > 1:
+            print("  WARNING: numpy and loop detection disagree")
+
+        detected = {sub.vendor_key for sub in session.exec(select(Subscription))}
+        print(f"planted current subscriptions {len(planted)}, detected {len(detected)}, "
+              f"missed {sorted(planted - detected)}, false positives {sorted(detected - planted)}")
+
+    parent = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    parsers = [peak_rss_mb(pid) for pid in (transaction_ingest._pool._processes if transaction_ingest._pool else [])]
+    print(f"peak RSS: parent {parent:.0f} MiB" + (f", parser processes {max(parsers):.0f} MiB" if parsers else ""))
+
+def peak_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmHWM")) / 1024
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Local fake of the QuickBooks and Xero REST APIs used by the integration benchmarks.
+
+One HTTP server answers both providers' company-info and expense-listing endpoints,
+with their real page sizes. Every request sleeps `latency` seconds to stand in for
+network time. `fail_every` makes every Nth request answer 503 (or 429 with
+Retry-After) so the connectors' retry path gets exercised.
+"""
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.fake_gmail import VENDORS
+
+VALID_TOKEN = "good-token"
+QB_COMPANY = re.compile(r"^/v3/company/([^/]+)/companyinfo/")
+QB_QUERY = re.compile(r"^/v3/company/([^/]+)/query$")
+QB_RANGE = re.compile(r"startposition (\d+) maxresults (\d+)", re.IGNORECASE)
+XERO_PAGE_SIZE = 100
+
+
+def generate_expenses(count: int, seed: int = 7) -> list[dict]:
+    """Monthly charges from a handful of SaaS vendors plus one-off purchases."""
+    rng = random.Random(seed)
+    today = date.today()
+    expenses = []
+    for i in range(count):
+        if rng.random() < 0.7:
+            vendor = rng.choice(VENDORS)
+            amount = round(10 + VENDORS.index(vendor) * 12.5, 2)
+        else:
+            vendor, amount = f"Office Supplier {i}", round(rng.uniform(5, 300), 2)
+        expenses.append({"vendor": vendor, "amount": amount, "date": (today - timedelta(days=rng.randint(0, 365))).isoformat()})
+    return expenses
+
+
+class _Server(ThreadingHTTPServer):
+    # The default backlog of 5 makes a burst of concurrent connects wait on SYN retries
+    request_queue_size = 256
+    daemon_threads = True
+
+
+class FakeAccountingServer:
+    def __init__(self, expenses: list[dict], latency: float = 0.02, fail_every: int = 0):
+        self.expenses = expenses
+        self.latency = latency
+        self.fail_every = fail_every
+        self.calls = Counter()
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self.httpd = _Server(("127.0.0.1", 0), self._handler_class())
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def quickbooks_page(self, params: dict) -> dict:
+        match = QB_RANGE.search(params.get("query", [""])[0])
+        start, size = (int(match.group(1)), int(match.group(2))) if match else (1, 100)
+        page = self.expenses[start - 1:start - 1 + size]
+        return {"QueryResponse": {"Purchase": [
+            {"EntityRef": {"name": e["vendor"]}, "TotalAmt": e["amount"], "CurrencyRef": {"value": "USD"}, "TxnDate": e["date"]}
+            for e in page
+        ], "startPosition": start, "maxResults": len(page)}}
+
+    def xero_page(self, params: dict) -> dict:
+        page = int(params.get("page", ["1"])[0])
+        rows = self.expenses[(page - 1) * XERO_PAGE_SIZE:page * XERO_PAGE_SIZE]
+        return {"BankTransactions": [
+            {"Type": "SPEND", "Contact": {"Name": e["vendor"]}, "Total": e["amount"], "CurrencyCode": "USD", "DateString": f"{e['date']}T00:00:00"}
+            for e in rows
+        ]}
+
+    def dispatch(self, target: str, headers) -> tuple[int, dict, dict]:
+        with self._lock:
+            self.request_count += 1
+            count = self.request_count
+        if self.fail_every and count % self.fail_every == 0:
+            self.calls["injected_failure"] += 1
+            if count % (2 * self.fail_every) == 0:
+                return 429, {"Fault": "throttled"}, {"Retry-After": "0"}
+            return 503, {"Fault": "unavailable"}, {}
+        if headers.get("Authorization") != f"Bearer {VALID_TOKEN}":
+            return 401, {"Fault": "AuthenticationFailed"}, {}
+
+        url = urlparse(target)
+        params = parse_qs(url.query)
+        if QB_COMPANY.match(url.path):
+            self.calls["quickbooks.companyinfo"] += 1
+            return 200, {"CompanyInfo": {"CompanyName": "Fake Co"}}, {}
+        if QB_QUERY.match(url.path):
+            self.calls["quickbooks.query"] += 1
+            return 200, self.quickbooks_page(params), {}
+        if url.path == "/api.xro/2.0/Organisation":
+            self.calls["xero.organisation"] += 1
+            return 200, {"Organisations": [{"Name": "Fake Co"}]}, {}
+        if url.path == "/api.xro/2.0/BankTransactions":
+            self.calls["xero.banktransactions"] += 1
+            return 200, self.xero_page(params), {}
+        return 404, {"Fault": "NotFound"}, {}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                time.sleep(server.latency)
+                status, body, extra_headers = server.dispatch(self.path, self.headers)
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in extra_headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
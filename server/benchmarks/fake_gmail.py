@@ -0,0 +1,364 @@
+"""
+Local fake of the Gmail REST API used by the benchmarks.
+
+Serves messages.list, messages.get, getProfile, history.list and the multipart batch
+endpoint over real HTTP, so googleapiclient runs its normal request path against it.
+Every HTTP round trip sleeps for `latency` seconds to stand in for network time and
+is counted, and `calls` counts API calls per endpoint including ones inside a batch.
+
+Paths may carry a /u/<user>/ prefix (see service(user=...)) so several users can scan
+the one shared mailbox while quota is accounted per user: with quota_per_second set, a
+call that takes a user over that many quota units per second is answered 429, like
+Gmail's per-user rate limit, and error_rate answers that share of calls with a 503.
+
+POST /token stands in for Google's OAuth token endpoint (point credentials' token_uri at
+token_uri) and hands out fresh access tokens; requests made with the access token
+"expired" are answered 401. connect_latency is slept once per new connection, standing
+in for the TCP and TLS handshakes a reused connection doesn't pay again.
+"""
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from email.parser import Parser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import httplib2
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+VENDORS = [
+    "Notion", "Figma", "Slack", "Linear", "GitHub", "Zoom", "Atlassian", "Dropbox",
+    "Adobe", "Miro", "Loom", "Canva", "HubSpot", "Airtable", "Asana", "Vercel",
+]
+RECEIPT_SUBJECTS = [
+    "Your receipt from {vendor}",
+    "{vendor} invoice for your subscription - ${amount}",
+    "Your order with {vendor}",
+]
+ZOMBIE_SUBJECTS = [
+    "We miss you at {vendor}",
+    "Come back to {vendor}",
+    "{vendor}: log back in to keep your workspace",
+]
+
+MESSAGE_PATH = re.compile(r"^/gmail/v1/users/[^/]+/messages/([^/?]+)$")
+LIST_PATH = re.compile(r"^/gmail/v1/users/[^/]+/messages$")
+PROFILE_PATH = re.compile(r"^/gmail/v1/users/[^/]+/profile$")
+HISTORY_PATH = re.compile(r"^/gmail/v1/users/[^/]+/history$")
+USER_PREFIX = re.compile(r"^/u/([^/]+)(/.*)$")
+
+# The address of every mailbox the fake serves
+ME = "me@example.com"
+
+# Gmail's quota units per call (developers.google.com/gmail/api/reference/quota)
+QUOTA_UNITS = {"messages.list": 5, "messages.get": 5, "history.list": 2, "getProfile": 1}
+
+
+def generate_mailbox(receipts: int, zombies: int = 0, seed: int = 42, start: int = 0) -> list[dict]:
+    """Build a synthetic mailbox, newest message first. `start` offsets the message ids."""
+    rng = random.Random(seed)
+    now_ms = int(time.time() * 1000)
+    messages = []
+    for i in range(start, start + receipts + zombies):
+        vendor = rng.choice(VENDORS)
+        amount = f"{rng.randint(5, 500)}.{rng.randint(0, 99):02d}"
+        templates = RECEIPT_SUBJECTS if i < start + receipts else ZOMBIE_SUBJECTS
+        messages.append({
+            "id": f"m{i:08x}",
+            "threadId": f"t{i:08x}",
+            "subject": rng.choice(templates).format(vendor=vendor, amount=amount),
+            "from": f'"{vendor}" <billing@{vendor.lower()}.com>',
+            # Vendors bill a shared address; scans skip mail sent to the user's own (-to:me)
+            "to": "finance@example.com",
+            "snippet": f"Thanks for your payment of ${amount}.",
+            "internalDate": str(now_ms - rng.randint(0, 365 * 24 * 3600 * 1000)),
+        })
+    messages.sort(key=lambda m: int(m["internalDate"]), reverse=True)
+    return messages
+
+
+def split_user(path: str) -> tuple[str, str]:
+    """("alice", "/gmail/v1/...") for "/u/alice/gmail/v1/..."; paths without a prefix belong to "me"."""
+    match = USER_PREFIX.match(path)
+    return (match.group(1), match.group(2)) if match else ("me", path)
+
+
+def _subject_terms(query: str) -> list[str]:
+    match = re.search(r"subject:\((.*?)\)", query)
+    if not match:
+        return []
+    return [t.strip().strip('"').lower() for t in match.group(1).split(" OR ")]
+
+
+class FakeGmailServer:
+    def __init__(
+        self,
+        messages: list[dict],
+        latency: float = 0.02,
+        quota_per_second: float = 0,
+        error_rate: float = 0.0,
+        connect_latency: float = 0.0,
+    ):
+        self.messages = []
+        self.by_id = {}
+        self.history_id = 1000
+        # history.list answers 404 for start ids below this, like an expired Gmail cursor
+        self.history_floor = 0
+        self.latency = latency
+        self.quota_per_second = quota_per_second
+        self.error_rate = error_rate
+        self.connect_latency = connect_latency
+        self.request_count = 0
+        self.connections = 0
+        self.tokens_issued = 0
+        self.calls = Counter()
+        self.throttled = 0
+        self.errors = 0
+        self._quota = {}  # user -> (units available, as of)
+        self._rng = random.Random(3)
+        self._lock = threading.Lock()
+        self.deliver(messages)
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def root_url(self) -> str:
+        host, port = self._httpd.server_address
+        return f"http://{host}:{port}/"
+
+    @property
+    def token_uri(self) -> str:
+        return f"{self.root_url}token"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def reset_counters(self):
+        with self._lock:
+            self.request_count = 0
+            self.calls.clear()
+            self.throttled = 0
+            self.errors = 0
+            self.connections = 0
+            self.tokens_issued = 0
+
+    def deliver(self, messages: list[dict]):
+        """Add messages to the mailbox, each one getting the next historyId."""
+        with self._lock:
+            for msg in sorted(messages, key=lambda m: int(m["internalDate"])):
+                self.history_id += 1
+                msg["historyId"] = str(self.history_id)
+                self.by_id[msg["id"]] = msg
+            self.messages = sorted(self.by_id.values(), key=lambda m: int(m["internalDate"]), reverse=True)
+
+    def expire_history(self):
+        self.history_floor = self.history_id + 1
+
+    def service(self, http=None, user=None):
+        """A real googleapiclient Gmail service pointed at this server, as user if given."""
+        doc = json.loads(get_static_doc("gmail", "v1"))
+        doc["rootUrl"] = f"{self.root_url}u/{user}/" if user is not None else self.root_url
+        return build_from_document(doc, http=http or httplib2.Http())
+
+    # --- API surface -------------------------------------------------------
+
+    def list_messages(self, params: dict) -> tuple[int, dict]:
+        query = params.get("q", [""])[0]
+        terms = _subject_terms(query)
+        after = re.search(r"after:(\d+)", query)
+        after_ms = int(after.group(1)) * 1000 if after else 0
+        not_to_me = "-to:me" in query
+        max_results = int(params.get("maxResults", ["100"])[0])
+        offset = int(params.get("pageToken", ["0"])[0])
+        matched = [
+            m for m in self.messages
+            if (not terms or any(t in m["subject"].lower() for t in terms))
+            and int(m["internalDate"]) > after_ms
+            and not (not_to_me and ME in m.get("to", ""))
+        ]
+        page = matched[offset:offset + max_results]
+        body = {
+            "messages": [{"id": m["id"], "threadId": m["threadId"]} for m in page],
+            "resultSizeEstimate": len(matched),
+        }
+        if offset + max_results < len(matched):
+            body["nextPageToken"] = str(offset + max_results)
+        return 200, body
+
+    def get_message(self, msg_id: str, params: dict) -> tuple[int, dict]:
+        msg = self.by_id.get(msg_id)
+        if msg is None:
+            return 404, {"error": {"code": 404, "message": "Requested entity was not found."}}
+        headers = [
+            {"name": "Subject", "value": msg["subject"]}, {"name": "From", "value": msg["from"]},
+            {"name": "To", "value": msg.get("to", ME)},
+        ]
+        wanted = params.get("metadataHeaders")
+        if params.get("format", ["full"])[0] == "metadata" and wanted:
+            headers = [h for h in headers if h["name"] in wanted]
+        return 200, {
+            "id": msg["id"],
+            "threadId": msg["threadId"],
+            "snippet": msg["snippet"],
+            "internalDate": msg["internalDate"],
+            "historyId": msg["historyId"],
+            "payload": {"headers": headers},
+        }
+
+    def get_profile(self) -> tuple[int, dict]:
+        return 200, {"emailAddress": ME, "messagesTotal": len(self.messages),
+                     "historyId": str(self.history_id)}
+
+    def list_history(self, params: dict) -> tuple[int, dict]:
+        start = int(params["startHistoryId"][0])
+        if start < self.history_floor:
+            return 404, {"error": {"code": 404, "message": "Requested entity was not found."}}
+        max_results = int(params.get("maxResults", ["100"])[0])
+        offset = int(params.get("pageToken", ["0"])[0])
+        added = sorted(
+            (m for m in self.messages if int(m["historyId"]) > start),
+            key=lambda m: int(m["historyId"]),
+        )
+        page = added[offset:offset + max_results]
+        body = {
+            "history": [
+                {"id": m["historyId"], "messagesAdded": [
+                    {"message": {"id": m["id"], "threadId": m["threadId"], "labelIds": ["INBOX"]}}
+                ]}
+                for m in page
+            ],
+            "historyId": str(self.history_id),
+        }
+        if offset + max_results < len(added):
+            body["nextPageToken"] = str(offset + max_results)
+        return 200, body
+
+    def _record(self, endpoint: str, user: str) -> tuple[int, dict] | None:
+        """Count a call; returns the error response if it is throttled or fails."""
+        with self._lock:
+            self.calls[endpoint] += 1
+            if self.quota_per_second:
+                now = time.monotonic()
+                available, updated = self._quota.get(user, (self.quota_per_second, now))
+                available = min(self.quota_per_second, available + (now - updated) * self.quota_per_second)
+                units = QUOTA_UNITS[endpoint]
+                if available < units:
+                    self._quota[user] = (available, now)
+                    self.throttled += 1
+                    return 429, {"error": {"code": 429, "message": "User-rate limit exceeded.",
+                                           "errors": [{"reason": "rateLimitExceeded"}]}}
+                self._quota[user] = (available - units, now)
+            if self.error_rate and self._rng.random() < self.error_rate:
+                self.errors += 1
+                return 503, {"error": {"code": 503, "message": "The service is currently unavailable."}}
+        return None
+
+    def dispatch(self, method: str, target: str) -> tuple[int, dict]:
+        url = urlparse(target)
+        user, path = split_user(url.path)
+        params = parse_qs(url.query)
+        if method == "GET" and LIST_PATH.match(path):
+            return self._record("messages.list", user) or self.list_messages(params)
+        if method == "GET" and PROFILE_PATH.match(path):
+            return self._record("getProfile", user) or self.get_profile()
+        if method == "GET" and HISTORY_PATH.match(path):
+            return self._record("history.list", user) or self.list_history(params)
+        match = MESSAGE_PATH.match(path)
+        if method == "GET" and match:
+            return self._record("messages.get", user) or self.get_message(match.group(1), params)
+        return 404, {"error": {"code": 404, "message": f"No fake for {method} {path}"}}
+
+    def dispatch_batch(self, content_type: str, body: str) -> tuple[str, str]:
+        multipart = Parser().parsestr(f"Content-Type: {content_type}\r\n\r\n{body}")
+        boundary = "batch_fake_gmail"
+        out = []
+        for part in multipart.get_payload():
+            request_line = part.get_payload().lstrip().split("\n", 1)[0].strip()
+            method, target, _ = request_line.split(" ", 2)
+            status, payload = self.dispatch(method, target)
+            content_id = part["Content-ID"].strip("<>")
+            out.append(
+                f"--{boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                "Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{json.dumps(payload)}\r\n"
+            )
+        out.append(f"--{boundary}--\r\n")
+        return boundary, "".join(out)
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                with fake._lock:
+                    fake.connections += 1
+                if fake.connect_latency:
+                    time.sleep(fake.connect_latency)
+
+            def _expired(self) -> bool:
+                if self.headers.get("Authorization") != "Bearer expired":
+                    return False
+                self._send(401, json.dumps({"error": {"code": 401, "message": "Invalid Credentials"}}),
+                           "application/json; charset=UTF-8")
+                return True
+
+            def _count(self):
+                with fake._lock:
+                    fake.request_count += 1
+                if fake.latency:
+                    time.sleep(fake.latency)
+
+            def _send(self, status: int, body: str, content_type: str):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._count()
+                if self._expired():
+                    return
+                status, payload = fake.dispatch("GET", self.path)
+                self._send(status, json.dumps(payload), "application/json; charset=UTF-8")
+
+            def do_POST(self):
+                self._count()
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length).decode("utf-8")
+                if self.path == "/token":
+                    with fake._lock:
+                        fake.tokens_issued += 1
+                        issued = fake.tokens_issued
+                    payload = {"access_token": f"fresh-{issued}", "expires_in": 3600, "token_type": "Bearer"}
+                    self._send(200, json.dumps(payload), "application/json")
+                    return
+                if self._expired():
+                    return
+                if not split_user(self.path)[1].startswith("/batch"):
+                    self._send(404, "{}", "application/json")
+                    return
+                boundary, payload = fake.dispatch_batch(self.headers["Content-Type"], body)
+                self._send(200, payload, f"multipart/mixed; boundary={boundary}")
+
+        return Handler
@@ -0,0 +1,64 @@
+"""
+Synthetic data for the benchmarks. Every generator is seeded, so a run is reproducible.
+
+- create_tenant: a user in an organization of their own
+- create_users: more users in an organization, all with one (real) password hash
+- populate: N subscriptions spread over teams and statuses
+- generate_mailbox (from fake_gmail): receipts and zombie mail for FakeGmailServer
+"""
+import random
+
+from sqlalchemy import insert
+from sqlmodel import Session
+
+from app.models.organization import Organization
+from app.models.subscription import Subscription
+from app.models.user import User
+from benchmarks.fake_gmail import generate_mailbox  # noqa: F401
+
+TEAMS = ["Engineering", "Design", "Marketing", "Product", "Sales", "Finance", "Unassigned"]
+STATUSES = ["active"] * 6 + ["zombie", "critical", "cancelled"]
+
+
+def create_tenant(engine, email: str = "bench@example.com") -> tuple[int, int]:
+    """A user in an organization of their own, as /auth/register makes them. Returns (user id, tenant id)."""
+    with Session(engine) as session:
+        organization = Organization(name=email)
+        session.add(organization)
+        session.flush()
+        user = User(email=email, hashed_password="x", organization_id=organization.id)
+        session.add(user)
+        session.commit()
+        return user.id, organization.id
+
+
+def create_users(engine, count: int, tenant_id: int, hashed_password: str = "x") -> list[str]:
+    """count users of tenant_id, user0@example.com onwards. Returns their emails."""
+    emails = [f"user{i}@example.com" for i in range(count)]
+    with Session(engine) as session:
+        session.execute(insert(User), [
+            {"email": email, "full_name": f"User {i}", "hashed_password": hashed_password, "organization_id": tenant_id}
+            for i, email in enumerate(emails)
+        ])
+        session.commit()
+    return emails
+
+
+def populate(engine, rows: int, seed: int = 1, tenant_id: int = 1):
+    rng = random.Random(seed)
+    with Session(engine) as session:
+        batch = []
+        for i in range(rows):
+            seats = rng.randint(1, 50)
+            batch.append({
+                "tenant_id": tenant_id, "name": f"Vendor {i}", "vendor_key": f"vendor {i}", "team": rng.choice(TEAMS),
+                "amount": round(rng.uniform(5, 2000), 2), "seats_total": seats,
+                "seats_unused": rng.randint(0, seats) if rng.random() < 0.3 else 0,
+                "status": rng.choice(STATUSES), "last_used": "Unknown",
+            })
+            if len(batch) == 10_000:
+                session.execute(insert(Subscription), batch)
+                batch = []
+        if batch:
+            session.execute(insert(Subscription), batch)
+        session.commit()
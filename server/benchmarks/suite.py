@@ -0,0 +1,262 @@
+"""
+The benchmark suite: the hot paths, measured the same way every run, as JSON that can
+be compared against an earlier run's.
+
+Each scenario runs in a fresh process on a fresh SQLite database holding seeded data
+from benchmarks/generators.py, so results don't depend on what ran before them:
+
+  stats          GET /api/v1/stats with the stats cache cleared before each request
+  subscriptions  GET /api/v1/subscriptions, first pages under a few sorts
+  scan           full scan_gmail_for_subscriptions runs against the fake Gmail server
+  login          POST /api/v1/auth/login, real bcrypt at PASSWORD_HASH_ROUNDS
+  authenticated  GET /api/v1/auth/connections with the bearer tokens of many users
+
+HTTP scenarios drive the ASGI app in-process with --concurrency requests in flight.
+Each reports latency p50/p99 per operation, throughput, SQL statements per operation
+and the process's peak RSS. Settings come from the environment as usual, so a run
+measures the configuration it is given.
+
+    cd server && python -m benchmarks.suite --json before.json
+    cd server && python -m benchmarks.suite --json after.json --compare before.json
+
+--compare prints the change of every number and exits with status 1 if any got worse
+by more than --tolerance (latency, queries and memory up; throughput down).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+SCENARIOS = ["stats", "subscriptions", "scan", "login", "authenticated"]
+# Which direction is worse, per reported number
+HIGHER_IS_WORSE = {"p50_ms": True, "p99_ms": True, "ops_per_s": False, "queries_per_op": True, "peak_rss_mb": True}
+WARMUP = 20
+SEED = 1
+
+
+def percentile(timings: list[float], share: float) -> float:
+    timings = sorted(timings)
+    return timings[min(len(timings) - 1, int(len(timings) * share))]
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+class QueryCounter:
+    """Counts statements on every engine, async ones included."""
+
+    def __init__(self):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+
+        self.count = 0
+        event.listen(Engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def drive(app, headers: dict, requests: list, concurrency: int, before=None) -> tuple[list[float], float]:
+    """Run requests (method, url, json body) through app, concurrency at a time; (timings in ms, wall seconds)."""
+    import httpx
+
+    async def run():
+        timings = []
+        queue = iter(requests)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+            async def worker():
+                for method, url, body, request_headers in queue:
+                    if before:
+                        before()
+                    start = time.perf_counter()
+                    response = await client.request(method, url, json=body, headers={**headers, **request_headers})
+                    timings.append((time.perf_counter() - start) * 1000)
+                    response.raise_for_status()
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            return timings, time.perf_counter() - start
+
+    return asyncio.run(run())
+
+
+def run_scenario(name: str, args) -> dict:
+    from sqlalchemy import delete
+    from sqlmodel import Session, SQLModel
+
+    from app.core.database import engine
+    from app.core.security import create_access_token, get_password_hash
+    from app.models.oauth import GmailScanCursor, OAuthToken
+    from app.services.analytics_service import invalidate_stats
+    from app.services.gmail_scanner import scan_gmail_for_subscriptions
+    from benchmarks.fake_gmail import FakeGmailServer
+    from benchmarks.generators import create_tenant, create_users, generate_mailbox, populate
+    from main import app
+
+    SQLModel.metadata.create_all(engine)
+    user_id, tenant_id = create_tenant(engine)
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'bench@example.com'})}"}
+    queries = QueryCounter()
+
+    def http(requests: list, before=None) -> tuple[list[float], float]:
+        drive(app, headers, requests[:WARMUP], args.concurrency, before)
+        queries.count = 0
+        return drive(app, headers, requests[WARMUP:], args.concurrency, before)
+
+    if name == "stats":
+        populate(engine, args.rows, SEED, tenant_id)
+        timings, seconds = http(
+            [("GET", "/api/v1/stats", None, {})] * (args.requests + WARMUP), before=lambda: invalidate_stats(tenant_id)
+        )
+    elif name == "subscriptions":
+        populate(engine, args.rows, SEED, tenant_id)
+        sorts = ["-amount", "name", "team", "id"]
+        timings, seconds = http([
+            ("GET", f"/api/v1/subscriptions?limit=50&sort={sorts[i % len(sorts)]}", None, {})
+            for i in range(args.requests + WARMUP)
+        ])
+    elif name == "login":
+        password = "correct horse battery staple"
+        emails = create_users(engine, args.users, tenant_id, get_password_hash(password))
+        timings, seconds = http([
+            ("POST", "/api/v1/auth/login", {"email": emails[i % len(emails)], "password": password}, {})
+            for i in range(args.logins + WARMUP)
+        ])
+    elif name == "authenticated":
+        emails = create_users(engine, args.users, tenant_id)
+        tokens = [create_access_token(data={"sub": email}) for email in emails]
+        timings, seconds = http([
+            ("GET", "/api/v1/auth/connections", None, {"Authorization": f"Bearer {tokens[i % len(tokens)]}"})
+            for i in range(args.requests + WARMUP)
+        ])
+    elif name == "scan":
+        timings = []
+        mailbox = generate_mailbox(args.receipts, args.receipts // 10, seed=SEED)
+        with FakeGmailServer(mailbox, latency=0) as fake, Session(engine) as session:
+            token = OAuthToken(user_id=user_id, access_token="fake")
+            session.add(token)
+            session.commit()
+            for i in range(args.scans + 1):
+                # Full scans each time, not history scans from the last one's cursor
+                session.execute(delete(GmailScanCursor))
+                session.commit()
+                if i == 1:  # the first is warm-up
+                    queries.count = 0
+                    started = time.perf_counter()
+                start = time.perf_counter()
+                scan_gmail_for_subscriptions(token, session, service=fake.service())
+                if i:
+                    timings.append((time.perf_counter() - start) * 1000)
+        seconds = time.perf_counter() - started
+    else:
+        raise ValueError(f"Unknown scenario {name}")
+
+    return {
+        "ops": len(timings),
+        "p50_ms": round(percentile(timings, 0.5), 3),
+        "p99_ms": round(percentile(timings, 0.99), 3),
+        "ops_per_s": round(len(timings) / seconds, 2),
+        "queries_per_op": round(queries.count / len(timings), 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Print each number against the baseline's; returns the regressions."""
+    regressions = []
+    print(f"\nagainst {baseline['meta'].get('commit')} ({baseline['meta'].get('date')}), tolerance {tolerance:.0%}:")
+    for name, result in results.items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            print(f"{name:>14}: not in the baseline")
+            continue
+        changes = []
+        for key, higher_is_worse in HIGHER_IS_WORSE.items():
+            if not before.get(key):
+                continue
+            change = result[key] / before[key] - 1
+            worse = change > tolerance if higher_is_worse else change < -tolerance
+            changes.append(f"{key} {change:+.0%}{' REGRESSED' if worse else ''}")
+            if worse:
+                regressions.append(f"{name} {key}: {before[key]} -> {result[key]}")
+        print(f"{name:>14}: " + ", ".join(changes))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--rows", type=int, default=5000, help="subscriptions in the tenant")
+    parser.add_argument("--requests", type=int, default=500, help="per HTTP scenario, login excepted")
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--scans", type=int, default=5)
+    parser.add_argument("--receipts", type=int, default=500, help="per scanned mailbox, plus 10%% zombie mail")
+    parser.add_argument("--json", help="write the results here")
+    parser.add_argument("--compare", help="a previous run's --json file")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(run_scenario(args.child, args)))
+        return
+
+    params = {key: value for key, value in vars(args).items() if key not in ("scenarios", "json", "compare", "tolerance", "child")}
+    passthrough = [item for key, value in params.items() for item in (f"--{key}", str(value))]
+    results = {}
+    print(f"{'scenario':>14} {'ops':>6} {'p50 ms':>9} {'p99 ms':>9} {'ops/s':>9} {'queries/op':>11} {'peak RSS MB':>12}")
+    for name in args.scenarios:
+        database = os.path.join(tempfile.mkdtemp(), "suite.db")
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.suite", "--child", name, *passthrough],
+            env={**os.environ, "DATABASE_URL": f"sqlite:///{database}"},
+            capture_output=True, text=True, check=True,
+        ).stdout
+        result = results[name] = json.loads(output.strip().splitlines()[-1])
+        print(f"{name:>14} {result['ops']:>6} {result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+              f"{result['ops_per_s']:>9.1f} {result['queries_per_op']:>11.2f} {result['peak_rss_mb']:>12.1f}")
+
+    if args.json:
+        meta = {
+            "commit": git_commit(), "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "seed": SEED, "params": params,
+        }
+        with open(args.json, "w") as f:
+            json.dump({"meta": meta, "scenarios": results}, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("params") != params:
+            print("\nnote: the baseline ran with different parameters")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nregressed: " + "; ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,47 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from starlette.middleware.cors import CORSMiddleware
+import asyncio
 from contextlib import asynccontextmanager
-from app.core.database import create_db_and_tables, get_session
+from app.core.database import engine, get_session
+from app.core.schema import ensure_schema
 from app.api.v1.api import api_router
 from app.services.subscription_service import SubscriptionService
+from app.core import metrics
+from app.core.metrics import MetricsMiddleware
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
+from app.core.cache import get_cache
+from app.core.security import PasswordHashBusy
+from app.core.tenancy import TenantMoving
+from app.services import rollup_service, scan_jobs, transaction_ingest
+from app.services.accounting_connectors import close_http_client
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Create tables
-    create_db_and_tables()
+    # Migrate the schema if this is the first worker up since new migrations shipped
+    ensure_schema(engine)
+    # Chosen now rather than on the first stats request, so a per-worker cache is warned about at boot
+    get_cache()
     
     # Seed data (Disabled for production/real usage)
     # with Session(engine) as session:
     #     service = SubscriptionService(session)
     #     service.seed_initial_data()
+
+    compaction = None
+    if settings.ROLLUP_COMPACT_INTERVAL > 0:
+        compaction = asyncio.create_task(rollup_service.compaction_loop(settings.ROLLUP_COMPACT_INTERVAL))
         
     yield
 
+    if compaction:
+        compaction.cancel()
+
+    scan_jobs.shutdown()
+    transaction_ingest.shutdown()
+    await close_http_client()
+
 app = FastAPI(title="SpendShred API", lifespan=lifespan)
 
 if settings.BACKEND_CORS_ORIGINS:
@@ -29,9 +53,29 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["*"],
     )
 
+# Compresses large JSON and streamed exports for clients that accept brotli or gzip
+app.add_middleware(CompressionMiddleware, minimum_size=1000)
+
+if settings.METRICS_ENABLED:
+    # Added last, so it is outermost and times compression too
+    app.add_middleware(MetricsMiddleware, profile_ms=settings.SLOW_REQUEST_PROFILE_MS)
+
+@app.exception_handler(PasswordHashBusy)
+async def password_hash_busy(request: Request, exc: PasswordHashBusy):
+    return JSONResponse(status_code=503, content={"detail": "Too many sign-in attempts, try again shortly"}, headers={"Retry-After": "1"})
+
+@app.exception_handler(TenantMoving)
+async def tenant_moving(request: Request, exc: TenantMoving):
+    return JSONResponse(status_code=503, content={"detail": "Your organization's data is being moved, try again shortly"}, headers={"Retry-After": "30"})
+
 # Include Routers
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 def read_root():
     return {"message": "SpendShred API is running (Modular)"}
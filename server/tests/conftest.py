@@ -0,0 +1,43 @@
+"""
+The app's settings and engines are made when it is imported, so the test database and
+anything else read from the environment is set here, before any test module imports it.
+
+    cd server && python -m pytest
+"""
+import os
+import tempfile
+import uuid
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'tests.db')}"
+os.environ.setdefault("PASSWORD_HASH_ROUNDS", "4")
+os.environ.setdefault("METRICS_ENABLED", "false")
+
+import httpx
+import pytest
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def client():
+    """The app, started up (which migrates the test database), behind an in-process client."""
+    from app.core.database import get_async_engine
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client
+    # Its pooled connections belong to this test's event loop
+    await get_async_engine().dispose()
+
+
+@pytest.fixture
+async def headers(client):
+    """Authorization for a newly registered user, in an organization of their own."""
+    response = await client.post("/api/v1/auth/register", json={"email": f"{uuid.uuid4().hex}@example.com", "password": "pw"})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
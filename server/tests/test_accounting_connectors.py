@@ -0,0 +1,158 @@
+"""The QuickBooks and Xero connectors, and the analyze job, against a local fake of both APIs."""
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services import accounting_connectors
+from app.services.accounting_connectors import (
+    BACKOFF_MAX, ConnectorError, InvalidCredentials, QuickBooksConnector, XeroConnector, backoff_delay, close_http_client,
+)
+from benchmarks.fake_accounting import VALID_TOKEN, FakeAccountingServer, generate_expenses
+
+pytestmark = pytest.mark.anyio
+
+API_KEY = f"realm-1:{VALID_TOKEN}"
+
+
+@pytest.fixture
+def delays(monkeypatch) -> list[int]:
+    """The attempts the connectors backed off after, without the wait."""
+    attempts = []
+
+    def record(attempt, retry_after=None):
+        attempts.append(attempt)
+        return 0
+
+    monkeypatch.setattr(accounting_connectors, "backoff_delay", record)
+    return attempts
+
+
+async def collect(connector, api_key: str = API_KEY) -> list:
+    return [expense async for expense in connector.iter_expenses(api_key)]
+
+
+@pytest.mark.parametrize("connector_class, calls", [
+    (QuickBooksConnector, {"quickbooks.query": 3}),
+    (XeroConnector, {"xero.banktransactions": 26}),
+])
+async def test_pages_through_expenses(connector_class, calls):
+    expenses = generate_expenses(2500)
+    with FakeAccountingServer(expenses, latency=0) as fake:
+        async with httpx.AsyncClient() as client:
+            found = await collect(connector_class(fake.url, client))
+    assert [(e.vendor, e.amount, e.date) for e in found] == [(e["vendor"], e["amount"], e["date"]) for e in expenses]
+    assert dict(fake.calls) == calls
+
+
+@pytest.mark.parametrize("connector_class", [QuickBooksConnector, XeroConnector])
+async def test_verify(connector_class):
+    with FakeAccountingServer([], latency=0) as fake:
+        async with httpx.AsyncClient() as client:
+            connector = connector_class(fake.url, client, max_retries=3)
+            await connector.verify(API_KEY)
+            with pytest.raises(InvalidCredentials):
+                await connector.verify("realm-1:wrong-token")
+            with pytest.raises(InvalidCredentials):
+                await connector.verify("no-company-id")
+        # Bad credentials aren't retried
+        assert fake.request_count == 2
+
+
+async def test_retries_throttling_and_server_errors(delays):
+    expenses = generate_expenses(2500)
+    # Every 3rd request answers 503, every 6th 429 with Retry-After
+    with FakeAccountingServer(expenses, latency=0, fail_every=3) as fake:
+        async with httpx.AsyncClient() as client:
+            found = await collect(QuickBooksConnector(fake.url, client, max_retries=2))
+    assert len(found) == len(expenses)
+    assert fake.calls["quickbooks.query"] == 3
+    assert fake.calls["injected_failure"] == 1
+    assert delays == [0]
+
+
+async def test_gives_up_after_max_retries(delays):
+    with FakeAccountingServer([], latency=0, fail_every=1) as fake:
+        async with httpx.AsyncClient() as client:
+            with pytest.raises(ConnectorError, match="returned HTTP"):
+                await QuickBooksConnector(fake.url, client, max_retries=3).verify(API_KEY)
+    assert fake.request_count == 4
+    assert delays == [0, 1, 2]
+
+
+async def test_timeout(delays):
+    with FakeAccountingServer([], latency=0.5) as fake:
+        async with httpx.AsyncClient(timeout=0.05) as client:
+            with pytest.raises(ConnectorError, match="unreachable") as error:
+                await XeroConnector(fake.url, client, max_retries=1).verify(API_KEY)
+    assert error.value.status_code == 502
+    assert delays == [0]
+
+
+def test_backoff_delay():
+    assert backoff_delay(0, retry_after="2") == 2
+    assert backoff_delay(0, retry_after="3600") == BACKOFF_MAX
+    for attempt in range(10):
+        # Full jitter up to the capped exponential, also when Retry-After is an HTTP date
+        assert 0 <= backoff_delay(attempt) <= min(BACKOFF_MAX, accounting_connectors.BACKOFF_BASE * 2 ** attempt)
+        assert 0 <= backoff_delay(attempt, retry_after="Wed, 21 Oct 2026 07:28:00 GMT") <= BACKOFF_MAX
+
+
+async def analyze(client, headers, service: str, api_key: str = API_KEY) -> dict:
+    """Start an analysis and poll its handle until it's finished, as the dashboard does."""
+    response = await client.post("/api/v1/integrations/analyze", json={"service": service, "apiKey": api_key}, headers=headers)
+    assert response.status_code == 202
+    job = response.json()
+    statuses = [job["status"]]
+    while job["status"] in ("queued", "running"):
+        await asyncio.sleep(0.01)
+        job = (await client.get(f"/api/v1/integrations/analyze/{job['id']}", headers=headers)).json()
+        statuses.append(job["status"])
+    assert statuses[0] == "queued"
+    return job
+
+
+@pytest.fixture
+async def fake(monkeypatch):
+    with FakeAccountingServer(generate_expenses(500), latency=0) as fake:
+        monkeypatch.setattr(settings, "QUICKBOOKS_API_URL", fake.url)
+        monkeypatch.setattr(settings, "XERO_API_URL", fake.url)
+        yield fake
+        # The shared client's connections belong to this test's event loop
+        await close_http_client()
+
+
+async def test_connect_requires_a_user(client, headers, fake):
+    body = {"service": "xero", "apiKey": API_KEY}
+    assert (await client.post("/api/v1/integrations/connect", json=body)).status_code == 401
+    response = await client.post("/api/v1/integrations/connect", json=body, headers=headers)
+    assert response.json() == {"status": "connected", "service": "xero"}
+    response = await client.post("/api/v1/integrations/connect", json={"service": "sage", "apiKey": API_KEY}, headers=headers)
+    assert response.status_code == 400
+
+
+async def test_analyze(client, headers, fake):
+    response = await client.post(
+        "/api/v1/subscriptions", headers=headers,
+        json={"name": "Slack", "amount": 0, "seats_total": 1, "seats_unused": 1, "status": "zombie"}
+    )
+    response.raise_for_status()
+
+    job = await analyze(client, headers, "quickbooks")
+    assert job["status"] == "succeeded"
+    assert job["analyzed_count"] == 500
+    assert job["recurring_vendors"] > 0
+    assert job["zombies_found"] == 1
+    assert job["potential_savings"] > 0
+    assert job["started_at"] and job["finished_at"]
+
+
+async def test_analyze_failure(client, headers, fake, delays):
+    job = await analyze(client, headers, "xero", api_key="realm-1:wrong-token")
+    assert job["status"] == "failed"
+    assert job["error"] == "Invalid API Key or Connection Failed"
+
+    other = await client.post("/api/v1/auth/register", json={"email": "other@example.com", "password": "pw"})
+    other_headers = {"Authorization": f"Bearer {other.json()['access_token']}"}
+    assert (await client.get(f"/api/v1/integrations/analyze/{job['id']}", headers=other_headers)).status_code == 404
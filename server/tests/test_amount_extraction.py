@@ -0,0 +1,25 @@
+"""Receipt amounts on the benchmark's fixture snippets, one at a time and in batches."""
+import json
+
+from app.services.amount_extraction import Money, extract_money, extract_money_batch
+from benchmarks.bench_amount_extraction import FIXTURES
+
+with open(FIXTURES) as f:
+    CASES = json.load(f)
+
+
+def expected(case: dict):
+    return Money(case["amount"], case["currency"]) if case["amount"] is not None else None
+
+
+def test_fixtures():
+    for case in CASES:
+        assert extract_money(case["text"]) == expected(case), case["text"]
+
+
+def test_batch_matches_single_texts():
+    # Repeats, mail with no amount and empty texts mixed in with the receipts
+    texts = [case["text"] for case in CASES] * 2 + ["We miss you at Notion", "Invoice #10422", "", None]
+    assert extract_money_batch(texts) == [extract_money(text) for text in texts]
+    assert extract_money_batch(texts)[-4:] == [None] * 4
+    assert extract_money_batch([]) == []
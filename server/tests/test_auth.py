@@ -0,0 +1,50 @@
+"""Authenticated requests: the cached principal, and the legacy blocking scan endpoint."""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from jose import jwt
+from sqlmodel import Session, select
+
+pytestmark = pytest.mark.anyio
+
+
+def subject(headers: dict) -> str:
+    return jwt.get_unverified_claims(headers["Authorization"].removeprefix("Bearer "))["sub"]
+
+
+async def test_principal_cache_holds_user_and_tenant(client, headers):
+    from app.api.deps import principal_cache
+
+    assert (await client.get("/api/v1/stats", headers=headers)).status_code == 200
+    snapshot = principal_cache.get(subject(headers))
+    assert "hashed_password" not in snapshot["user"]
+    assert snapshot["tenant"]["id"] == snapshot["user"]["organization_id"]
+    # Served from the snapshot
+    assert (await client.get("/api/v1/stats", headers=headers)).status_code == 200
+
+
+async def test_google_scan_runs_as_a_job(client, headers, monkeypatch):
+    from app.api.v1.endpoints import auth
+    from app.core.database import engine
+    from app.models.oauth import OAuthToken
+    from app.models.scan_job import ScanJob
+    from app.models.user import User
+    from app.services import gmail_scanner, scan_jobs
+
+    assert (await client.get("/api/v1/auth/google/scan", headers=headers)).status_code == 400
+
+    with Session(engine) as session:
+        user = session.exec(select(User).where(User.email == subject(headers))).one()
+        session.add(OAuthToken(user_id=user.id, access_token="fake"))
+        session.commit()
+        user_id = user.id
+    monkeypatch.setattr(auth, "SCAN_POLL_INTERVAL", 0.01)
+    # An earlier test's app shutdown stopped the module's pool
+    monkeypatch.setattr(scan_jobs, "executor", ThreadPoolExecutor(max_workers=1))
+    monkeypatch.setattr(gmail_scanner, "scan_gmail_for_subscriptions", lambda *args, **kwargs: [{}, {}, {}])
+
+    response = await client.get("/api/v1/auth/google/scan", headers=headers)
+    assert response.json()["found"] == 3
+    with Session(engine) as session:
+        job = session.get(ScanJob, response.json()["job_id"])
+    assert (job.user_id, job.status, job.active_user_id) == (user_id, "succeeded", None)
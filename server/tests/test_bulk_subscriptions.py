@@ -0,0 +1,42 @@
+"""Bulk subscription writes through the API, whose rows are validated off the event loop."""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+ROW = {"team": "Engineering", "amount": 10, "seats_total": 5, "seats_unused": 1}
+
+
+async def test_bulk_create_and_update(client, headers):
+    rows = [{"name": f"Vendor {i}", **ROW} for i in range(500)]
+    response = await client.post("/api/v1/subscriptions/bulk", json=rows, headers=headers)
+    assert response.json()["succeeded"] == 500
+    ids = [result["id"] for result in response.json()["results"]]
+
+    changes = [{"id": row_id, "name": "Slack Technologies", "status": "zombie"} for row_id in ids[:10]]
+    response = await client.patch("/api/v1/subscriptions/bulk", json=changes, headers=headers)
+    assert response.json()["succeeded"] == 10
+    listed = (await client.get("/api/v1/subscriptions?all=true", headers=headers)).json()
+    renamed = [sub for sub in listed if sub["id"] in ids[:10]]
+    assert {(sub["vendor_key"], sub["status"]) for sub in renamed} == {("slack", "zombie")}
+
+
+async def test_invalid_rows(client, headers):
+    rows = [{"name": "Good", **ROW}, {"name": "", **ROW}, {"name": "Extra", "colour": "red", **ROW}]
+    response = await client.post("/api/v1/subscriptions/bulk", json=rows, headers=headers)
+    assert response.status_code == 422
+    assert [result["status"] for result in response.json()["results"]] == ["skipped", "error", "error"]
+
+    response = await client.post("/api/v1/subscriptions/bulk?partial=true", json=rows, headers=headers)
+    assert [result["status"] for result in response.json()["results"]] == ["created", "error", "error"]
+    created = response.json()["results"][0]["id"]
+
+    changes = [{"id": created, "amount": 20}, {"id": created, "amount": 30}, {"id": 10**9, "amount": 1}, {"amount": 1}]
+    response = await client.patch("/api/v1/subscriptions/bulk?partial=true", json=changes, headers=headers)
+    assert [result["status"] for result in response.json()["results"]] == ["updated", "error", "error", "error"]
+
+    response = await client.post("/api/v1/subscriptions/bulk", content=b"name,amount\nCSV Co,12\n", headers={
+        **headers, "Content-Type": "text/csv"
+    })
+    assert response.status_code == 422  # seats are required
+    response = await client.post("/api/v1/subscriptions/bulk", content=b"{", headers=headers)
+    assert response.status_code == 400
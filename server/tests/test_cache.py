@@ -0,0 +1,33 @@
+"""Which stats cache a worker picks."""
+import logging
+
+import pytest
+
+from app.core import cache
+from app.core.config import settings
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    cache.get_cache.cache_clear()
+    yield
+    cache.get_cache.cache_clear()
+
+
+def test_redis_url_is_the_default_shared_cache(monkeypatch):
+    pytest.importorskip("redis")
+    monkeypatch.setattr(settings, "REDIS_URL", "redis://localhost:6379/0")
+    assert isinstance(cache.get_cache(), cache.RedisCache)
+
+
+def test_per_worker_cache_is_warned_about(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "WORKERS", 4)
+    with caplog.at_level(logging.WARNING, logger="app.core.cache"):
+        assert isinstance(cache.get_cache(), cache.MemoryCache)
+    assert "WORKERS=4" in caplog.text
+
+    caplog.clear()
+    cache.get_cache.cache_clear()
+    monkeypatch.setattr(settings, "WORKERS", 1)
+    cache.get_cache()
+    assert not caplog.records
@@ -0,0 +1,53 @@
+"""Responses come back compressed in the encoding the client weighs highest, and decode whole."""
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from app.core.compression import CompressionMiddleware
+
+pytestmark = pytest.mark.anyio
+
+BODY = "".join(f"Netflix,{month},15.49\n" for month in range(2000))
+
+
+async def listing(request):
+    return PlainTextResponse(BODY)
+
+
+async def streamed(request):
+    async def lines():
+        for start in range(0, len(BODY), 4096):
+            yield BODY[start:start + 4096]
+    return StreamingResponse(lines(), media_type="text/plain")
+
+
+@pytest.fixture
+async def client():
+    app = Starlette(routes=[Route("/listing", listing), Route("/streamed", streamed)])
+    app.add_middleware(CompressionMiddleware, minimum_size=1000)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+@pytest.mark.parametrize("path", ["/listing", "/streamed"])
+async def test_brotli_round_trip(client, path):
+    # httpx decodes br itself, with the brotli package the middleware needs anyway
+    pytest.importorskip("brotli")
+    response = await client.get(path, headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+    assert response.text == BODY
+
+
+@pytest.mark.parametrize("path", ["/listing", "/streamed"])
+async def test_gzip_when_preferred(client, path):
+    response = await client.get(path, headers={"Accept-Encoding": "br;q=0.5, gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text == BODY
+
+
+async def test_identity_when_nothing_is_accepted(client):
+    response = await client.get("/listing", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.text == BODY
@@ -0,0 +1,25 @@
+"""Services built from the cached discovery document, and the per-user refresh locks."""
+import gc
+
+from google.oauth2.credentials import Credentials
+
+from app.services import gmail_client
+
+
+def test_services_do_not_share_the_document():
+    creds = Credentials(token="fake")
+    first = gmail_client.build_service("gmail", "v1", creds)
+    second = gmail_client.build_service("gmail", "v1", creds)
+    first.users().messages()
+    assert first._resourceDesc is not second._resourceDesc
+    assert isinstance(gmail_client.discovery_document("gmail", "v1"), str)
+
+
+def test_refresh_locks_go_with_their_last_holder():
+    lock = gmail_client._refresh_lock(42)
+    assert gmail_client._refresh_lock(42) is lock
+    with lock:
+        assert 42 in gmail_client._refresh_locks
+    del lock
+    gc.collect()
+    assert 42 not in gmail_client._refresh_locks
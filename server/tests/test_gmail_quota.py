@@ -0,0 +1,26 @@
+"""Per-user Gmail quota buckets, shared by a user's concurrent scans."""
+import gc
+
+from app.core.config import settings
+from app.services import gmail_quota
+
+
+def test_scans_of_one_user_share_a_limiter(monkeypatch):
+    monkeypatch.setattr(settings, "GMAIL_USER_QUOTA_UNITS", 250)
+    first, second = gmail_quota.user_limiter(1), gmail_quota.user_limiter(1)
+    assert first is second and first.rate == 250
+    assert gmail_quota.user_limiter(2) is not first
+
+    first.acquire(200)
+    second.acquire(100)
+    # The second scan paid off the first one's spending too
+    assert second.waited > 0
+
+    del first, second
+    gc.collect()
+    assert 1 not in gmail_quota._limiters
+
+
+def test_no_limiter_without_a_quota(monkeypatch):
+    monkeypatch.setattr(settings, "GMAIL_USER_QUOTA_UNITS", 0)
+    assert gmail_quota.user_limiter(1) is None
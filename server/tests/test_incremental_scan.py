@@ -0,0 +1,127 @@
+"""Repeat Gmail scans read only what the history cursor says is new, counted on a fake Gmail API."""
+import json
+import time
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.models.oauth import GmailScanCursor, OAuthToken
+from app.services.gmail_scanner import scan_gmail_for_subscriptions
+from benchmarks.fake_gmail import ME, FakeGmailServer, generate_mailbox
+from benchmarks.generators import create_tenant
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    create_tenant(engine)
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def fake():
+    with FakeGmailServer(generate_mailbox(40, 5), latency=0) as fake:
+        yield fake
+
+
+@pytest.fixture
+def token(session) -> OAuthToken:
+    token = OAuthToken(user_id=1, access_token="fake")
+    session.add(token)
+    session.commit()
+    session.refresh(token)
+    return token
+
+
+def scan(fake: FakeGmailServer, token: OAuthToken, session: Session) -> dict:
+    """Scan and return the Gmail API calls it made, per endpoint."""
+    fake.reset_counters()
+    scan_gmail_for_subscriptions(token, session, service=fake.service())
+    return dict(fake.calls)
+
+
+def deliver(fake: FakeGmailServer, count: int, start: int, to_me: int = 0) -> list[dict]:
+    """Deliver count new receipts, the first to_me of them sent to the mailbox's own address."""
+    fresh = generate_mailbox(count, 0, seed=7, start=start)
+    for i, msg in enumerate(fresh):
+        msg["internalDate"] = str(int(time.time() * 1000))
+        if i < to_me:
+            msg["to"] = f"Me <{ME}>"
+    fake.deliver(fresh)
+    return fresh
+
+
+def cursor(session: Session) -> GmailScanCursor:
+    return session.exec(select(GmailScanCursor).where(GmailScanCursor.user_id == 1)).one()
+
+
+def test_first_scan_is_full(fake, token, session):
+    calls = scan(fake, token, session)
+    assert calls["getProfile"] == 1
+    assert calls["messages.list"] == 2  # receipts, then zombie mail
+    assert calls["messages.get"] == 45
+    assert "history.list" not in calls
+    assert cursor(session).history_id == str(fake.history_id)
+
+
+def test_repeat_scan_with_no_new_mail(fake, token, session):
+    scan(fake, token, session)
+    assert scan(fake, token, session) == {"history.list": 1}
+
+
+def test_repeat_scan_reads_only_new_mail(fake, token, session):
+    scan(fake, token, session)
+    deliver(fake, 3, start=100)
+    assert scan(fake, token, session) == {"history.list": 1, "messages.get": 3}
+    assert cursor(session).history_id == str(fake.history_id)
+
+
+def test_processed_messages_are_not_fetched_again(fake, token, session):
+    scan(fake, token, session)
+    before = cursor(session).history_id
+    deliver(fake, 3, start=100)
+    scan(fake, token, session)
+
+    # As if the cursor's commit had failed after the messages were read: history hands
+    # back the same three messages, which are skipped before they're fetched
+    state = cursor(session)
+    state.history_id = before
+    session.add(state)
+    session.commit()
+    assert scan(fake, token, session) == {"history.list": 1}
+
+
+def test_expired_cursor_falls_back_to_a_full_scan(fake, token, session):
+    scan(fake, token, session)
+    fake.expire_history()
+    fresh = deliver(fake, 3, start=100)
+
+    calls = scan(fake, token, session)
+    # The 404 from history.list, then the full scan's profile read and listings. Those
+    # start after the newest message already seen, so only the new mail is fetched
+    assert calls == {"history.list": 1, "getProfile": 1, "messages.list": 2, "messages.get": len(fresh)}
+    assert cursor(session).history_id == str(fake.history_id)
+    assert scan(fake, token, session) == {"history.list": 1}
+
+
+def test_history_skips_mail_sent_to_the_mailbox(fake, token, session):
+    scan(fake, token, session)
+    fresh = deliver(fake, 3, start=100, to_me=1)
+    scan(fake, token, session)
+    # As the full scan's -to:me query would have: fetched, but not counted
+    processed = json.loads(cursor(session).processed_ids)
+    assert fresh[0]["id"] not in processed
+    assert {msg["id"] for msg in fresh[1:]} <= set(processed)
+
+
+def test_cursor_without_an_address_reads_it_once(fake, token, session):
+    scan(fake, token, session)
+    state = cursor(session)
+    state.email_address = None
+    session.add(state)
+    session.commit()
+    assert scan(fake, token, session) == {"history.list": 1, "getProfile": 1}
+    assert cursor(session).email_address == ME
+    assert scan(fake, token, session) == {"history.list": 1}
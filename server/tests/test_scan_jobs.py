@@ -0,0 +1,103 @@
+"""Scan jobs through the API, and a scan failing after it reported progress."""
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from jose import jwt
+from sqlmodel import Session, select
+
+from app.core.database import engine
+from app.core.schema import ensure_schema
+from app.models.oauth import GmailScanCursor, OAuthToken
+from app.models.scan_job import ScanJob
+from app.models.user import User
+from app.services import gmail_scanner, scan_jobs
+from benchmarks.fake_gmail import FakeGmailServer, generate_mailbox
+from benchmarks.generators import create_tenant
+
+
+@pytest.fixture
+def user_id() -> int:
+    ensure_schema(engine)
+    user_id, _ = create_tenant(engine, f"{uuid.uuid4().hex}@example.com")
+    with Session(engine) as session:
+        session.add(OAuthToken(user_id=user_id, access_token="fake"))
+        session.commit()
+    return user_id
+
+
+@pytest.fixture
+def fake():
+    with FakeGmailServer(generate_mailbox(40, 5), latency=0) as fake:
+        yield fake
+
+
+def run_job(user_id: int, fake: FakeGmailServer) -> ScanJob:
+    with Session(engine) as session:
+        job = ScanJob(user_id=user_id, active_user_id=user_id, max_messages=1000, horizon_days=365)
+        session.add(job)
+        session.commit()
+        job_id = job.id
+    fake.reset_counters()
+    return scan_jobs.run_scan_job(job_id, service=fake.service())
+
+
+def cursor(user_id: int) -> GmailScanCursor:
+    with Session(engine) as session:
+        return session.exec(select(GmailScanCursor).where(GmailScanCursor.user_id == user_id)).one()
+
+
+def test_failed_scan_keeps_the_cursor(user_id, fake, monkeypatch):
+    assert run_job(user_id, fake).status == "succeeded"
+    before = cursor(user_id)
+
+    # New mail, and a history cursor too old to use: the next scan is a full one, listing
+    # what came after the newest message the cursor has seen
+    fresh = generate_mailbox(3, 0, seed=7, start=100)
+    for msg in fresh:
+        msg["internalDate"] = str(int(time.time() * 1000) + 60_000)
+    fake.deliver(fresh)
+    fake.expire_history()
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("database went away")
+
+    # Progress written on every report, then the scan dies saving its results
+    monkeypatch.setattr(scan_jobs, "PROGRESS_INTERVAL", 0)
+    monkeypatch.setattr(gmail_scanner, "save_candidates", fail)
+    job = run_job(user_id, fake)
+    assert (job.status, job.phase) == ("failed", "saving")
+    after = cursor(user_id)
+    assert (after.history_id, after.last_internal_date) == (before.history_id, before.last_internal_date)
+
+    # So the next scan still finds that mail
+    monkeypatch.undo()
+    assert run_job(user_id, fake).status == "succeeded"
+    assert fake.calls["messages.get"] == len(fresh)
+
+
+@pytest.mark.anyio
+async def test_scans_endpoints(client, headers, monkeypatch):
+    assert (await client.post("/api/v1/scans", headers=headers)).status_code == 400
+
+    email = jwt.get_unverified_claims(headers["Authorization"].removeprefix("Bearer "))["sub"]
+    with Session(engine) as session:
+        user = session.exec(select(User).where(User.email == email)).one()
+        session.add(OAuthToken(user_id=user.id, access_token="fake"))
+        session.commit()
+    # An earlier test's app shutdown stopped the module's pool
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(scan_jobs, "executor", pool)
+    monkeypatch.setattr(gmail_scanner, "scan_gmail_for_subscriptions", lambda *args, **kwargs: [{}, {}])
+
+    response = await client.post("/api/v1/scans", json={"max_messages": 10}, headers=headers)
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    pool.shutdown(wait=True)
+    job = (await client.get(f"/api/v1/scans/{job_id}", headers=headers)).json()
+    assert (job["status"], job["subscriptions_found"], job["max_messages"]) == ("succeeded", 2, 10)
+
+    other = await client.post("/api/v1/auth/register", json={"email": f"{uuid.uuid4().hex}@example.com", "password": "pw"})
+    other_headers = {"Authorization": f"Bearer {other.json()['access_token']}"}
+    assert (await client.get(f"/api/v1/scans/{job_id}", headers=other_headers)).status_code == 404
@@ -0,0 +1,44 @@
+"""Cached dashboard stats follow subscription writes, whenever a read rebuilds them."""
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.core import cache
+from app.models.subscription import Subscription
+from app.services.analytics_service import get_cached_stats, get_dashboard_stats, invalidate_stats
+from app.services.subscription_service import SubscriptionService
+from benchmarks.generators import create_tenant
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    cache.get_cache.cache_clear()
+    yield
+    cache.get_cache.cache_clear()
+
+
+def test_rebuild_between_commit_and_invalidation_is_not_counted_twice(monkeypatch):
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    _, tenant_id = create_tenant(engine)
+    with Session(engine) as session, Session(engine) as reader:
+        service = SubscriptionService(session, tenant_id)
+        service.create(Subscription(name="Slack", amount=100, seats_total=10, seats_unused=0, status="active", team="Eng"))
+        assert get_cached_stats(reader, tenant_id)[0]["total_spend"] == 100
+
+        # The entry has expired, and a dashboard read rebuilds it after the commit but
+        # before the writer touches the cache
+        refresh = session.refresh
+        def read_then_refresh(instance):
+            invalidate_stats(tenant_id)
+            get_cached_stats(reader, tenant_id)
+            refresh(instance)
+        monkeypatch.setattr(session, "refresh", read_then_refresh)
+
+        service.create(Subscription(name="Figma", amount=40, seats_total=5, seats_unused=0, status="active", team="Design"))
+        created = service.create(Subscription(name="Zoom", amount=15, seats_total=1, seats_unused=0, status="zombie"))
+        service.update(created.id, {"status": "active", "team": "Eng"})
+
+        stats = get_cached_stats(reader, tenant_id)[0]
+        assert stats == get_dashboard_stats(reader, tenant_id)
+        assert stats["total_spend"] == 155
+        assert stats["zombie_count"] == 0
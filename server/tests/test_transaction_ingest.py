@@ -0,0 +1,104 @@
+"""Statement imports: transactions are the tenant's, and identical lines stay distinct."""
+import os
+from pathlib import Path
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, func, select
+
+from app.core.config import settings
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.services.transaction_ingest import ingest_file
+from benchmarks.generators import create_tenant
+
+def statement(first: int, last: int) -> str:
+    """An export of months first to last, each with two identical lines: two same-day charges of one amount."""
+    return "Date,Description,Amount\n" + "".join(
+        f"2026-{month:02d}-03,NETFLIX.COM 866-579-7172 CA,-15.49\n"
+        f"2026-{month:02d}-05,BLUE BOTTLE COFFEE,-4.50\n"
+        f"2026-{month:02d}-05,BLUE BOTTLE COFFEE,-4.50\n"
+        f"2026-{month:02d}-09,SPOTIFY P1A2B3C4D5,-10.99\n"
+        for month in range(first, last + 1)
+    )
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def export(tmp_path, monkeypatch):
+    """Writes statement(first, last) to a file and returns its path."""
+    monkeypatch.setattr(settings, "INGEST_WORKERS", 1)
+
+    def write(first: int, last: int) -> str:
+        path = tmp_path / f"statement-{first}-{last}.csv"
+        path.write_text(statement(first, last))
+        return str(path)
+    return write
+
+
+def transactions(session: Session) -> int:
+    return session.exec(select(func.count()).select_from(Transaction)).one()
+
+
+def test_identical_lines_are_distinct_transactions(session, export, monkeypatch):
+    user_id, _ = create_tenant(session.get_bind())
+    path = export(1, 6)
+    result = ingest_file(session, user_id, path, "csv")
+    assert result.rows_imported == transactions(session) == 24
+
+    # The same file split into other ranges updates the same rows
+    monkeypatch.setattr(settings, "INGEST_CHUNK_BYTES", 100)
+    ingest_file(session, user_id, path, "csv")
+    assert transactions(session) == 24
+
+
+def test_overlapping_exports_update_in_place(session, export, monkeypatch):
+    user_id, _ = create_tenant(session.get_bind())
+    ingest_file(session, user_id, export(1, 6), "csv")
+    monkeypatch.setattr(settings, "INGEST_CHUNK_BYTES", 100)
+    result = ingest_file(session, user_id, export(3, 9), "csv")
+    assert transactions(session) == 9 * 4
+    coffee = session.exec(select(func.sum(Transaction.amount)).where(Transaction.description == "BLUE BOTTLE COFFEE")).one()
+    assert coffee == pytest.approx(-4.50 * 2 * 9)
+    assert len(result.recurring) == 3
+
+
+def test_transactions_belong_to_the_tenant(session, export):
+    user_id, tenant_id = create_tenant(session.get_bind())
+    colleague = User(email="colleague@example.com", hashed_password="x", organization_id=tenant_id)
+    session.add(colleague)
+    session.commit()
+
+    first = ingest_file(session, user_id, export(1, 6), "csv")
+    second = ingest_file(session, colleague.id, export(1, 6), "csv")
+    assert transactions(session) == 24
+    assert {row.tenant_id for row in session.exec(select(Transaction))} == {tenant_id}
+    assert len(first.recurring) == len(second.recurring) == 3
+
+
+@pytest.mark.anyio
+async def test_upload_is_spooled_whole(client, headers, monkeypatch):
+    from app.api.v1.endpoints import transactions as endpoint
+    monkeypatch.setattr(endpoint, "UPLOAD_WRITE_BYTES", 100)
+    spooled = {}
+
+    def enqueue_import(job_id, path, charges_positive):
+        spooled["text"] = Path(path).read_text()
+        os.remove(path)
+    monkeypatch.setattr(endpoint.transaction_ingest, "enqueue_import", enqueue_import)
+    body = statement(1, 6)
+
+    async def stream():
+        for start in range(0, len(body), 64):
+            yield body[start:start + 64].encode()
+
+    response = await client.post("/api/v1/transactions/imports", content=stream(), headers=headers)
+    assert response.status_code == 202
+    assert response.json()["bytes_total"] == len(body)
+    assert spooled["text"] == body
@@ -0,0 +1,36 @@
+"""Subscriptions written through the API are keyed with their tenant's vendor aliases."""
+import pytest
+from sqlmodel import Session, select
+
+from app.core.database import engine
+from app.models.user import User
+from app.models.vendor import VendorAlias
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_subscription_names_resolve_through_tenant_aliases(client):
+    token = (await client.post("/api/v1/auth/register", json={"email": "aliases@example.com", "password": "pw"})).json()
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+    with Session(engine) as session:
+        tenant_id = session.exec(select(User.organization_id).where(User.email == "aliases@example.com")).one()
+        session.add(VendorAlias(tenant_id=tenant_id, alias="Acme Widgets", vendor="Acme"))
+        # Another tenant's alias for the same name doesn't apply
+        session.add(VendorAlias(tenant_id=tenant_id + 1000, alias="Globex", vendor="Initech"))
+        session.commit()
+
+    row = {"amount": 10, "seats_total": 1, "seats_unused": 0}
+    created = (await client.post("/api/v1/subscriptions", json={"name": "Acme Widgets", **row}, headers=headers)).json()
+    assert created["vendor_key"] == "acme"
+
+    response = await client.post("/api/v1/subscriptions/bulk", json=[{"name": "Globex", **row}], headers=headers)
+    [result] = response.json()["results"]
+    response = await client.patch(
+        "/api/v1/subscriptions/bulk", json=[{"id": result["id"], "name": "Acme Widgets Team"}], headers=headers
+    )
+    assert response.json()["succeeded"] == 1
+
+    updated = (await client.patch(f"/api/v1/subscriptions/{created['id']}", json={"name": "Globex"}, headers=headers)).json()
+    assert updated["vendor_key"] == "globex"
+    keys = {sub["name"]: sub["vendor_key"] for sub in (await client.get("/api/v1/subscriptions?all=true", headers=headers)).json()}
+    assert keys == {"Acme Widgets Team": "acme", "Globex": "globex"}